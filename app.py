@@ -1,8 +1,5 @@
-import os
-
 import streamlit as st
 
-from config import Config
 from logger import get_logger
 from services import ai_service, report_service
 
@@ -41,41 +38,19 @@ imagem_redacao = st.file_uploader(
 )
 
 if imagem_redacao is not None:
-    # Utiliza o diretório temporário definido na configuração
-    temp_dir = Config.TEMP_UPLOADS_DIR
-
-    # Define o caminho completo
-    caminho_imagem_temp = os.path.join(temp_dir, imagem_redacao.name)
-
-    try:
-        with open(caminho_imagem_temp, "wb") as f:
-            f.write(imagem_redacao.getbuffer())
-        logger.info(f"Imagem recebida e salva em: {caminho_imagem_temp}")
-    except Exception as e:
-        logger.error(f"Falha ao salvar imagem temporária: {e}")
-        st.error("Falha ao processar o upload da imagem.")
-        st.stop()
-
     if st.button("Analisar Redação com IA", type="primary", use_container_width=True):
         dados_redacao = None
 
         with st.spinner("Analisando a imagem e corrigindo a redação..."):
             try:
-                dados_redacao = ai_service.analisar_redacao(
-                    caminho_imagem_temp, PROMPT_MESTRE
+                # A imagem é enviada direto da memória, sem arquivo temporário
+                dados_redacao = ai_service.analisar_redacao_em_memoria(
+                    imagem_redacao.getvalue(), PROMPT_MESTRE
                 )
             except Exception as e:
                 logger.error(f"Exceção não tratada durante a análise: {e}")
                 st.error("Ocorreu um erro inesperado durante a análise.")
 
-        # Tenta remover o arquivo temporário após o uso
-        try:
-            if os.path.exists(caminho_imagem_temp):
-                os.remove(caminho_imagem_temp)
-                logger.info(f"Arquivo temporário removido: {caminho_imagem_temp}")
-        except OSError as e:
-            logger.warning(f"Não foi possível remover o arquivo temporário: {e}")
-
         if dados_redacao:
             st.success("Análise concluída com sucesso!", icon="🎉")
 
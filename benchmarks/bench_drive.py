@@ -0,0 +1,86 @@
+"""
+Benchmark das transferências com o Drive contra o servidor fake local.
+
+Compara o GoogleDriveService (uma requisição de cada vez) com o
+AsyncGoogleDriveService (pool de conexões, várias transferências em
+andamento) baixando e enviando os mesmos arquivos. Com QUEDAS (0 a 1), parte
+das transferências perde a conexão no meio e é retomada.
+
+Uso:
+    python benchmarks/bench_drive.py [QUANTIDADE] [LATENCIA_MS] [QUEDAS]
+"""
+
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from app.services.async_drive_service import AsyncGoogleDriveService  # noqa: E402
+from app.services.drive_service import GoogleDriveService  # noqa: E402
+from config import Config  # noqa: E402
+from fake_drive import FakeDrive  # noqa: E402
+
+CONTEUDO = os.urandom(256 * 1024)
+
+
+def medir_sincrono(url: str) -> float:
+    servico = GoogleDriveService(api_endpoint=url)
+    inicio = time.perf_counter()
+    for item in servico.list_pending_images("entrada"):
+        conteudo = servico.download_file(item["id"])
+        servico.upload_docx(io.BytesIO(conteudo), f"{item['name']}.docx", "saida")
+    return time.perf_counter() - inicio
+
+
+async def _transferir(servico: AsyncGoogleDriveService, item) -> None:
+    conteudo = await servico.download_file(item["id"])
+    await servico.upload_docx(io.BytesIO(conteudo), f"{item['name']}.docx", "saida")
+
+
+async def _medir_assincrono(servico: AsyncGoogleDriveService) -> float:
+    inicio = time.perf_counter()
+    itens = await servico.list_pending_images("entrada")
+    await asyncio.gather(*(_transferir(servico, item) for item in itens))
+    return time.perf_counter() - inicio
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latencia = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    quedas = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    logging.disable(logging.WARNING)
+
+    with FakeDrive(latencia=latencia, quedas=quedas, semente=42) as drive:
+        for i in range(quantidade):
+            drive.adicionar_arquivo("entrada", f"redacao_{i:03d}.jpg", CONTEUDO)
+
+        tempo_sincrono = medir_sincrono(drive.url)
+
+        servico = AsyncGoogleDriveService(api_endpoint=drive.url)
+        try:
+            tempo_assincrono = asyncio.run(_medir_assincrono(servico))
+        finally:
+            servico.fechar()
+
+    print(
+        f"{quantidade} downloads + {quantidade} uploads de "
+        f"{len(CONTEUDO) // 1024} KB, latência {latencia * 1000:.0f} ms"
+    )
+    if quedas:
+        print(f"  quedas simuladas: {drive.quedas_simuladas}")
+    print(f"  síncrono   : {tempo_sincrono:.2f}s")
+    print(
+        f"  assíncrono : {tempo_assincrono:.2f}s "
+        f"({Config.DRIVE_MAX_CONEXOES} conexões)"
+    )
+    print(f"  speedup    : {tempo_sincrono / tempo_assincrono:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Tempo de inicialização (importação) dos scripts de linha de comando.
+
+Cada script é carregado num processo novo com `python -X importtime`, sem
+executar o main(), e o resultado mostra o tempo total até o script estar
+pronto e quais pacotes mais pesaram. Serve para conferir que SDKs pesados
+(google-generativeai, googleapiclient, Pillow, python-docx) só são importados
+quando usados, o que importa para o lote agendado no cron e para o health
+check em contêineres pequenos.
+
+Uso:
+    python benchmarks/bench_importacao.py [SCRIPTS] [--repeticoes 5]
+        [--detalhar 10]
+
+    ex.: python benchmarks/bench_importacao.py corrigir_em_lote.py,health_check.py
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = (
+    "corrigir_em_lote.py",
+    "health_check.py",
+    "corrigir_pasta.py",
+    "trabalhador_fila.py",
+)
+
+# Carrega o script como módulo comum: as importações rodam, o main() não
+CARREGAR_SCRIPT = (
+    "import runpy, sys, time; inicio = time.perf_counter(); "
+    "runpy.run_path(sys.argv[1], run_name='medicao'); "
+    "print(f'total_ms={(time.perf_counter() - inicio) * 1000:.1f}')"
+)
+
+
+def medir(script):
+    """
+    Carrega o script num processo novo e retorna o tempo total (ms) e o tempo
+    próprio de cada módulo importado (µs), lido da saída do -X importtime.
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CARREGAR_SCRIPT, script],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"{script} falhou ao carregar:\n{processo.stderr[-2000:]}")
+
+    total = float(processo.stdout.strip().splitlines()[-1].split("=")[1])
+    proprio = {}
+    for linha in processo.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not linha.startswith("import time:") or "imported package" in linha:
+            continue
+        tempo_proprio, _, modulo = linha[len("import time:") :].split("|")
+        proprio[modulo.strip()] = int(tempo_proprio)
+    return total, proprio
+
+
+def por_pacote(proprio):
+    """Soma o tempo próprio dos módulos por pacote de primeiro nível (ms)."""
+    pacotes = defaultdict(float)
+    for modulo, micros in proprio.items():
+        pacotes[modulo.split(".")[0]] += micros / 1000
+    return sorted(pacotes.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scripts", nargs="?", default=",".join(SCRIPTS))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument(
+        "--detalhar", type=int, default=8, help="pacotes mostrados por script"
+    )
+    args = parser.parse_args()
+
+    for script in args.scripts.split(","):
+        # A primeira execução também compila os .pyc; fica fora da conta
+        medir(script)
+        medicoes = [medir(script) for _ in range(max(1, args.repeticoes))]
+        totais = sorted(total for total, _ in medicoes)
+        # Detalhamento da execução mediana
+        _, proprio = min(
+            medicoes, key=lambda m: abs(m[0] - statistics.median(totais))
+        )
+
+        print(
+            f"\n{script}: mediana {statistics.median(totais):.0f} ms "
+            f"(mín. {totais[0]:.0f} ms, {len(proprio)} módulos)"
+        )
+        for pacote, ms in por_pacote(proprio)[: args.detalhar]:
+            print(f"    {pacote:<28}{ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
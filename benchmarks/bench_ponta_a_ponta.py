@@ -0,0 +1,181 @@
+"""
+Benchmark ponta a ponta do lote do Drive, sem rede e sem custo.
+
+Roda o caminho real do `corrigir_em_lote.py --direto` (download → IA →
+relatório .docx → upload) contra o Drive fake (fake_drive.FakeDrive) e o
+modelo fake (fake_gemini.ModeloFake), com 10, 100 e 1.000 redações, e mede:
+
+- vazão (redações por segundo);
+- p95 da latência de cada redação (do início do download ao fim do upload,
+  a partir das métricas por etapa);
+- pico de memória (RSS) do processo e dos processos de renderização.
+
+Cada quantidade roda num processo separado, para o pico de memória de uma não
+contaminar a outra. Serve de linha de base para comparar mudanças de
+desempenho.
+
+Uso:
+    python benchmarks/bench_ponta_a_ponta.py [QUANTIDADES] [--latencia-ms 800]
+        [--p95-ms 2500] [--erros 0.02]
+
+    ex.: python benchmarks/bench_ponta_a_ponta.py 10,100,1000
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+
+from PIL import Image  # noqa: E402
+
+from app.services import ai_service  # noqa: E402
+from app.services.metricas_service import percentil  # noqa: E402
+from config import Config  # noqa: E402
+from fake_drive import FakeDrive  # noqa: E402
+from fake_gemini import ModeloFake, latencia_lognormal  # noqa: E402
+
+
+def foto_redacao() -> bytes:
+    """Foto sintética com ruído (3 MP, como uma foto de celular reduzida)."""
+    imagem = Image.effect_noise((1500, 2000), 40).convert("RGB")
+    buffer = io.BytesIO()
+    imagem.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def latencias_por_redacao(caminho_jsonl):
+    """Do início da primeira etapa ao fim da última, por redação (segundos)."""
+    inicio = defaultdict(lambda: float("inf"))
+    fim = defaultdict(float)
+    with open(caminho_jsonl, encoding="utf-8") as f:
+        for linha in f:
+            span = json.loads(linha)
+            redacao = span.get("redacao")
+            if redacao is None:
+                continue
+            comeco = span["ts"] - span["duracao_ms"] / 1000
+            inicio[redacao] = min(inicio[redacao], comeco)
+            fim[redacao] = max(fim[redacao], span["ts"])
+    return sorted(fim[redacao] - inicio[redacao] for redacao in fim)
+
+
+def executar(quantidade, args):
+    """Roda um lote (no processo atual) e retorna as medições."""
+    logging.disable(logging.INFO)
+    metricas = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False).name
+
+    # Só o caminho de processamento: sem cache, ledger nem limites de cota
+    os.environ["GEMINI_API_KEY"] = "teste"
+    Config.CACHE_CORRECOES_ATIVO = False
+    Config.CONTEXTO_CACHE_ATIVO = False
+    Config.LEDGER_ATIVO = False
+    Config.GEMINI_RPM = Config.GEMINI_TPM = 10**9
+    Config.METRICAS_ATIVO = True
+    Config.METRICAS_JSONL_PATH = metricas
+    Config.DRIVE_FOLDER_INPUT_ID = "entrada"
+    Config.DRIVE_FOLDER_OUTPUT_ID = "saida"
+
+    modelo = ModeloFake(
+        latencia=latencia_lognormal(args.latencia_ms / 1000, args.p95_ms / 1000),
+        taxa_erro=args.erros,
+        semente=42,
+    )
+    ai_service.obter_modelo = lambda *_, **__: modelo
+
+    spec = importlib.util.spec_from_file_location(
+        "corrigir_em_lote", os.path.join(RAIZ, "corrigir_em_lote.py")
+    )
+    corrigir_em_lote = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(corrigir_em_lote)
+
+    foto = foto_redacao()
+    with FakeDrive() as drive:
+        for i in range(quantidade):
+            drive.adicionar_arquivo("entrada", f"redacao_{i:04d}.jpg", foto)
+        Config.DRIVE_API_ENDPOINT = drive.url
+
+        inicio = time.perf_counter()
+        corrigir_em_lote.main_direto()
+        tempo = time.perf_counter() - inicio
+        corrigidas = len(drive.arquivos_na_pasta("saida"))
+
+    latencias = latencias_por_redacao(metricas)
+    os.remove(metricas)
+    return {
+        "quantidade": quantidade,
+        "corrigidas": corrigidas,
+        "tempo": tempo,
+        "p95": percentil(latencias, 95),
+        "chamadas": modelo.chamadas,
+        "erros": modelo.erros,
+        # ru_maxrss em KB no Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_filhos_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("quantidades", nargs="?", default="10,100,1000")
+    parser.add_argument("--latencia-ms", type=float, default=800)
+    parser.add_argument("--p95-ms", type=float, default=2500)
+    parser.add_argument("--erros", type=float, default=0.02)
+    parser.add_argument("--executar", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        print(json.dumps(executar(args.executar, args)))
+        return
+
+    print(
+        f"Modelo fake: latência mediana {args.latencia_ms:.0f} ms, p95 "
+        f"{args.p95_ms:.0f} ms, {args.erros:.0%} de erros 503; "
+        f"até {Config.GEMINI_CONCORRENCIA_MAX} chamadas simultâneas"
+    )
+    print(
+        f"{'redações':>9}{'corrigidas':>11}{'tempo (s)':>11}{'redações/s':>12}"
+        f"{'p95 (s)':>9}{'RSS (MB)':>10}{'RSS docx':>10}"
+    )
+    for quantidade in (int(q) for q in args.quantidades.split(",")):
+        processo = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--executar",
+                str(quantidade),
+                "--latencia-ms",
+                str(args.latencia_ms),
+                "--p95-ms",
+                str(args.p95_ms),
+                "--erros",
+                str(args.erros),
+            ],
+            capture_output=True,
+            text=True,
+        )
+        if processo.returncode != 0:
+            print(processo.stderr[-2000:])
+            sys.exit(processo.returncode)
+
+        r = json.loads(processo.stdout.strip().splitlines()[-1])
+        print(
+            f"{r['quantidade']:>9}{r['corrigidas']:>11}{r['tempo']:>11.2f}"
+            f"{r['corrigidas'] / r['tempo']:>12.2f}{r['p95']:>9.2f}"
+            f"{r['rss_mb']:>10.0f}{r['rss_filhos_mb']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
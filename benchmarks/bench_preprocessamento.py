@@ -0,0 +1,108 @@
+"""
+Benchmark do pré-processamento de imagens (app.services.image_service).
+
+Compara, para cada imagem, o payload que seria enviado ao Gemini sem
+pré-processamento (a imagem PIL convertida pelo SDK em WebP sem perdas) com o
+payload normalizado/recodificado, incluindo o tempo gasto em cada caminho.
+
+Uso:
+    python benchmarks/bench_preprocessamento.py [PASTA_DE_IMAGENS]
+
+Sem pasta, gera uma foto sintética de 4000x3000 (12 MP) para a medição.
+"""
+
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app.services.image_service import (  # noqa: E402
+    parametros_preprocessamento,
+    preprocessar_imagem,
+)
+from config import Config  # noqa: E402
+
+
+def gerar_foto_sintetica() -> bytes:
+    """Cria uma 'foto' de folha pautada com texto, em 12 MP."""
+    img = Image.new("RGB", (4000, 3000), (235, 232, 220))
+    desenho = ImageDraw.Draw(img)
+    for y in range(150, 3000, 90):
+        desenho.line([(100, y), (3900, y)], fill=(150, 170, 200), width=3)
+        linha = "Texto manuscrito da redação " * 12
+        desenho.text((140, y - 60), linha, fill=(20, 20, 60))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def carregar_imagens(pasta: str):
+    for nome in sorted(os.listdir(pasta)):
+        if nome.lower().endswith((".png", ".jpg", ".jpeg")):
+            with open(os.path.join(pasta, nome), "rb") as f:
+                yield nome, f.read()
+
+
+def caminho_sem_preprocessamento(conteudo: bytes):
+    """Reproduz o que o SDK faz com uma imagem PIL em memória."""
+    inicio = time.perf_counter()
+    img = Image.open(io.BytesIO(conteudo))
+    buffer = io.BytesIO()
+    img.save(buffer, format="webp", lossless=True)
+    return len(buffer.getvalue()), (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    if len(sys.argv) > 1:
+        imagens = list(carregar_imagens(sys.argv[1]))
+    else:
+        imagens = [("sintetica_12mp.jpg", gerar_foto_sintetica())]
+
+    parametros = parametros_preprocessamento() or {
+        "max_lado": Config.IMG_MAX_LADO,
+        "escala_cinza": Config.IMG_ESCALA_CINZA,
+        "formato": Config.IMG_FORMATO,
+        "qualidade": Config.IMG_QUALIDADE,
+    }
+    print(f"Parâmetros: {parametros}\n")
+    print(
+        f"{'arquivo':30} {'original':>10} {'sdk(webp)':>10} {'ms':>7} "
+        f"{'preproc':>10} {'ms':>7}"
+    )
+
+    tamanhos_sdk, tamanhos_pre, tempos_sdk, tempos_pre = [], [], [], []
+    for nome, conteudo in imagens:
+        tamanho_sdk, tempo_sdk = caminho_sem_preprocessamento(conteudo)
+        _, estatisticas = preprocessar_imagem(conteudo, **parametros)
+
+        tamanhos_sdk.append(tamanho_sdk)
+        tempos_sdk.append(tempo_sdk)
+        tamanhos_pre.append(estatisticas["bytes_finais"])
+        tempos_pre.append(estatisticas["tempo_ms"])
+
+        print(
+            f"{nome[:30]:30} {len(conteudo) / 1024:9.0f}K {tamanho_sdk / 1024:9.0f}K "
+            f"{tempo_sdk:7.0f} {estatisticas['bytes_finais'] / 1024:9.0f}K "
+            f"{estatisticas['tempo_ms']:7.0f}"
+        )
+
+    print(
+        f"\nPayload médio: {statistics.mean(tamanhos_sdk) / 1024:.0f} KB → "
+        f"{statistics.mean(tamanhos_pre) / 1024:.0f} KB "
+        f"({1 - sum(tamanhos_pre) / sum(tamanhos_sdk):.0%} menor)"
+    )
+    print(
+        f"Tempo médio de preparo: {statistics.mean(tempos_sdk):.0f} ms → "
+        f"{statistics.mean(tempos_pre):.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
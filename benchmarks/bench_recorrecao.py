@@ -0,0 +1,117 @@
+"""
+Benchmark da política de novas tentativas da correção (app.services.ai_service).
+
+Simula um modelo que às vezes falha na comunicação, corta a resposta no meio
+ou devolve uma competência com nota fora da escala, e compara:
+
+- repetir tudo: qualquer problema repete a correção inteira;
+- recorreção parcial: só as competências com problema são pedidas de novo.
+
+Mede chamadas e tokens de saída por redação corrigida e redações perdidas.
+
+Uso:
+    python benchmarks/bench_recorrecao.py [QUANTIDADE] [PROB_COMPETENCIA]
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from google.api_core import exceptions as google_exceptions  # noqa: E402
+
+from app.services import ai_service  # noqa: E402
+from config import Config  # noqa: E402
+from fake_gemini import CORRECAO_PADRAO, RespostaFake  # noqa: E402
+
+# Probabilidades de cada tipo de falha por chamada
+PROB_TRANSPORTE = 0.03
+PROB_TRUNCADA = 0.05
+
+
+class ModeloSimulado:
+    """Substitui o GenerativeModel, contando chamadas e tokens de saída."""
+
+    def __init__(self, estatisticas, sorteio, prob_competencia, parametros):
+        self.estatisticas = estatisticas
+        self.sorteio = sorteio
+        self.prob_competencia = prob_competencia
+        self.schema = parametros["response_schema"]
+
+    def generate_content(self, conteudo, stream=False):
+        self.estatisticas["chamadas"] += 1
+        if self.sorteio.random() < PROB_TRANSPORTE:
+            raise google_exceptions.DeadlineExceeded("tempo esgotado (simulado)")
+
+        if self.schema is not ai_service.PARAMETROS_GERACAO["response_schema"]:
+            # Recorreção parcial: só as competências pedidas no schema
+            dados = {
+                competencia: CORRECAO_PADRAO["analise_competencias"][competencia]
+                for competencia in self.schema["required"]
+            }
+        else:
+            dados = json.loads(json.dumps(CORRECAO_PADRAO))
+            if self.sorteio.random() < self.prob_competencia:
+                competencia = self.sorteio.choice(ai_service.COMPETENCIAS)
+                dados["analise_competencias"][competencia]["nota"] = 100
+
+        texto = json.dumps(dados, ensure_ascii=False)
+        if self.sorteio.random() < PROB_TRUNCADA:
+            texto = texto[: len(texto) // 2]
+        self.estatisticas["tokens_saida"] += len(texto) // 4
+        return RespostaFake(texto)
+
+
+def medir(parcial, quantidade, prob_competencia):
+    estatisticas = {"chamadas": 0, "tokens_saida": 0}
+    sorteio = random.Random(42)
+    ai_service.obter_modelo = lambda nome, parametros, contexto=None: (
+        ModeloSimulado(estatisticas, sorteio, prob_competencia, parametros)
+    )
+    Config.IA_RECORRECAO_PARCIAL = parcial
+
+    corrigidas = 0
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        if ai_service.analisar_redacao_em_memoria(b"\xff", "prompt", False):
+            corrigidas += 1
+    return corrigidas, estatisticas, time.perf_counter() - inicio
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prob_competencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    logging.disable(logging.CRITICAL)
+
+    # Sem cotas, cache nem pré-processamento: só a política de tentativas
+    Config.GEMINI_RPM = Config.GEMINI_TPM = 10**9
+    Config.CACHE_CORRECOES_ATIVO = False
+    Config.CONTEXTO_CACHE_ATIVO = False
+    ai_service.preparar_para_envio = lambda imagem: {
+        "mime_type": "image/jpeg",
+        "data": imagem,
+    }
+
+    print(
+        f"{quantidade} redações; falhas por chamada: comunicação "
+        f"{PROB_TRANSPORTE:.0%}, truncada {PROB_TRUNCADA:.0%}, competência "
+        f"fora da escala {prob_competencia:.0%}; "
+        f"{Config.IA_TENTATIVAS_RESPOSTA} tentativas"
+    )
+    for nome, parcial in (("repetir tudo", False), ("recorreção parcial", True)):
+        corrigidas, estatisticas, tempo = medir(parcial, quantidade, prob_competencia)
+        print(
+            f"  {nome:<19}: {estatisticas['chamadas'] / corrigidas:.3f} chamadas e "
+            f"{estatisticas['tokens_saida'] / corrigidas:.0f} tokens de saída por "
+            f"redação, {quantidade - corrigidas} perdidas ({tempo:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
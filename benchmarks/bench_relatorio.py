@@ -0,0 +1,178 @@
+"""
+Benchmark da geração de relatórios .docx (app.services.report_service).
+
+Compara a renderização com o template compilado contra:
+
+- a linha de base: o código original do projeto (substituição placeholder a
+  placeholder, run a run, e Document.save a cada relatório), copiado abaixo;
+- o caminho sem compilação: o motor de substituição atual, mas abrindo o
+  template do disco e percorrendo o documento inteiro a cada relatório.
+
+Também confere que as partes do pacote geradas pelo template compilado são
+idênticas às do caminho sem compilação.
+
+Uso:
+    python benchmarks/bench_relatorio.py [QUANTIDADE]
+"""
+
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+from zipfile import ZipFile
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from docx import Document  # noqa: E402
+
+from app.services import report_service  # noqa: E402
+from config import Config  # noqa: E402
+
+DADOS_EXEMPLO = {
+    "nome_aluno": "Maria da Silva",
+    "tema_redacao": "Desafios para a valorização de comunidades tradicionais",
+    "ano_turma": "3º Ano Ensino Médio",
+    "bimestre": "1º Bimestre",
+    "nota_final": 760,
+    "comentarios_gerais": "Texto bem estruturado, com repertório pertinente. " * 5,
+    "alerta_originalidade": None,
+    "analise_competencias": {
+        f"c{i}": {"nota": 40 * (i % 5 + 1), "analise": "**Análise** detalhada. " * 20}
+        for i in range(1, 6)
+    },
+}
+
+
+# --- Linha de base: código original do report_service ---
+def _substituir_original(paragrafo, substituicoes):
+    texto_completo = "".join(run.text for run in paragrafo.runs)
+    if not any(placeholder in texto_completo for placeholder in substituicoes):
+        return
+
+    texto_novo = texto_completo
+    for placeholder, valor in substituicoes.items():
+        if placeholder in texto_novo:
+            texto_novo = texto_novo.replace(placeholder, str(valor))
+    if texto_novo == texto_completo:
+        return
+
+    formato = None
+    if paragrafo.runs:
+        primeiro = paragrafo.runs[0]
+        formato = (
+            primeiro.bold,
+            primeiro.italic,
+            primeiro.underline,
+            primeiro.font.name,
+            primeiro.font.size,
+        )
+    for run in paragrafo.runs:
+        run.text = ""
+    novo_run = paragrafo.add_run(texto_novo)
+    if formato:
+        novo_run.bold, novo_run.italic, novo_run.underline = formato[:3]
+        if formato[3]:
+            novo_run.font.name = formato[3]
+        if formato[4]:
+            novo_run.font.size = formato[4]
+
+
+def _tabela_original(tabela, substituicoes):
+    for linha in tabela.rows:
+        for celula in linha.cells:
+            for paragrafo in celula.paragraphs:
+                _substituir_original(paragrafo, substituicoes)
+
+
+def renderizar_linha_de_base(dados):
+    """Caminho original, antes do motor de substituição e da compilação."""
+    document = Document(Config.TEMPLATE_DOCX_PATH)
+    substituicoes = report_service.montar_substituicoes(dados)
+
+    for paragrafo in document.paragraphs:
+        _substituir_original(paragrafo, substituicoes)
+    for tabela in document.tables:
+        _tabela_original(tabela, substituicoes)
+    for section in document.sections:
+        for parte in (section.header, section.footer):
+            for paragrafo in parte.paragraphs:
+                _substituir_original(paragrafo, substituicoes)
+            for tabela in parte.tables:
+                _tabela_original(tabela, substituicoes)
+    for element in document._element.xpath(".//w:t"):
+        texto = element.text or ""
+        novo = texto
+        for placeholder, valor in substituicoes.items():
+            if placeholder in novo:
+                novo = novo.replace(placeholder, str(valor))
+        if novo != texto:
+            element.text = novo
+
+    buffer = BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+# --- Motor atual ---
+def renderizar_sem_compilacao(dados):
+    """Caminho antigo: abre o template e percorre tudo a cada relatório."""
+    motor = report_service.MotorSubstituicao(
+        report_service.montar_substituicoes(dados)
+    )
+    document = Document(Config.TEMPLATE_DOCX_PATH)
+
+    for paragrafo in report_service._iterar_paragrafos(document):
+        report_service.substituir_em_paragrafo(paragrafo, motor)
+
+    for element in document._element.xpath(".//w:t"):
+        report_service.substituir_em_texto(element, motor)
+
+    buffer = BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def partes(buffer):
+    # As partes regeneradas ficam no fim do zip compilado: compara pelo nome
+    with ZipFile(buffer) as z:
+        return {nome: z.read(nome) for nome in z.namelist()}
+
+
+def medir(funcao, quantidade):
+    inicio = time.perf_counter()
+    for _ in range(quantidade):
+        funcao(DADOS_EXEMPLO)
+    return time.perf_counter() - inicio
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    logging.disable(logging.INFO)
+
+    identicos = partes(renderizar_sem_compilacao(DADOS_EXEMPLO)) == partes(
+        report_service.preencher_e_gerar_docx(DADOS_EXEMPLO)
+    )
+    print(f"Partes do pacote idênticas ao caminho sem compilação: {identicos}")
+
+    tempos = [
+        ("linha de base", medir(renderizar_linha_de_base, quantidade)),
+        ("sem compilação", medir(renderizar_sem_compilacao, quantidade)),
+        ("compilado", medir(report_service.preencher_e_gerar_docx, quantidade)),
+    ]
+    base = tempos[0][1]
+
+    print(f"{quantidade} relatórios")
+    for nome, tempo in tempos:
+        print(
+            f"  {nome:<15}: {tempo:.2f}s ({tempo / quantidade * 1000:.1f} "
+            f"ms/relatório, {tempo / base:.0%} da linha de base)"
+        )
+
+
+if __name__ == "__main__":
+    main()
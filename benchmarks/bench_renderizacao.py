@@ -0,0 +1,69 @@
+"""
+Benchmark da geração de relatórios em processos paralelos
+(app.services.report_service.RenderizadorRelatorios).
+
+Mede a vazão (relatórios por segundo) com 1, 2, 4, ... processos, até o
+número de núcleos da máquina, e confere que os documentos gerados no pool
+têm as mesmas partes XML que os gerados no próprio processo. O tempo de
+criação dos processos e de compilação do template fica de fora da medição.
+
+Uso:
+    python benchmarks/bench_renderizacao.py [QUANTIDADE] [MAX_PROCESSOS]
+"""
+
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from app.services import report_service  # noqa: E402
+from bench_relatorio import DADOS_EXEMPLO, partes  # noqa: E402
+
+
+def medir(processos, quantidade):
+    with report_service.RenderizadorRelatorios(processos) as renderizador:
+        # Aquecimento: sobe os processos e compila o template em cada um
+        for futuro in [renderizador.enviar(DADOS_EXEMPLO) for _ in range(processos)]:
+            futuro.result()
+
+        inicio = time.perf_counter()
+        futuros = [renderizador.enviar(DADOS_EXEMPLO) for _ in range(quantidade)]
+        blobs = [futuro.result() for futuro in futuros]
+        tempo = time.perf_counter() - inicio
+    return tempo, blobs[0]
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    nucleos = os.cpu_count() or 1
+    maximo = int(sys.argv[2]) if len(sys.argv) > 2 else nucleos
+    logging.disable(logging.INFO)
+
+    contagens = []
+    processos = 1
+    while processos < maximo:
+        contagens.append(processos)
+        processos *= 2
+    contagens.append(maximo)
+
+    referencia = partes(report_service.preencher_e_gerar_docx(DADOS_EXEMPLO))
+    print(f"{quantidade} relatórios; {nucleos} núcleos")
+
+    base = None
+    for processos in contagens:
+        tempo, blob = medir(processos, quantidade)
+        base = base or tempo
+        print(
+            f"  {processos:>2} processo(s): {quantidade / tempo:7.1f} relatórios/s "
+            f"(aceleração {base / tempo:.2f}x, "
+            f"partes idênticas: {partes(BytesIO(blob)) == referencia})"
+        )
+
+
+if __name__ == "__main__":
+    main()
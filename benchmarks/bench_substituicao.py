@@ -0,0 +1,98 @@
+"""
+Micro-benchmark do motor de substituição de placeholders
+(app.services.report_service.MotorSubstituicao).
+
+Compara, sobre os textos reais de assets/template.docx, a implementação
+anterior (um `in` + `replace` por placeholder, reprocessando o texto já
+substituído) com o motor de passada única baseado em expressão regular.
+
+Uso:
+    python benchmarks/bench_substituicao.py [REPETICOES]
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from docx import Document  # noqa: E402
+
+from app.services import report_service  # noqa: E402
+from config import Config  # noqa: E402
+
+DADOS_EXEMPLO = {
+    "nome_aluno": "Maria da Silva",
+    "tema_redacao": "Desafios para a valorização de comunidades tradicionais",
+    "ano_turma": "3º Ano Ensino Médio",
+    "bimestre": "1º Bimestre",
+    "nota_final": 760,
+    "comentarios_gerais": "Texto bem estruturado, com repertório pertinente. " * 5,
+    "analise_competencias": {
+        f"c{i}": {"nota": 160, "analise": "Análise detalhada. " * 20}
+        for i in range(1, 6)
+    },
+}
+
+
+def substituir_anterior(texto, substituicoes):
+    """Implementação anterior: uma varredura por placeholder."""
+    if not any(placeholder in texto for placeholder in substituicoes.keys()):
+        return texto
+    texto_novo = texto
+    for placeholder, valor in substituicoes.items():
+        if placeholder in texto_novo:
+            texto_novo = texto_novo.replace(placeholder, str(valor))
+    return texto_novo
+
+
+def textos_do_template():
+    """Textos percorridos na renderização: parágrafos e elementos <w:t>."""
+    document = Document(Config.TEMPLATE_DOCX_PATH)
+    textos = [
+        "".join(run.text for run in paragrafo.runs)
+        for paragrafo in report_service._iterar_paragrafos(document)
+    ]
+    textos += [t.text or "" for t in document._element.xpath(".//w:t")]
+    return textos
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logging.disable(logging.INFO)
+
+    substituicoes = report_service.montar_substituicoes(DADOS_EXEMPLO)
+    textos = textos_do_template()
+    com_placeholder = sum("{{" in texto for texto in textos)
+    print(
+        f"{len(textos)} textos no template ({com_placeholder} com placeholders), "
+        f"{len(substituicoes)} placeholders, {repeticoes} repetições"
+    )
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado_anterior = [substituir_anterior(t, substituicoes) for t in textos]
+    tempo_anterior = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        motor = report_service.MotorSubstituicao(substituicoes)
+        resultado_motor = [motor.substituir(t) for t in textos]
+    tempo_motor = time.perf_counter() - inicio
+
+    print(f"Resultados idênticos: {resultado_anterior == resultado_motor}")
+    print(f"  anterior : {tempo_anterior / repeticoes * 1000:.3f} ms/documento")
+    print(f"  motor    : {tempo_motor / repeticoes * 1000:.3f} ms/documento")
+    print(f"  ganho    : {tempo_anterior / tempo_motor:.1f}x")
+
+    motor = report_service.MotorSubstituicao({"{{NOME_ALUNO}}": "Maria"})
+    for texto in textos:
+        motor.substituir(texto)
+    print(f"Placeholders sem valor (mapeando só NOME_ALUNO): {len(motor.desconhecidos)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Servidor HTTP local que imita o subconjunto da API do Google Drive v3 usado
+pelo projeto (listagem, download com Range, upload multipart e retomável),
+para testes e benchmarks sem rede.
+
+Uso como script:
+    python benchmarks/fake_drive.py [PORTA] [QUANTIDADE_DE_IMAGENS]
+
+e então:
+    DRIVE_API_ENDPOINT=http://127.0.0.1:PORTA/ python corrigir_em_lote.py
+
+Uso em código:
+    with FakeDrive(latencia=0.05) as drive:
+        drive.adicionar_arquivo("entrada", "foto.jpg", conteudo)
+        servico = AsyncGoogleDriveService(api_endpoint=drive.url)
+"""
+
+import email
+import email.policy
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+)
+
+from config import Config  # noqa: E402
+
+_PASTA_NA_QUERY = re.compile(r"'([^']+)' in parents")
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+_CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+# Campos devolvidos na listagem (a API real filtra pelo parâmetro "fields")
+_CAMPOS_LISTAGEM = ("id", "name", "md5Checksum", "size", "modifiedTime")
+
+
+class FakeDrive:
+    """
+    Drive em memória servido por um ThreadingHTTPServer.
+
+    Args:
+        porta (int): Porta local (0 escolhe uma livre).
+        latencia (float): Atraso, em segundos, aplicado a cada requisição
+            (simula a latência da rede).
+        quedas (float): Probabilidade de a conexão cair no meio de um
+            download ou de um pedaço de upload (rede instável), sem resposta.
+        respostas_perdidas (float): Probabilidade de um pedaço de upload ser
+            gravado e a conexão cair antes da resposta (o cliente não sabe se
+            o pedaço, ou o upload inteiro, foi confirmado).
+        semente (Optional[int]): Semente do sorteio das quedas.
+
+    Attributes:
+        pico_simultaneas (int): Maior número de requisições atendidas ao mesmo
+            tempo (mostra o limite de conexões do cliente).
+        falhas_listagem (List[Optional[int]]): Respostas das próximas
+            requisições de listagem, em ordem: um status HTTP de erro ou None
+            para responder normalmente (ex.: [None, 503] entrega a primeira
+            página e faz a segunda falhar uma vez).
+    """
+
+    def __init__(
+        self,
+        porta: int = 0,
+        latencia: float = 0.0,
+        quedas: float = 0.0,
+        respostas_perdidas: float = 0.0,
+        semente: Optional[int] = None,
+    ):
+        self.latencia = latencia
+        self.quedas = quedas
+        self.respostas_perdidas = respostas_perdidas
+        self.arquivos: Dict[str, Dict] = {}
+        # Sessões de upload retomável (upload_id → dados); as concluídas
+        # guardam o ID do arquivo criado, devolvido em novas consultas
+        self.sessoes: Dict[str, Dict] = {}
+        self.requisicoes = 0
+        self.conexoes = 0
+        self.quedas_simuladas = 0
+        self.simultaneas = 0
+        self.pico_simultaneas = 0
+        self.falhas_listagem: List[Optional[int]] = []
+        self._sorteio = random.Random(semente)
+        self._lock = threading.Lock()
+
+        drive = self
+
+        class Handler(_DriveHandler):
+            fake = drive
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+        self._servidor.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}/"
+
+    def adicionar_arquivo(
+        self,
+        pasta: str,
+        nome: str,
+        conteudo: bytes,
+        mime_type: str = "image/jpeg",
+        file_id: Optional[str] = None,
+    ) -> str:
+        file_id = file_id or uuid.uuid4().hex
+        with self._lock:
+            self.arquivos[file_id] = {
+                "id": file_id,
+                "name": nome,
+                "mimeType": mime_type,
+                "parents": [pasta],
+                "conteudo": conteudo,
+                "md5Checksum": hashlib.md5(conteudo).hexdigest(),
+                "size": str(len(conteudo)),
+                "modifiedTime": time.strftime(
+                    "%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()
+                ),
+                "trashed": False,
+            }
+        return file_id
+
+    def arquivos_na_pasta(self, pasta: str) -> List[Dict]:
+        with self._lock:
+            return [a for a in self.arquivos.values() if pasta in a["parents"]]
+
+    def proxima_falha_listagem(self) -> Optional[int]:
+        with self._lock:
+            return self.falhas_listagem.pop(0) if self.falhas_listagem else None
+
+    def sortear_queda(self) -> bool:
+        return self._sortear(self.quedas)
+
+    def sortear_resposta_perdida(self) -> bool:
+        return self._sortear(self.respostas_perdidas)
+
+    def _sortear(self, probabilidade: float) -> bool:
+        with self._lock:
+            if probabilidade and self._sorteio.random() < probabilidade:
+                self.quedas_simuladas += 1
+                return True
+            return False
+
+    def iniciar(self) -> "FakeDrive":
+        self._thread = threading.Thread(
+            target=self._servidor.serve_forever, name="fake-drive", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> "FakeDrive":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+
+class _DriveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeDrive
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.fake._lock:
+            self.fake.conexoes += 1
+
+    # --- Respostas ---
+    def _responder(self, status: int, corpo: bytes, tipo: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, dados: Dict, status: int = 200) -> None:
+        self._responder(status, json.dumps(dados).encode(), "application/json")
+
+    def _erro(self, status: int, mensagem: str) -> None:
+        self._json({"error": {"code": status, "message": mensagem}}, status)
+
+    def _ler_corpo(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _cair(self) -> None:
+        # Fecha a conexão sem responder, como uma queda da rede
+        self.close_connection = True
+
+    def handle_one_request(self):
+        self._atendendo = False
+        try:
+            super().handle_one_request()
+        finally:
+            if self._atendendo:
+                with self.fake._lock:
+                    self.fake.simultaneas -= 1
+
+    def _inicio(self):
+        # Conta a partir da linha de requisição lida: conexões ociosas
+        # (keep-alive) aguardando o próximo pedido não entram no pico
+        self._atendendo = True
+        with self.fake._lock:
+            self.fake.requisicoes += 1
+            self.fake.simultaneas += 1
+            self.fake.pico_simultaneas = max(
+                self.fake.pico_simultaneas, self.fake.simultaneas
+            )
+        if self.fake.latencia:
+            time.sleep(self.fake.latencia)
+        url = urlparse(self.path)
+        return url.path, {k: v[0] for k, v in parse_qs(url.query).items()}
+
+    # --- Rotas ---
+    def do_GET(self):
+        caminho, params = self._inicio()
+
+        if caminho == "/drive/v3/files":
+            return self._listar(params)
+
+        m = re.fullmatch(r"/drive/v3/files/([^/]+)", caminho)
+        if m and params.get("alt") == "media":
+            arquivo = self.fake.arquivos.get(m.group(1))
+            if not arquivo:
+                return self._erro(404, "File not found")
+            if self.fake.sortear_queda():
+                return self._cair()
+            return self._midia(arquivo)
+
+        self._erro(404, f"Rota não suportada: {caminho}")
+
+    def do_POST(self):
+        caminho, params = self._inicio()
+        corpo = self._ler_corpo()
+
+        if caminho == "/upload/drive/v3/files":
+            if params.get("uploadType") == "multipart":
+                return self._upload_multipart(corpo)
+            if params.get("uploadType") == "resumable":
+                return self._iniciar_retomavel(corpo)
+
+        self._erro(404, f"Rota não suportada: {caminho}")
+
+    def do_PUT(self):
+        caminho, params = self._inicio()
+        corpo = self._ler_corpo()
+
+        if caminho == "/upload/drive/v3/files" and "upload_id" in params:
+            return self._pedaco_retomavel(params["upload_id"], corpo)
+
+        self._erro(404, f"Rota não suportada: {caminho}")
+
+    def _midia(self, arquivo: Dict) -> None:
+        conteudo = arquivo["conteudo"]
+        faixa = _RANGE.fullmatch(self.headers.get("Range", ""))
+        if not faixa:
+            return self._responder(200, conteudo, arquivo["mimeType"])
+
+        inicio = int(faixa.group(1))
+        if inicio >= len(conteudo):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(conteudo)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        fim = min(int(faixa.group(2) or len(conteudo) - 1), len(conteudo) - 1)
+        parte = conteudo[inicio : fim + 1]
+        self.send_response(206)
+        self.send_header("Content-Type", arquivo["mimeType"])
+        self.send_header("Content-Range", f"bytes {inicio}-{fim}/{len(conteudo)}")
+        self.send_header("Content-Length", str(len(parte)))
+        self.end_headers()
+        self.wfile.write(parte)
+
+    def _iniciar_retomavel(self, corpo: bytes) -> None:
+        upload_id = uuid.uuid4().hex
+        with self.fake._lock:
+            self.fake.sessoes[upload_id] = {
+                "metadados": json.loads(corpo or b"{}"),
+                "mime_type": self.headers.get("X-Upload-Content-Type", ""),
+                "dados": bytearray(),
+            }
+        host, porta = self.server.server_address[:2]
+        self.send_response(200)
+        self.send_header(
+            "Location",
+            f"http://{host}:{porta}/upload/drive/v3/files"
+            f"?uploadType=resumable&upload_id={upload_id}",
+        )
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _pedaco_retomavel(self, upload_id: str, corpo: bytes) -> None:
+        sessao = self.fake.sessoes.get(upload_id)
+        faixa = _CONTENT_RANGE.fullmatch(self.headers.get("Content-Range", ""))
+        if not sessao or not faixa:
+            return self._erro(404, "Upload session not found")
+
+        # Sessão já concluída (a resposta final se perdeu): a API devolve o
+        # arquivo criado, sem criar outro
+        if "file_id" in sessao:
+            return self._json({"id": sessao["file_id"]})
+
+        # Pedaço recebido pela metade não é confirmado: o cliente consulta a
+        # sessão e reenvia a partir do último byte confirmado
+        if corpo and self.fake.sortear_queda():
+            return self._cair()
+
+        dados = sessao["dados"]
+        if faixa.group(1) is not None:
+            inicio = int(faixa.group(1))
+            if inicio > len(dados):
+                return self._erro(400, f"Esperado o byte {len(dados)}, veio {inicio}")
+            # Bytes já confirmados (pedaço reenviado) são ignorados, como na API
+            dados.extend(corpo[len(dados) - inicio :])
+
+        total = faixa.group(3)
+        if total != "*" and len(dados) == int(total):
+            metadados = sessao["metadados"]
+            sessao["file_id"] = self.fake.adicionar_arquivo(
+                (metadados.get("parents") or [""])[0],
+                metadados.get("name", "sem_nome"),
+                bytes(dados),
+                mime_type=sessao["mime_type"],
+            )
+
+        # Pedaço gravado, mas a conexão cai antes da resposta
+        if corpo and self.fake.sortear_resposta_perdida():
+            return self._cair()
+
+        if "file_id" in sessao:
+            return self._json({"id": sessao["file_id"]})
+
+        # 308: pedaço confirmado, o upload continua
+        self.send_response(308)
+        if dados:
+            self.send_header("Range", f"bytes=0-{len(dados) - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _listar(self, params: Dict[str, str]) -> None:
+        status = self.fake.proxima_falha_listagem()
+        if status:
+            return self._erro(status, "Falha simulada na listagem")
+
+        query = params.get("q", "")
+        pasta = _PASTA_NA_QUERY.search(query)
+        arquivos = [
+            a
+            for a in self.fake.arquivos_na_pasta(pasta.group(1) if pasta else "")
+            if not a["trashed"] and a["mimeType"] in ("image/jpeg", "image/png")
+        ]
+
+        # Paginação como na API: pageSize padrão 100, máximo 1000, e o
+        # pageToken é opaco (aqui, o deslocamento na lista)
+        tamanho = min(int(params.get("pageSize", 100)), 1000)
+        inicio = int(params.get("pageToken", 0))
+        pagina = arquivos[inicio : inicio + tamanho]
+
+        resposta = {"files": [{c: a[c] for c in _CAMPOS_LISTAGEM} for a in pagina]}
+        if inicio + tamanho < len(arquivos):
+            resposta["nextPageToken"] = str(inicio + tamanho)
+        self._json(resposta)
+
+    def _upload_multipart(self, corpo: bytes) -> None:
+        mensagem = email.message_from_bytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n"
+            + corpo,
+            policy=email.policy.HTTP,
+        )
+        metadados_parte, midia_parte = list(mensagem.iter_parts())[:2]
+        metadados = json.loads(metadados_parte.get_content())
+        file_id = self.fake.adicionar_arquivo(
+            (metadados.get("parents") or [""])[0],
+            metadados.get("name", "sem_nome"),
+            midia_parte.get_payload(decode=True),
+            mime_type=midia_parte.get_content_type(),
+        )
+        self._json({"id": file_id})
+
+
+def main():
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    drive = FakeDrive(porta=porta)
+    # Usa a pasta de entrada do .env, para rodar o lote sem ajustes
+    pasta = Config.DRIVE_FOLDER_INPUT_ID or "entrada"
+    for i in range(quantidade):
+        drive.adicionar_arquivo(pasta, f"redacao_{i:03d}.jpg", b"\xff\xd8" + bytes(64))
+
+    print(f"Fake Drive em {drive.url} ({quantidade} imagens na pasta '{pasta}')")
+    drive.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        drive.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Substitutos do Gemini para testes e benchmarks sem rede e sem custo:
+
+- FakeGemini: servidor HTTP local que imita a Batch API (Files API + jobs de
+  batchGenerateContent), para o modo batch;
+- ModeloFake: substituto em memória do genai.GenerativeModel (chamadas
+  online, com ou sem streaming), com latência e taxa de erros configuráveis.
+
+Uso como script:
+    python benchmarks/fake_gemini.py [PORTA]
+
+e então:
+    GEMINI_API_KEY=teste GEMINI_API_ENDPOINT=http://127.0.0.1:PORTA \\
+        python corrigir_em_lote.py --batch
+
+Uso em código:
+    with FakeGemini(consultas_ate_concluir=2) as gemini:
+        cliente = ClienteBatchGemini("teste", endpoint=gemini.url)
+
+    modelo = ModeloFake(latencia=latencia_lognormal(0.8, 2.5), taxa_erro=0.02)
+    ai_service.obter_modelo = lambda *args, **kwargs: modelo
+"""
+
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+from google.api_core import exceptions as google_exceptions
+
+# Correção devolvida por padrão para toda redação
+CORRECAO_PADRAO: Dict[str, Any] = {
+    "nome_aluno": "Aluno Teste",
+    "tema_redacao": "Tema de teste",
+    "data_redacao": "01/01/2025",
+    "nota_final": 600,
+    "comentarios_gerais": "Correção gerada pelo servidor fake.",
+    "alerta_originalidade": None,
+    "analise_competencias": {
+        f"c{i}": {"nota": 120, "analise": f"Análise da competência {i}."}
+        for i in range(1, 6)
+    },
+}
+
+
+def resposta_gemini(texto: str) -> Dict[str, Any]:
+    """Monta uma resposta REST do generateContent com o texto informado."""
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": texto}]},
+                "finishReason": "STOP",
+            }
+        ],
+        "usageMetadata": {"totalTokenCount": 1000},
+    }
+
+
+def responder_padrao(requisicao: Dict[str, Any]) -> Dict[str, Any]:
+    return resposta_gemini(json.dumps(CORRECAO_PADRAO, ensure_ascii=False))
+
+
+# --- Chamadas online (generateContent) ---
+class _Pedaco:
+    def __init__(self, texto: str):
+        self.text = texto
+
+
+class _Uso:
+    """Mesmos campos do usage_metadata do SDK usados pelo projeto."""
+
+    def __init__(self, entrada: int, saida: int):
+        self.prompt_token_count = entrada
+        self.candidates_token_count = saida
+        self.cached_content_token_count = 0
+        self.total_token_count = entrada + saida
+
+
+class RespostaFake:
+    """
+    Resposta do generate_content: `text` completo e, em streaming, iterável
+    em pedaços de `tamanho_pedaco` caracteres.
+    """
+
+    def __init__(
+        self,
+        texto: str,
+        usage_metadata: Optional[_Uso] = None,
+        tamanho_pedaco: int = 200,
+    ):
+        self.text = texto
+        self.usage_metadata = usage_metadata
+        self._pedacos = [
+            texto[i : i + tamanho_pedaco] for i in range(0, len(texto), tamanho_pedaco)
+        ]
+
+    def __iter__(self) -> Iterator[_Pedaco]:
+        return (_Pedaco(pedaco) for pedaco in self._pedacos)
+
+
+def latencia_lognormal(mediana: float, p95: float) -> Callable[[random.Random], float]:
+    """
+    Distribuição log-normal de latências (segundos) com a mediana e o p95
+    informados, parecida com a de chamadas reais ao modelo (cauda longa).
+    """
+    sigma = math.log(max(p95, mediana) / mediana) / 1.645 if mediana > 0 else 0.0
+    return lambda sorteio: sorteio.lognormvariate(math.log(mediana), sigma)
+
+
+class ModeloFake:
+    """
+    Substituto do genai.GenerativeModel para chamadas online.
+
+    Args:
+        correcao (Dict): JSON devolvido em toda chamada (CorrecaoRedacao).
+        latencia (Callable): Sorteia a duração de cada chamada, em segundos
+            (ex.: `latencia_lognormal`). Sem ela, responde na hora.
+        taxa_erro (float): Fração das chamadas que falham com 503 (repetidas
+            pelo agendador, como na API real).
+        tokens_entrada (int): Tokens de entrada informados no usage_metadata.
+        semente (int): Semente do sorteio de latências e erros.
+    """
+
+    def __init__(
+        self,
+        correcao: Optional[Dict[str, Any]] = None,
+        latencia: Optional[Callable[[random.Random], float]] = None,
+        taxa_erro: float = 0.0,
+        tokens_entrada: int = 2000,
+        semente: Optional[int] = None,
+    ):
+        self.texto = json.dumps(correcao or CORRECAO_PADRAO, ensure_ascii=False)
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.tokens_entrada = tokens_entrada
+        self.chamadas = 0
+        self.erros = 0
+        self._sorteio = random.Random(semente)
+        self._lock = threading.Lock()
+
+    def generate_content(self, conteudo: Any, stream: bool = False) -> RespostaFake:
+        with self._lock:
+            self.chamadas += 1
+            espera = self.latencia(self._sorteio) if self.latencia else 0.0
+            falhar = self._sorteio.random() < self.taxa_erro
+            if falhar:
+                self.erros += 1
+
+        time.sleep(espera)
+        if falhar:
+            raise google_exceptions.ServiceUnavailable("sobrecarga (simulada)")
+        uso = _Uso(self.tokens_entrada, len(self.texto) // 4)
+        return RespostaFake(self.texto, uso)
+
+
+# --- Batch API ---
+class FakeGemini:
+    """
+    Gemini em memória servido por um ThreadingHTTPServer.
+
+    Args:
+        porta (int): Porta local (0 escolhe uma livre).
+        consultas_ate_concluir (int): Quantas consultas ao job até ele terminar
+            (antes disso fica PENDING e depois RUNNING).
+        estado_final (str): Estado ao terminar (ex.: "BATCH_STATE_FAILED").
+        responder (Callable): Gera a resposta de cada requisição do batch.
+    """
+
+    def __init__(
+        self,
+        porta: int = 0,
+        consultas_ate_concluir: int = 2,
+        estado_final: str = "BATCH_STATE_SUCCEEDED",
+        responder: Callable[[Dict[str, Any]], Dict[str, Any]] = responder_padrao,
+    ):
+        self.consultas_ate_concluir = consultas_ate_concluir
+        self.estado_final = estado_final
+        self.responder = responder
+        self.arquivos: Dict[str, bytes] = {}
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+
+        gemini = self
+
+        class Handler(_GeminiHandler):
+            fake = gemini
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), Handler)
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> "FakeGemini":
+        threading.Thread(
+            target=self._servidor.serve_forever, name="fake-gemini", daemon=True
+        ).start()
+        return self
+
+    def parar(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> "FakeGemini":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
+
+    # --- Lógica dos jobs ---
+    def _concluir_job(self, job: Dict[str, Any]) -> None:
+        linhas = []
+        for linha in self.arquivos[job["entrada"]].decode("utf-8").splitlines():
+            if not linha.strip():
+                continue
+            requisicao = json.loads(linha)
+            try:
+                resultado = {"response": self.responder(requisicao["request"])}
+            except Exception as e:
+                resultado = {"error": {"code": 500, "message": str(e)}}
+            linhas.append(json.dumps({"key": requisicao.get("key"), **resultado}))
+
+        nome = f"files/{uuid.uuid4().hex[:12]}"
+        self.arquivos[nome] = ("\n".join(linhas) + "\n").encode("utf-8")
+        job["resultados"] = nome
+
+    def consultar(self, nome: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(nome)
+            if job is None:
+                return None
+
+            job["consultas"] += 1
+            if job["consultas"] >= self.consultas_ate_concluir:
+                estado = self.estado_final
+                if estado.endswith("SUCCEEDED") and "resultados" not in job:
+                    self._concluir_job(job)
+            elif job["consultas"] > 1:
+                estado = "BATCH_STATE_RUNNING"
+            else:
+                estado = "BATCH_STATE_PENDING"
+
+        recurso: Dict[str, Any] = {
+            "name": nome,
+            "metadata": {"name": nome, "state": estado},
+            "done": estado != "BATCH_STATE_PENDING"
+            and estado != "BATCH_STATE_RUNNING",
+        }
+        if "resultados" in job:
+            recurso["metadata"]["output"] = {"responsesFile": job["resultados"]}
+            recurso["response"] = {"responsesFile": job["resultados"]}
+        return recurso
+
+
+class _GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeGemini
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status: int, corpo: bytes, tipo: str, headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _json(self, dados: Dict, status: int = 200, headers=None) -> None:
+        corpo = json.dumps(dados).encode()
+        self._responder(status, corpo, "application/json", headers)
+
+    def _erro(self, status: int, mensagem: str) -> None:
+        self._json({"error": {"code": status, "message": mensagem}}, status)
+
+    def _inicio(self):
+        with self.fake._lock:
+            self.fake.requisicoes += 1
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        corpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        return url.path, params, corpo
+
+    def _autenticado(self) -> bool:
+        if self.headers.get("x-goog-api-key"):
+            return True
+        self._erro(403, "API key ausente")
+        return False
+
+    def do_POST(self):
+        caminho, params, corpo = self._inicio()
+        if not self._autenticado():
+            return
+
+        if caminho == "/upload/v1beta/files":
+            return self._upload(params, corpo)
+
+        m = re.fullmatch(r"/v1beta/(models/[^:]+):batchGenerateContent", caminho)
+        if m:
+            return self._criar_job(m.group(1), json.loads(corpo))
+
+        self._erro(404, f"Rota não suportada: {caminho}")
+
+    def do_GET(self):
+        caminho, params, _ = self._inicio()
+        if not self._autenticado():
+            return
+
+        m = re.fullmatch(r"/v1beta/(batches/[^/]+)", caminho)
+        if m:
+            recurso = self.fake.consultar(m.group(1))
+            if recurso is None:
+                return self._erro(404, "Job não encontrado")
+            return self._json(recurso)
+
+        m = re.fullmatch(r"/download/v1beta/(files/[^:]+):download", caminho)
+        if m and params.get("alt") == "media":
+            dados = self.fake.arquivos.get(m.group(1))
+            if dados is None:
+                return self._erro(404, "Arquivo não encontrado")
+            return self._responder(200, dados, "application/octet-stream")
+
+        self._erro(404, f"Rota não suportada: {caminho}")
+
+    def _upload(self, params: Dict[str, str], corpo: bytes) -> None:
+        comando = self.headers.get("X-Goog-Upload-Command", "")
+
+        if comando == "start":
+            upload_id = uuid.uuid4().hex
+            self.fake.uploads[upload_id] = json.loads(corpo or b"{}")
+            url = f"{self.fake.url}/upload/v1beta/files?upload_id={upload_id}"
+            return self._json({}, headers={"X-Goog-Upload-URL": url})
+
+        upload_id = params.get("upload_id")
+        if upload_id not in self.fake.uploads or "finalize" not in comando:
+            return self._erro(400, "Upload inválido")
+
+        self.fake.uploads.pop(upload_id)
+        nome = f"files/{uuid.uuid4().hex[:12]}"
+        self.fake.arquivos[nome] = corpo
+        self._json({"file": {"name": nome, "sizeBytes": str(len(corpo))}})
+
+    def _criar_job(self, modelo: str, corpo: Dict[str, Any]) -> None:
+        entrada = corpo["batch"]["input_config"]["file_name"]
+        if entrada not in self.fake.arquivos:
+            return self._erro(400, f"Arquivo de entrada inexistente: {entrada}")
+
+        nome = f"batches/{uuid.uuid4().hex[:12]}"
+        with self.fake._lock:
+            self.fake.jobs[nome] = {
+                "modelo": modelo,
+                "entrada": entrada,
+                "consultas": 0,
+                "criado_em": time.time(),
+            }
+        self._json(
+            {"name": nome, "metadata": {"name": nome, "state": "BATCH_STATE_PENDING"}}
+        )
+
+
+def main():
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    gemini = FakeGemini(porta=porta)
+    print(f"Fake Gemini (Batch API) em {gemini.url}")
+    gemini.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        gemini.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,121 +1,640 @@
+import argparse
+import itertools
+import json
 import os
+import sys
+import threading
+import time
 
-from config import Config
-from logger import get_logger
-from services import ai_service, report_service
-from services.drive_service import GoogleDriveService
+# Os serviços da aplicação ficam em src/ (mesmo PYTHONPATH usado pelo run.sh)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from app.core.logger import get_logger  # noqa: E402
+from app.services import ai_service, report_service  # noqa: E402
+from app.services.agrupamento_service import agrupar_redacoes, paginas  # noqa: E402
+from app.services.async_drive_service import (  # noqa: E402
+    AsyncGoogleDriveService,
+    DriveSincrono,
+)
+from app.services.drive_service import progresso_no_log  # noqa: E402
+from app.services.fila_service import (  # noqa: E402
+    ORIGEM_DRIVE,
+    STATUS_CONCLUIDA,
+    STATUS_FALHA,
+    novo_lote,
+    obter_fila,
+)
+from app.services.gemini_batch_service import (  # noqa: E402
+    ClienteBatchGemini,
+    ManifestoBatch,
+    estado_final,
+    estado_sucesso,
+    extrair_texto,
+    montar_requisicao,
+)
+from app.services.ledger_service import obter_ledger, versao_prompt  # noqa: E402
+from app.services.metricas_service import ColetorMetricas, obter_coletor  # noqa: E402
+from app.services.pipeline_service import Estagio, executar_pipeline  # noqa: E402
+from app.services.prompt_cache_service import obter_gerenciador  # noqa: E402
+from config import Config  # noqa: E402
 
 # --- Configuração de Logs ---
 logger = get_logger(__name__)
 
 
-def main():
-    logger.info("Iniciando assistente de correção em lote...")
+def baixar_paginas(drive_service, item):
+    """
+    Baixa todas as páginas da redação, na ordem. Retorna None se alguma
+    falhar (a redação não é corrigida pela metade). O andamento de arquivos
+    grandes (baixados em vários pedaços) aparece no log.
+    """
+    conteudos = []
+    for pagina in paginas(item):
+        conteudo = drive_service.download_file(
+            pagina["id"], progresso_no_log(f"Download de '{pagina['name']}'")
+        )
+        if not conteudo:
+            logger.warning(f"Falha ao baixar o arquivo '{pagina['name']}'. Pulando.")
+            return None
+        conteudos.append(conteudo)
+    return conteudos
 
-    # Garante que o diretório temporário exista
-    os.makedirs(Config.TEMP_LOTE_DIR, exist_ok=True)
 
+def main(aguardar=True):
+    """
+    Enfileira as redações novas da pasta de entrada e acompanha o lote até o
+    fim. A correção em si é feita pelos trabalhadores da fila
+    (trabalhador_fila.py), então interromper este script não perde nada.
+    """
+    logger.info("Enfileirando redações do Drive para correção...")
+
+    drive_service = None
+    try:
+        fila = obter_fila()
+        drive_service = DriveSincrono(AsyncGoogleDriveService())
+        prompt_mestre = ai_service.carregar_prompt()
+
+        # Fotos da mesma redação viram um item só antes de consultar o registro
+        items = agrupar_redacoes(
+            drive_service.iterar_imagens_pendentes(Config.DRIVE_FOLDER_INPUT_ID)
+        )
+        ledger = obter_ledger()
+        if ledger:
+            items = ledger.filtrar_pendentes(
+                items, Config.MODEL_NAME, versao_prompt(prompt_mestre)
+            )
+
+        # A listagem é consumida página a página direto para a fila
+        lote = novo_lote()
+        enfileiradas = fila.enfileirar(
+            lote,
+            (
+                {
+                    "origem": ORIGEM_DRIVE,
+                    "entrada": item["id"],
+                    "nome": item["name"],
+                    "destino": Config.DRIVE_FOLDER_OUTPUT_ID,
+                    "md5": item.get("md5Checksum"),
+                    "paginas": [pagina["id"] for pagina in paginas(item)],
+                }
+                for item in items
+            ),
+        )
+        if not enfileiradas:
+            logger.info(
+                "Nenhuma nova redação encontrada para corrigir na pasta de entrada."
+            )
+            return
+        logger.info(f"Lote {lote}: {enfileiradas} redações enfileiradas.")
+    except Exception as e:
+        logger.critical(f"Ocorreu um erro fatal na execução do script: {e}")
+        return
+    finally:
+        if drive_service:
+            drive_service.fechar()
+
+    if not fila.trabalhadores_ativos():
+        logger.warning(
+            "Nenhum trabalhador ativo: inicie 'python trabalhador_fila.py' para "
+            "processar a fila."
+        )
+    if not aguardar:
+        return
+
+    try:
+        for progresso in fila.acompanhar(lote):
+            logger.info(
+                f"Lote {lote}: {progresso[STATUS_CONCLUIDA]} concluídas, "
+                f"{progresso[STATUS_FALHA]} com falha, de {enfileiradas}."
+            )
+    except KeyboardInterrupt:
+        logger.info("Acompanhamento interrompido; o lote continua na fila.")
+        return
+
+    logger.info(
+        f"Lote finalizado: {progresso[STATUS_CONCLUIDA]} de {enfileiradas} "
+        "redações corrigidas."
+    )
+    # As etapas foram medidas nos trabalhadores, que gravam no mesmo JSONL
+    if Config.METRICAS_ATIVO:
+        metricas = ColetorMetricas.carregar(Config.METRICAS_JSONL_PATH, lote=lote)
+        logger.info(metricas.resumo())
+
+
+def main_direto():
+    logger.info("Iniciando assistente de correção em lote...")
+
+    drive_service = None
+    renderizador = None
     try:
         # --- 1. CONFIGURAÇÃO INICIAL ---
         ai_service.configurar_ia()
 
-        # Inicializa o serviço do Drive (já trata autenticação internamente)
-        drive_service = GoogleDriveService()
+        # Inicializa o serviço do Drive (já trata autenticação internamente).
+        # As etapas do pipeline são threads: a ponte síncrona agenda as
+        # transferências no cliente assíncrono, que compartilha um pool de
+        # conexões entre todas elas.
+        drive_service = DriveSincrono(AsyncGoogleDriveService())
         logger.info("Serviços de IA e Google Drive inicializados.")
 
         prompt_mestre = ai_service.carregar_prompt()
         logger.info("Prompt da IA carregado.")
 
+        # Relatórios gerados em processos paralelos (um por núcleo)
+        renderizador = report_service.obter_renderizador()
+
         # --- 2. BUSCA DE ARQUIVOS ---
+        # A listagem é paginada e consumida sob demanda: o processamento começa
+        # com a primeira página, enquanto as seguintes ainda estão chegando.
+        # Fotos da mesma redação (várias páginas) viram um item só.
         folder_input_id = Config.DRIVE_FOLDER_INPUT_ID
-        items = drive_service.list_pending_images(folder_input_id)
+        items = agrupar_redacoes(
+            drive_service.iterar_imagens_pendentes(folder_input_id)
+        )
 
-        if not items:
+        # Só segue para o pipeline o que ainda não foi corrigido com esta
+        # mesma imagem (md5), modelo e versão do prompt
+        ledger = obter_ledger()
+        modelo = Config.MODEL_NAME
+        versao = versao_prompt(prompt_mestre)
+        if ledger:
+            items = ledger.filtrar_pendentes(items, modelo, versao)
+
+        primeiro = next(items, None)
+        if primeiro is None:
             logger.info(
                 "Nenhuma nova redação encontrada para corrigir na pasta de entrada."
             )
             return
 
-        logger.info(f"Encontradas {len(items)} redações para corrigir.")
+        encontradas = 0
+
+        def contar(itens):
+            nonlocal encontradas
+            for item in itens:
+                encontradas += 1
+                yield item
 
         # --- 3. PROCESSAMENTO ---
-        for item in items:
+        # Cada etapa roda em paralelo com as demais: enquanto uma redação está
+        # na IA, a próxima já está sendo baixada e a anterior enviada ao Drive.
+        def baixar(item):
             file_id = item["id"]
             file_name = item["name"]
 
             logger.info(f"--- Processando: {file_name} (ID: {file_id}) ---")
 
-            caminho_imagem_temp = os.path.join(Config.TEMP_LOTE_DIR, file_name)
+            # Download das imagens (em bytes), uma por página
+            file_content = baixar_paginas(drive_service, item)
+
+            if not file_content:
+                return None
 
-            try:
-                # Download da imagem (em bytes)
-                file_content = drive_service.download_file(file_id)
+            item["conteudo"] = file_content
+            return item
 
-                if not file_content:
-                    logger.warning(f"Falha ao baixar o arquivo '{file_name}'. Pulando.")
-                    continue
+        def analisar(item):
+            file_name = item["name"]
 
-                # Salva temporariamente para a IA processar
-                # (O ai_service atualmente espera um caminho de arquivo)
-                with open(caminho_imagem_temp, "wb") as f:
-                    f.write(file_content)
+            # Análise da IA (páginas enviadas direto da memória)
+            dados_redacao = ai_service.analisar_redacao_em_memoria(
+                item.pop("conteudo"), prompt_mestre
+            )
 
-                # Análise da IA
-                dados_redacao = ai_service.analisar_redacao(
-                    caminho_imagem_temp, prompt_mestre
+            if not dados_redacao:
+                logger.warning(
+                    f"Falha na análise da IA para o arquivo '{file_name}'. Pulando."
                 )
+                return None
 
-                if not dados_redacao:
-                    logger.warning(
-                        f"Falha na análise da IA para o arquivo '{file_name}'. Pulando."
-                    )
-                    continue
+            item["dados_redacao"] = dados_redacao
+            return item
 
-                # Geração do DOCX
-                arquivo_docx_bytes = report_service.preencher_e_gerar_docx(
-                    dados_redacao
+        def gerar_docx(item):
+            # Geração do DOCX
+            arquivo_docx_bytes = renderizador.gerar(item["dados_redacao"])
+
+            if not arquivo_docx_bytes:
+                logger.warning(
+                    f"Falha ao gerar o arquivo .docx para '{item['name']}'. Pulando."
                 )
+                return None
+
+            item["docx"] = arquivo_docx_bytes
+            return item
+
+        def enviar(item):
+            file_id = item["id"]
+
+            # Upload do Resultado
+            nome_arquivo_final = report_service.nome_relatorio(
+                item["dados_redacao"], file_id
+            )
 
-                if not arquivo_docx_bytes:
-                    logger.warning(
-                        f"Falha ao gerar o arquivo .docx para '{file_name}'. Pulando."
+            folder_output_id = Config.DRIVE_FOLDER_OUTPUT_ID
+
+            novo_id = drive_service.upload_docx(
+                item.pop("docx"),
+                nome_arquivo_final,
+                folder_output_id,
+                progresso_no_log(f"Upload de '{nome_arquivo_final}'"),
+            )
+
+            if novo_id:
+                logger.info(f"Sucesso! Relatório salvo. ID: {novo_id}")
+                if ledger:
+                    ledger.registrar_conclusao(item, modelo, versao, novo_id)
+                return item
+
+            logger.error(f"Falha ao fazer upload do relatório para '{item['name']}'.")
+            return None
+
+        def ao_falhar(item, erro):
+            logger.error(f"Erro ao processar o arquivo '{item['name']}': {erro}")
+            if ledger:
+                ledger.registrar_falha(item, modelo, versao, str(erro))
+
+        def registrando_falhas(etapa, funcao):
+            # Etapas que descartam o item (retornam None) já logaram o motivo;
+            # aqui só fica registrado em qual etapa ele parou.
+            if not ledger:
+                return funcao
+
+            def executar(item):
+                resultado = funcao(item)
+                if resultado is None:
+                    ledger.registrar_falha(
+                        item, modelo, versao, f"Falha na etapa '{etapa}'"
                     )
-                    continue
+                return resultado
 
-                # Upload do Resultado
-                nome_aluno = (
-                    dados_redacao.get("nome_aluno", "Aluno").strip().replace(" ", "_")
-                )
-                # Adiciona parte do ID para garantir unicidade
-                nome_arquivo_final = f"Correcao_{nome_aluno}_{file_id[:4]}.docx"
+            return executar
+
+        # A IA tem threads de sobra: quem limita as chamadas simultâneas é o
+        # agendador, que ajusta a concorrência conforme as cotas do Gemini
+        workers = max(Config.BATCH_WORKERS, Config.GEMINI_CONCORRENCIA_MAX)
+        # Transferências ficam limitadas pelo pool de conexões do Drive
+        transferencias = Config.DRIVE_MAX_CONEXOES
+        concluidos = executar_pipeline(
+            contar(itertools.chain([primeiro], items)),
+            [
+                Estagio(
+                    "download", registrando_falhas("download", baixar), transferencias
+                ),
+                Estagio("ia", registrando_falhas("ia", analisar), workers),
+                # Renderização é CPU pura: cada thread aguarda um processo
+                Estagio(
+                    "docx",
+                    registrando_falhas("docx", gerar_docx),
+                    renderizador.processos,
+                ),
+                Estagio("upload", registrando_falhas("upload", enviar), transferencias),
+            ],
+            tamanho_fila=Config.BATCH_TAMANHO_FILA,
+            ao_falhar=ao_falhar,
+            identificar=lambda item: {"redacao": item["name"]},
+        )
+
+        logger.info(
+            f"Lote finalizado: {len(concluidos)} de {encontradas} redações corrigidas."
+        )
+        logger.info(obter_coletor().resumo())
+        contexto = obter_gerenciador()
+        if contexto:
+            logger.info(contexto.resumo_economia())
+
+    except Exception as e:
+        logger.critical(f"Ocorreu um erro fatal na execução do script: {e}")
+
+    finally:
+        if drive_service:
+            drive_service.fechar()
+        if renderizador:
+            renderizador.fechar()
+
+
+# --- MODO BATCH (Batch API do Gemini) ---
+def preparar_batch(drive_service, prompt_mestre, modelo, versao, caminho_manifesto):
+    """
+    Baixa as redações pendentes e grava o JSONL de entrada do job.
+    Retorna o manifesto criado, ou None se não houver nada a corrigir.
+    """
+    pasta_entrada = Config.DRIVE_FOLDER_INPUT_ID
+    items = agrupar_redacoes(drive_service.iterar_imagens_pendentes(pasta_entrada))
+    ledger = obter_ledger()
+    if ledger:
+        items = ledger.filtrar_pendentes(items, modelo, versao)
+
+    caminho_jsonl = caminho_manifesto.replace(".json", ".jsonl")
+    os.makedirs(os.path.dirname(caminho_jsonl), exist_ok=True)
+    itens_manifesto = {}
+    lock_saida = threading.Lock()
+
+    def registrar_falha(item, erro):
+        logger.warning(f"Falha ao preparar '{item['name']}' para o batch: {erro}")
+        if ledger:
+            ledger.registrar_falha(item, modelo, versao, erro)
+
+    def baixar(item):
+        conteudo = baixar_paginas(drive_service, item)
+        if not conteudo:
+            registrar_falha(item, "Falha no download das páginas")
+            return None
+        item["conteudo"] = conteudo
+        return item
+
+    def montar(item):
+        linha = montar_requisicao(
+            item["id"],
+            prompt_mestre,
+            item.pop("conteudo"),
+            ai_service.PARAMETROS_GERACAO,
+        )
+        item["linha"] = json.dumps(linha)
+        return item
+
+    with open(caminho_jsonl, "w", encoding="utf-8") as saida:
+
+        def gravar(item):
+            with lock_saida:
+                saida.write(item.pop("linha") + "\n")
+                itens_manifesto[item["id"]] = {
+                    "name": item["name"],
+                    "md5Checksum": item.get("md5Checksum"),
+                    "status": "pendente",
+                }
+            return item
+
+        executar_pipeline(
+            items,
+            [
+                Estagio("download", baixar, Config.DRIVE_MAX_CONEXOES),
+                Estagio("preparo", montar, Config.BATCH_WORKERS),
+                Estagio("gravacao", gravar, 1),
+            ],
+            tamanho_fila=Config.BATCH_TAMANHO_FILA,
+            ao_falhar=lambda item, erro: registrar_falha(item, str(erro)),
+            identificar=lambda item: {"redacao": item["name"]},
+        )
+
+    if not itens_manifesto:
+        os.remove(caminho_jsonl)
+        return None
+
+    logger.info(f"{len(itens_manifesto)} redações preparadas para o batch.")
+    return ManifestoBatch.criar(
+        caminho_manifesto,
+        pasta_entrada=pasta_entrada,
+        pasta_saida=Config.DRIVE_FOLDER_OUTPUT_ID,
+        modelo=modelo,
+        versao_prompt=versao,
+        caminho_jsonl=caminho_jsonl,
+        itens=itens_manifesto,
+    )
 
-                folder_output_id = Config.DRIVE_FOLDER_OUTPUT_ID
 
-                novo_id = drive_service.upload_docx(
-                    arquivo_docx_bytes, nome_arquivo_final, folder_output_id
+def aguardar_job(cliente, manifesto, aguardar):
+    """
+    Consulta o job até um estado final. Sem `aguardar`, faz uma única consulta
+    e retorna None se o job ainda estiver em andamento.
+    """
+    while True:
+        job = cliente.consultar_job(manifesto.dados["job"])
+        estado = cliente.estado(job)
+        if estado != manifesto.dados["estado"]:
+            logger.info(f"Job {manifesto.dados['job']}: {estado}")
+            manifesto.atualizar(estado=estado)
+
+        if estado_final(estado):
+            return job
+        if not aguardar:
+            logger.info("Job ainda em andamento. Execute novamente para continuar.")
+            return None
+        time.sleep(Config.BATCH_INTERVALO_CONSULTA)
+
+
+def ingerir_resultados(drive_service, cliente, manifesto, arquivo_resultados):
+    """
+    Lê os resultados do job conforme são baixados e gera e envia os relatórios.
+    Itens já concluídos numa execução anterior são ignorados.
+    """
+    ledger = obter_ledger()
+    modelo = manifesto.dados["modelo"]
+    versao = manifesto.dados["versao_prompt"]
+    itens = manifesto.itens
+
+    def registrar_falha(chave, erro):
+        logger.warning(f"Falha no batch para '{itens[chave]['name']}': {erro}")
+        manifesto.atualizar_item(chave, status="falha", erro=erro)
+        if ledger:
+            ledger.registrar_falha({"id": chave, **itens[chave]}, modelo, versao, erro)
+
+    def resultados():
+        for linha in cliente.baixar_resultados(arquivo_resultados):
+            chave = linha.get("key")
+            if chave in itens and itens[chave]["status"] != "concluido":
+                yield linha
+
+    def validar(linha):
+        chave = linha["key"]
+        if "error" in linha:
+            registrar_falha(chave, json.dumps(linha["error"], ensure_ascii=False))
+            return None
+        try:
+            texto = ai_service.limpar_resposta_json(extrair_texto(linha["response"]))
+            dados = json.loads(texto)
+        except (KeyError, ValueError) as e:
+            registrar_falha(chave, f"Resposta inválida da IA: {e}")
+            return None
+
+        problema = ai_service.validar_correcao(dados)
+        if problema:
+            registrar_falha(chave, f"Resposta inválida da IA: {problema}")
+            return None
+        dados = ai_service.validar_e_corrigir_dados(dados)
+        return {"id": chave, "dados_redacao": dados}
+
+    def gerar_docx(item):
+        item["docx"] = renderizador.gerar(item["dados_redacao"])
+        if not item["docx"]:
+            registrar_falha(item["id"], "Falha ao gerar o arquivo .docx")
+            return None
+        return item
+
+    def enviar(item):
+        chave = item["id"]
+        nome_relatorio = report_service.nome_relatorio(item["dados_redacao"], chave)
+        novo_id = drive_service.upload_docx(
+            item.pop("docx"),
+            nome_relatorio,
+            manifesto.dados["pasta_saida"],
+            progresso_no_log(f"Upload de '{nome_relatorio}'"),
+        )
+        if not novo_id:
+            registrar_falha(chave, "Falha no upload do relatório")
+            return None
+
+        manifesto.atualizar_item(chave, status="concluido", output_file_id=novo_id)
+        if ledger:
+            ledger.registrar_conclusao(
+                {"id": chave, **itens[chave]}, modelo, versao, novo_id
+            )
+        return item
+
+    with report_service.obter_renderizador() as renderizador:
+        concluidos = executar_pipeline(
+            resultados(),
+            [
+                Estagio("validacao", validar, 1),
+                Estagio("docx", gerar_docx, renderizador.processos),
+                Estagio("upload", enviar, Config.DRIVE_MAX_CONEXOES),
+            ],
+            tamanho_fila=Config.BATCH_TAMANHO_FILA,
+            # Na validação o item ainda é a linha do resultado ("key"); nas
+            # etapas seguintes, já é o item com o ID da redação ("id")
+            ao_falhar=lambda item, erro: registrar_falha(
+                item.get("id", item.get("key")), str(erro)
+            ),
+            identificar=lambda item: {"redacao": item.get("id", item.get("key"))},
+        )
+
+    # Itens sem linha no arquivo de resultados também contam como falha
+    for chave, item in itens.items():
+        if item["status"] == "pendente":
+            registrar_falha(chave, "Sem resultado no arquivo do batch")
+
+    return len(concluidos)
+
+
+def main_batch(aguardar=True):
+    logger.info("Iniciando correção em lote via Batch API do Gemini...")
+
+    drive_service = None
+    try:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.critical("O modo batch exige a variável GEMINI_API_KEY.")
+            return
+
+        cliente = ClienteBatchGemini(api_key)
+        drive_service = DriveSincrono(AsyncGoogleDriveService())
+        prompt_mestre = ai_service.carregar_prompt()
+
+        # Um job por pasta de entrada: rodar de novo retoma de onde parou
+        caminho_manifesto = os.path.join(
+            Config.BATCH_DIR, f"{Config.DRIVE_FOLDER_INPUT_ID}.json"
+        )
+        manifesto = ManifestoBatch.carregar(caminho_manifesto)
+
+        if manifesto:
+            logger.info(
+                f"Retomando batch em andamento ({len(manifesto.itens)} redações, "
+                f"job: {manifesto.dados['job'] or 'ainda não criado'})."
+            )
+        else:
+            manifesto = preparar_batch(
+                drive_service,
+                prompt_mestre,
+                Config.MODEL_NAME,
+                versao_prompt(prompt_mestre),
+                caminho_manifesto,
+            )
+            if manifesto is None:
+                logger.info(
+                    "Nenhuma nova redação encontrada para corrigir na pasta de entrada."
                 )
+                return
 
-                if novo_id:
-                    logger.info(f"Sucesso! Relatório salvo. ID: {novo_id}")
-                else:
-                    logger.error(
-                        f"Falha ao fazer upload do relatório para '{file_name}'."
-                    )
+        nome_exibicao = f"correcao-{Config.DRIVE_FOLDER_INPUT_ID}"
+        if not manifesto.dados["arquivo_entrada"]:
+            arquivo = cliente.enviar_arquivo(
+                manifesto.dados["caminho_jsonl"], nome_exibicao
+            )
+            manifesto.atualizar(arquivo_entrada=arquivo)
+            logger.info(f"Arquivo de entrada enviado: {arquivo}")
+
+        if not manifesto.dados["job"]:
+            job = cliente.criar_job(
+                manifesto.dados["modelo"],
+                manifesto.dados["arquivo_entrada"],
+                nome_exibicao,
+            )
+            manifesto.atualizar(job=job)
+            logger.info(f"Job de batch criado: {job}")
 
-            except Exception as e:
-                logger.error(f"Erro ao processar o arquivo '{file_name}': {e}")
+        job = aguardar_job(cliente, manifesto, aguardar)
+        if job is None:
+            return
+
+        if not estado_sucesso(cliente.estado(job)):
+            logger.error(
+                f"Job {manifesto.dados['job']} terminou como {cliente.estado(job)}. "
+                "As redações voltam a ficar pendentes na próxima execução."
+            )
+            manifesto.remover()
+            return
 
-            finally:
-                # Limpeza do arquivo temporário
-                if os.path.exists(caminho_imagem_temp):
-                    try:
-                        os.remove(caminho_imagem_temp)
-                    except OSError:
-                        pass
+        concluidos = ingerir_resultados(
+            drive_service, cliente, manifesto, cliente.arquivo_resultados(job)
+        )
+        logger.info(
+            f"Batch finalizado: {concluidos} de {len(manifesto.itens)} "
+            "redações corrigidas."
+        )
+        manifesto.remover()
 
     except Exception as e:
         logger.critical(f"Ocorreu um erro fatal na execução do script: {e}")
 
+    finally:
+        if drive_service:
+            drive_service.fechar()
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Correção em lote das redações do Drive"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="usa a Batch API do Gemini (mais barata, sem resposta imediata)",
+    )
+    parser.add_argument(
+        "--direto",
+        action="store_true",
+        help="corrige neste processo, sem passar pela fila de trabalhadores",
+    )
+    parser.add_argument(
+        "--sem-esperar",
+        action="store_true",
+        help="só enfileira (ou, no modo batch, envia/consulta o job) e sai",
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        main_batch(aguardar=not args.sem_esperar)
+    elif args.direto:
+        main_direto()
+    else:
+        main(aguardar=not args.sem_esperar)
@@ -0,0 +1,271 @@
+"""
+Correção em lote de uma pasta local, sem navegador.
+
+Percorre a pasta de entrada (inclusive subpastas), corrige as imagens em
+paralelo e grava os relatórios na pasta de saída, repetindo a mesma estrutura
+de subpastas. Cada relatório leva no nome parte do hash da imagem, então
+alunos com o mesmo nome não sobrescrevem um ao outro.
+
+Fotos da mesma redação na mesma subpasta, com o número da página no fim do
+nome (ex.: maria_p1.jpg e maria_p2.jpg), são corrigidas juntas. Para outros
+nomes, use --manifesto com um CSV de colunas arquivo,redacao (caminho relativo
+à pasta de entrada e nome da redação, uma linha por foto, na ordem das
+páginas).
+
+O progresso fica registrado na própria pasta de saída: se a execução for
+interrompida, basta rodar o mesmo comando de novo. Imagens já corrigidas (com
+o mesmo conteúdo, modelo e prompt, e cujo relatório ainda existe) são
+ignoradas.
+
+Uso:
+    python corrigir_pasta.py ENTRADA SAIDA [--workers N] [--reprocessar]
+        [--ano-turma TEXTO] [--bimestre TEXTO] [--manifesto CSV]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+
+# Os serviços da aplicação ficam em src/ (mesmo PYTHONPATH usado pelo run.sh)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from app.core.logger import get_logger  # noqa: E402
+from app.services import ai_service, report_service  # noqa: E402
+from app.services.agrupamento_service import (  # noqa: E402
+    agrupar_redacoes,
+    md5_combinado,
+    paginas,
+)
+from app.services.ledger_service import (  # noqa: E402
+    STATUS_CONCLUIDO,
+    LedgerProcessamento,
+    versao_prompt,
+)
+from app.services.metricas_service import obter_coletor  # noqa: E402
+from app.services.pipeline_service import Estagio, executar_pipeline  # noqa: E402
+from app.services.prompt_cache_service import obter_gerenciador  # noqa: E402
+from config import Config  # noqa: E402
+
+# --- Configuração de Logs ---
+logger = get_logger(__name__)
+
+EXTENSOES_IMAGEM = (".png", ".jpg", ".jpeg")
+
+# Registro das imagens já corrigidas, gravado dentro da pasta de saída
+ARQUIVO_REGISTRO = ".registro_correcoes.db"
+
+
+def listar_imagens(entrada, saida):
+    """
+    Percorre a pasta de entrada recursivamente, em ordem alfabética, e gera o
+    caminho relativo de cada imagem. A pasta de saída é ignorada se estiver
+    dentro da de entrada.
+    """
+    for raiz, pastas, arquivos in os.walk(entrada):
+        pastas[:] = sorted(
+            pasta
+            for pasta in pastas
+            if not pasta.startswith(".")
+            and os.path.abspath(os.path.join(raiz, pasta)) != saida
+        )
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(EXTENSOES_IMAGEM):
+                yield os.path.relpath(os.path.join(raiz, nome), entrada)
+
+
+def corrigir_pasta(
+    entrada, saida, workers, reprocessar=False, extras=None, manifesto=None
+):
+    """
+    Corrige todas as imagens da pasta de entrada ainda sem relatório.
+
+    Returns:
+        Dict[str, int]: Quantidade de imagens corrigidas, ignoradas e com falha.
+    """
+    entrada = os.path.abspath(entrada)
+    saida = os.path.abspath(saida)
+    os.makedirs(saida, exist_ok=True)
+
+    prompt_mestre = ai_service.carregar_prompt()
+    modelo = Config.MODEL_NAME
+    versao = versao_prompt(prompt_mestre)
+    ledger = LedgerProcessamento(os.path.join(saida, ARQUIVO_REGISTRO))
+
+    contagem = {"corrigidas": 0, "ignoradas": 0, "falhas": 0}
+    contagem_lock = threading.Lock()
+
+    def contar(chave):
+        with contagem_lock:
+            contagem[chave] += 1
+
+    def ja_corrigida(item):
+        if reprocessar:
+            return False
+        registro = ledger.obter(item["id"])
+        if not registro or registro["status"] != STATUS_CONCLUIDO:
+            return False
+        mesma_correcao = (
+            registro["md5_checksum"],
+            registro["modelo"],
+            registro["versao_prompt"],
+        ) == (item["md5Checksum"], modelo, versao)
+        # Relatório apagado da pasta de saída também é refeito
+        return mesma_correcao and os.path.exists(
+            os.path.join(saida, registro["output_file_id"])
+        )
+
+    def falhou(item, erro):
+        contar("falhas")
+        logger.error(f"Falha ao corrigir '{item['id']}': {erro}")
+        ledger.registrar_falha(item, modelo, versao, erro)
+
+    def ao_falhar(item, erro):
+        falhou(item, str(erro))
+
+    # --- Estágios ---
+    def carregar(item):
+        conteudos = []
+        for pagina in paginas(item):
+            with open(os.path.join(entrada, pagina["id"]), "rb") as f:
+                conteudos.append(f.read())
+            pagina["md5Checksum"] = hashlib.md5(conteudos[-1]).hexdigest()
+        if "paginas" in item:
+            item["md5Checksum"] = md5_combinado(
+                pagina["md5Checksum"] for pagina in item["paginas"]
+            )
+        if ja_corrigida(item):
+            contar("ignoradas")
+            return None
+        logger.info(f"--- Processando: {item['id']} ---")
+        item["conteudo"] = conteudos
+        return item
+
+    def analisar(item):
+        dados = ai_service.analisar_redacao_em_memoria(
+            item.pop("conteudo"), prompt_mestre
+        )
+        if not dados:
+            falhou(item, "Falha na análise da IA")
+            return None
+        dados.update(extras or {})
+        item["dados_redacao"] = dados
+        return item
+
+    def gerar_docx(item):
+        item["docx"] = renderizador.gerar(item["dados_redacao"])
+        if not item["docx"]:
+            falhou(item, "Falha ao gerar o arquivo .docx")
+            return None
+        return item
+
+    def gravar(item):
+        # Mesma estrutura de subpastas da entrada; o hash no nome evita
+        # colisões e faz a mesma imagem sempre gerar o mesmo arquivo
+        subpasta = os.path.dirname(item["id"])
+        nome_arquivo = report_service.nome_relatorio(
+            item["dados_redacao"], item["md5Checksum"], tamanho=8
+        )
+        caminho = report_service.salvar_relatorio(
+            item.pop("docx"), os.path.join(saida, subpasta), nome_arquivo
+        )
+        ledger.registrar_conclusao(
+            item, modelo, versao, os.path.relpath(caminho, saida)
+        )
+        contar("corrigidas")
+        logger.info(f"Sucesso! Relatório salvo: {caminho}")
+        return item
+
+    # Páginas agrupadas pelo caminho relativo: fotos de subpastas diferentes
+    # nunca formam a mesma redação
+    itens = agrupar_redacoes(
+        (
+            {"id": caminho, "name": os.path.basename(caminho), "md5Checksum": None}
+            for caminho in listar_imagens(entrada, saida)
+        ),
+        manifesto,
+        chave=lambda item: item["id"],
+    )
+
+    with report_service.obter_renderizador() as renderizador:
+        executar_pipeline(
+            itens,
+            [
+                Estagio("carregar", carregar, Config.BATCH_WORKERS),
+                Estagio("ia", analisar, workers),
+                Estagio("docx", gerar_docx, renderizador.processos),
+                Estagio("gravar", gravar, Config.BATCH_WORKERS),
+            ],
+            tamanho_fila=Config.BATCH_TAMANHO_FILA,
+            ao_falhar=ao_falhar,
+            identificar=lambda item: {"redacao": item["id"]},
+        )
+    return contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Correção em lote das redações de uma pasta local"
+    )
+    parser.add_argument("entrada", help="pasta com as imagens (inclui subpastas)")
+    parser.add_argument("saida", help="pasta onde os relatórios serão gravados")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(Config.BATCH_WORKERS, Config.GEMINI_CONCORRENCIA_MAX),
+        help="redações analisadas ao mesmo tempo pela IA",
+    )
+    parser.add_argument(
+        "--reprocessar",
+        action="store_true",
+        help="corrige de novo mesmo as imagens que já têm relatório",
+    )
+    parser.add_argument("--ano-turma", help="ano/turma exibido nos relatórios")
+    parser.add_argument("--bimestre", help="bimestre exibido nos relatórios")
+    parser.add_argument(
+        "--manifesto",
+        help="CSV (arquivo,redacao) com as fotos de cada redação de várias páginas",
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.entrada):
+        logger.critical(f"A pasta de entrada não existe: {args.entrada}")
+        sys.exit(1)
+
+    extras = {}
+    if args.ano_turma:
+        extras["ano_turma"] = args.ano_turma
+    if args.bimestre:
+        extras["bimestre"] = args.bimestre
+
+    ai_service.configurar_ia()
+    try:
+        contagem = corrigir_pasta(
+            args.entrada,
+            args.saida,
+            args.workers,
+            args.reprocessar,
+            extras,
+            args.manifesto,
+        )
+    except KeyboardInterrupt:
+        logger.info(
+            "Interrompido. Rode o mesmo comando de novo para continuar de onde parou."
+        )
+        sys.exit(130)
+
+    logger.info(
+        f"Pasta finalizada: {contagem['corrigidas']} corrigidas, "
+        f"{contagem['ignoradas']} já corrigidas antes, {contagem['falhas']} falhas."
+    )
+    logger.info(obter_coletor().resumo())
+    contexto = obter_gerenciador()
+    if contexto:
+        logger.info(contexto.resumo_economia())
+    if contagem["falhas"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import os
+import sys
 
-import google.generativeai as genai
+# Os serviços da aplicação ficam em src/ (mesmo PYTHONPATH usado pelo run.sh)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
-from config import Config
-from logger import get_logger
-from services import ai_service
+from app.core.logger import get_logger  # noqa: E402
+from app.services import ai_service  # noqa: E402
+from config import Config  # noqa: E402
 
 logger = get_logger(__name__)
 
@@ -19,16 +21,18 @@ def verificar_integridade_api() -> bool:
     """
     logger.info("--- Iniciando diagnóstico da API Gemini ---")
 
-    # 1. Verificação de Arquivo de Credenciais
+    # 1. Verificação de Credenciais (API Key ou arquivo JSON)
     cred_path = Config.GOOGLE_CREDENTIALS_PATH
-    if not os.path.exists(cred_path):
+    if os.getenv("GEMINI_API_KEY"):
+        logger.info("OK: GEMINI_API_KEY definida no ambiente.")
+    elif not os.path.exists(cred_path):
         logger.error(f"FALHA: Arquivo de credenciais não encontrado em: {cred_path}")
         logger.error(
             "Verifique se o arquivo está na pasta 'secrets/' e se o nome está correto no .env"
         )
         return False
-
-    logger.info(f"OK: Arquivo de credenciais detectado: {cred_path}")
+    else:
+        logger.info(f"OK: Arquivo de credenciais detectado: {cred_path}")
 
     # 2. Configuração da Lib via Service
     try:
@@ -44,7 +48,8 @@ def verificar_integridade_api() -> bool:
     logger.info(f"Tentando conexão com o modelo: {model_name}...")
 
     try:
-        model = genai.GenerativeModel(model_name)
+        # Mesmo registro de modelos usado nas correções
+        model = ai_service.obter_modelo(model_name)
         response = model.generate_content(
             "Responda apenas com a palavra 'OK' se estiver me ouvindo."
         )
@@ -61,6 +66,8 @@ def verificar_integridade_api() -> bool:
 
         logger.info("Tentando listar modelos disponíveis para diagnóstico...")
         try:
+            import google.generativeai as genai
+
             available_models = [
                 m.name
                 for m in genai.list_models()
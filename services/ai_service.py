@@ -1,6 +1,7 @@
+import io
 import json
 import os
-from typing import Any, Dict, Optional, TypedDict
+from typing import Any, BinaryIO, Dict, Optional, TypedDict, Union
 
 import google.generativeai as genai
 from PIL import Image
@@ -10,6 +11,9 @@ from logger import get_logger
 
 logger = get_logger(__name__)
 
+# Formas aceitas para a imagem da redação: bytes, arquivo aberto ou imagem PIL
+FonteImagem = Union[bytes, BinaryIO, Image.Image]
+
 
 # --- Definição do Schema de Resposta (Tipagem Forte) ---
 class DetalheCompetencia(TypedDict):
@@ -80,13 +84,58 @@ def carregar_prompt(caminho_prompt: str = Config.PROMPT_PATH) -> str:
         raise
 
 
+def abrir_imagem(imagem: FonteImagem) -> Image.Image:
+    """
+    Converte a fonte recebida em uma imagem PIL, sem passar pelo disco.
+
+    Args:
+        imagem (FonteImagem): Bytes, objeto file-like ou imagem PIL.
+
+    Returns:
+        Image.Image: A imagem pronta para envio à IA.
+    """
+    if isinstance(imagem, Image.Image):
+        return imagem
+    if isinstance(imagem, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(imagem))
+    return Image.open(imagem)
+
+
 def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any]]:
+    """
+    Envia a imagem (arquivo no disco) para a IA e retorna a análise estruturada.
+    Mantido para compatibilidade; delega para `analisar_redacao_em_memoria`.
+
+    Args:
+        caminho_imagem (str): Caminho do arquivo da imagem da redação.
+        prompt (str): O prompt de instruções para a IA.
+
+    Returns:
+        Optional[Dict[str, Any]]: Um dicionário com os dados da correção ou None em caso de falha.
+    """
+    if not os.path.exists(caminho_imagem):
+        logger.error(f"A imagem não foi encontrada em '{caminho_imagem}'")
+        return None
+
+    try:
+        with open(caminho_imagem, "rb") as f:
+            conteudo = f.read()
+    except OSError as e:
+        logger.error(f"Erro ao ler a imagem '{caminho_imagem}': {e}")
+        return None
+
+    return analisar_redacao_em_memoria(conteudo, prompt)
+
+
+def analisar_redacao_em_memoria(
+    imagem: FonteImagem, prompt: str
+) -> Optional[Dict[str, Any]]:
     """
     Envia a imagem para a IA e retorna a análise estruturada.
     Utiliza o recurso 'response_schema' do Gemini para garantir JSON válido.
 
     Args:
-        caminho_imagem (str): Caminho do arquivo da imagem da redação.
+        imagem (FonteImagem): Imagem da redação em bytes, file-like ou PIL.
         prompt (str): O prompt de instruções para a IA.
 
     Returns:
@@ -106,11 +155,7 @@ def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any
         )
 
         # Carrega a imagem
-        if not os.path.exists(caminho_imagem):
-            logger.error(f"A imagem não foi encontrada em '{caminho_imagem}'")
-            return None
-
-        img = Image.open(caminho_imagem)
+        img = abrir_imagem(imagem)
 
         # Gera o conteúdo
         # Prompt Adicional para reforçar a obediência ao Schema
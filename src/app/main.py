@@ -1,18 +1,33 @@
 import os
 import re
-import tkinter as tk
-from tkinter import filedialog
 
 import streamlit as st
 
 from app.core.logger import get_logger
 from app.services import ai_service, report_service
-from app.services.drive_service import GoogleDriveService
-from config import Config
+from app.services.agrupamento_service import (
+    agrupar_redacoes,
+    identificar_pagina,
+    paginas,
+)
+from app.services.async_drive_service import AsyncGoogleDriveService, DriveSincrono
+from app.services.fila_service import (
+    ORIGEM_DRIVE,
+    ORIGEM_LOCAL,
+    STATUS_CONCLUIDA,
+    STATUS_EXECUTANDO,
+    STATUS_FALHA,
+    STATUS_PENDENTE,
+    novo_lote,
+    obter_fila,
+)
 
 # --- Configuração de Logs ---
 logger = get_logger(__name__)
 
+# Chaves das competências com um quadro de nota na correção individual
+PADRAO_COMPETENCIA = re.compile(r"^c[1-5]$")
+
 # --- Configuração da Página ---
 st.set_page_config(layout="wide", page_title="Corretor de Redação Enem", page_icon="📝")
 
@@ -29,14 +44,82 @@ def extrair_id_drive(url_ou_id):
     return url_ou_id
 
 
+def selecionar_pasta():
+    """Abre o seletor de pastas do sistema e retorna o caminho escolhido."""
+    # Importado só ao clicar: o tkinter nem sempre existe (ex.: servidores e
+    # contêineres sem interface gráfica) e não é usado no restante da página
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    root.attributes("-topmost", True)
+    caminho_escolhido = filedialog.askdirectory(master=root)
+    root.destroy()
+    return caminho_escolhido
+
+
+def acompanhar_lote(lote):
+    """
+    Mostra o progresso de um lote da fila até ele terminar. O processamento
+    acontece nos trabalhadores: se a página for fechada, o lote continua.
+    """
+    if not fila.trabalhadores_ativos():
+        st.warning(
+            "Nenhum trabalhador ativo no momento. Inicie um com "
+            "`python trabalhador_fila.py` para processar a fila."
+        )
+
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    log_container = st.container()
+    exibidas = set()
+
+    for progresso in fila.acompanhar(lote):
+        for tarefa in fila.tarefas(lote):
+            if tarefa["id"] in exibidas:
+                continue
+            if tarefa["status"] == STATUS_CONCLUIDA:
+                log_container.success(f"✅ Sucesso: {tarefa['nome']}")
+            elif tarefa["status"] == STATUS_FALHA:
+                log_container.error(f"❌ Falha em {tarefa['nome']}: {tarefa['erro']}")
+            else:
+                continue
+            exibidas.add(tarefa["id"])
+
+        total = sum(progresso.values())
+        finalizadas = progresso[STATUS_CONCLUIDA] + progresso[STATUS_FALHA]
+        status_text.text(f"Processadas {finalizadas}/{total} redações (lote {lote})")
+        progress_bar.progress(finalizadas / total if total else 1.0)
+
+    st.success(
+        f"Processamento concluído! Sucessos: {progresso[STATUS_CONCLUIDA]}, "
+        f"Erros: {progresso[STATUS_FALHA]}"
+    )
+
+
+def exibir_lote_anterior(lote, chave):
+    """Resumo do último lote da sessão (ainda na fila ou já concluído)."""
+    progresso = fila.progresso(lote)
+    em_andamento = progresso[STATUS_PENDENTE] + progresso[STATUS_EXECUTANDO]
+    st.caption(
+        f"Último lote ({lote}): {progresso[STATUS_CONCLUIDA]} concluídas, "
+        f"{progresso[STATUS_FALHA]} com falha, {em_andamento} em andamento."
+    )
+    if em_andamento and st.button("Acompanhar lote", key=f"acompanhar_{chave}"):
+        acompanhar_lote(lote)
+
+
 # --- Inicialização do Sistema ---
 try:
     ai_service.configurar_ia()
 
-    # Carrega o prompt apenas uma vez na sessão para otimizar
-    if "prompt_mestre" not in st.session_state:
-        st.session_state["prompt_mestre"] = ai_service.carregar_prompt()
-    PROMPT_MESTRE = st.session_state["prompt_mestre"]
+    # O prompt fica em memória e só é relido quando o prompt.txt muda (o
+    # contexto em cache no Gemini acompanha a versão atual)
+    PROMPT_MESTRE = ai_service.carregar_prompt()
+
+    # Lotes são enfileirados e executados pelos trabalhadores da fila
+    fila = obter_fila()
 
 except Exception as e:
     st.error(f"Erro Crítico na Inicialização: {e}")
@@ -57,6 +140,10 @@ with st.sidebar:
     st.write("1. Escolha entre correção individual ou em lote.")
     st.write("2. No modo individual, envie o arquivo e baixe o resultado.")
     st.write("3. No modo em lote, indique as pastas no seu computador.")
+    st.write("4. Os lotes são corrigidos pelo `trabalhador_fila.py` (deixe-o rodando).")
+
+# Campos acrescentados a todas as correções dos lotes
+dados_turma = {"ano_turma": entrada_ano, "bimestre": entrada_bimestre}
 
 # --- Criação das Abas ---
 tab1, tab2, tab3 = st.tabs(
@@ -69,35 +156,43 @@ tab1, tab2, tab3 = st.tabs(
 
 # --- ABA 1: CORREÇÃO INDIVIDUAL ---
 with tab1:
-    st.subheader("Processar uma única imagem")
-    imagem_redacao = st.file_uploader(
-        "Faça o upload da foto da redação",
+    st.subheader("Processar uma única redação")
+    imagens_redacao = st.file_uploader(
+        "Faça o upload da foto da redação (ou de todas as páginas dela)",
         type=["jpg", "png", "jpeg"],
         key="individual",
+        accept_multiple_files=True,
     )
 
-    if imagem_redacao is not None:
+    if imagens_redacao:
         if st.button("Analisar Redação", type="primary", use_container_width=True):
-            temp_dir = Config.TMP_DIR
-            caminho_img_temp = os.path.join(temp_dir, imagem_redacao.name)
-
-            try:
-                with open(caminho_img_temp, "wb") as f:
-                    f.write(imagem_redacao.getbuffer())
-            except Exception as e:
-                st.error(f"Erro ao salvar arquivo temporário: {e}")
-                st.stop()
-
             with st.spinner("Lendo manuscrito e avaliando competências..."):
-                dados_redacao = ai_service.analisar_redacao(
-                    caminho_img_temp, PROMPT_MESTRE
+                # Campos exibidos conforme chegam do streaming da IA
+                campo_aluno = st.empty()
+                campos_notas = [coluna.empty() for coluna in st.columns(5)]
+
+                def mostrar_campo(caminho, valor):
+                    if caminho == ("nome_aluno",):
+                        campo_aluno.markdown(f"**Aluno:** {valor}")
+                    elif (
+                        caminho[0] == "analise_competencias"
+                        and caminho[2:] == ("nota",)
+                        and PADRAO_COMPETENCIA.match(str(caminho[1]))
+                    ):
+                        indice = int(caminho[1][1:]) - 1
+                        campos_notas[indice].metric(caminho[1].upper(), valor)
+
+                # Páginas na ordem do número no nome (ex.: _p1, _p2); sem
+                # número, na ordem do upload
+                paginas_redacao = sorted(
+                    imagens_redacao,
+                    key=lambda imagem: identificar_pagina(imagem.name)[1] or 0,
+                )
+                dados_redacao = ai_service.analisar_redacao_em_memoria(
+                    [imagem.getvalue() for imagem in paginas_redacao],
+                    PROMPT_MESTRE,
+                    ao_receber_campo=mostrar_campo,
                 )
-
-                try:
-                    if os.path.exists(caminho_img_temp):
-                        os.remove(caminho_img_temp)
-                except:
-                    pass
 
                 if dados_redacao:
                     dados_redacao["ano_turma"] = entrada_ano
@@ -140,11 +235,7 @@ with tab2:
 
     with col_input:
         if st.button("📂 Selecionar Pasta de Entrada"):
-            root = tk.Tk()
-            root.withdraw()
-            root.attributes("-topmost", True)
-            caminho_escolhido = filedialog.askdirectory(master=root)
-            root.destroy()
+            caminho_escolhido = selecionar_pasta()
             if caminho_escolhido:
                 st.session_state["pasta_entrada"] = caminho_escolhido
 
@@ -156,11 +247,7 @@ with tab2:
 
     with col_output:
         if st.button("📂 Selecionar Pasta de Saída"):
-            root = tk.Tk()
-            root.withdraw()
-            root.attributes("-topmost", True)
-            caminho_escolhido = filedialog.askdirectory(master=root)
-            root.destroy()
+            caminho_escolhido = selecionar_pasta()
             if caminho_escolhido:
                 st.session_state["pasta_saida"] = caminho_escolhido
 
@@ -182,84 +269,47 @@ with tab2:
                 os.makedirs(pasta_saida)
                 st.info(f"Pasta de saída criada: {pasta_saida}")
 
-            # Lista arquivos de imagem
-            arquivos = [
-                f
-                for f in os.listdir(pasta_entrada)
-                if f.lower().endswith((".png", ".jpg", ".jpeg"))
-            ]
+            # Lista arquivos de imagem (fotos da mesma redação viram um item)
+            arquivos = list(
+                agrupar_redacoes(
+                    {
+                        "id": os.path.join(os.path.abspath(pasta_entrada), f),
+                        "name": f,
+                    }
+                    for f in sorted(os.listdir(pasta_entrada))
+                    if f.lower().endswith((".png", ".jpg", ".jpeg"))
+                )
+            )
 
             if not arquivos:
                 st.warning("Nenhuma imagem (JPG, PNG) encontrada na pasta de entrada.")
             else:
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                log_container = st.container()
-
-                sucessos = 0
-                erros = 0
-
-                for i, nome_arquivo in enumerate(arquivos):
-                    caminho_completo = os.path.join(pasta_entrada, nome_arquivo)
-                    status_text.text(
-                        f"Processando ({i + 1}/{len(arquivos)}): {nome_arquivo}"
-                    )
-
-                    try:
-                        # 1. IA analisa
-                        dados_redacao = ai_service.analisar_redacao(
-                            caminho_completo, PROMPT_MESTRE
-                        )
-
-                        if dados_redacao:
-                            # 2. Injeta dados da turma
-                            dados_redacao["ano_turma"] = entrada_ano
-                            dados_redacao["bimestre"] = entrada_bimestre
-
-                            # 3. Gera DOCX
-                            doc_buffer = report_service.preencher_e_gerar_docx(
-                                dados_redacao
-                            )
-
-                            if doc_buffer:
-                                # 4. Salva no disco local
-                                nome_aluno = dados_redacao.get(
-                                    "nome_aluno", f"Aluno_{i}"
-                                ).replace(" ", "_")
-                                caminho_doc_saida = os.path.join(
-                                    pasta_saida, f"Correcao_{nome_aluno}.docx"
-                                )
-
-                                with open(caminho_doc_saida, "wb") as f:
-                                    f.write(doc_buffer.getbuffer())
-
-                                sucessos += 1
-                                log_container.success(
-                                    f"✅ Sucesso: {nome_arquivo} -> {nome_aluno}"
-                                )
-                            else:
-                                erros += 1
-                                log_container.error(
-                                    f"❌ Erro ao gerar DOCX para: {nome_arquivo}"
-                                )
-                        else:
-                            erros += 1
-                            log_container.error(f"❌ Falha na IA para: {nome_arquivo}")
-
-                    except Exception as e:
-                        erros += 1
-                        log_container.error(
-                            f"💥 Erro inesperado em {nome_arquivo}: {e}"
-                        )
-
-                    # Atualiza progresso
-                    progress_bar.progress((i + 1) / len(arquivos))
-
-                st.divider()
-                st.success(
-                    f"Processamento concluído! Sucessos: {sucessos}, Erros: {erros}"
+                # A correção roda nos trabalhadores da fila: fechar a página ou
+                # recarregar não interrompe o lote
+                lote = novo_lote()
+                enfileiradas = fila.enfileirar(
+                    lote,
+                    (
+                        {
+                            "origem": ORIGEM_LOCAL,
+                            "entrada": arquivo["id"],
+                            "nome": arquivo["name"],
+                            "destino": os.path.abspath(pasta_saida),
+                            "extras": dados_turma,
+                            "paginas": [pagina["id"] for pagina in paginas(arquivo)],
+                        }
+                        for arquivo in arquivos
+                    ),
                 )
-                st.info(f"Os arquivos corrigidos estão em: {pasta_saida}")
+                if not enfileiradas:
+                    st.info("Todas essas imagens já estão na fila de correção.")
+                else:
+                    st.session_state["lote_local"] = lote
+                    acompanhar_lote(lote)
+                    st.info(f"Os arquivos corrigidos estão em: {pasta_saida}")
+
+    elif st.session_state.get("lote_local"):
+        exibir_lote_anterior(st.session_state["lote_local"], "local")
 
 # --- ABA 3: CORREÇÃO EM LOTE DRIVE ---
 with tab3:
@@ -290,91 +340,41 @@ with tab3:
             st.warning("Por favor, forneça links válidos para as pastas do Drive.")
         else:
             try:
-                with st.spinner("Conectando ao Google Drive..."):
-                    drive_service = GoogleDriveService()
-                    itens = drive_service.list_pending_images(id_entrada)
+                with st.spinner("Listando a pasta do Google Drive..."):
+                    drive_service = DriveSincrono(AsyncGoogleDriveService())
+                    try:
+                        lote = novo_lote()
+                        # A listagem vai direto para a fila, página a página
+                        enfileiradas = fila.enfileirar(
+                            lote,
+                            (
+                                {
+                                    "origem": ORIGEM_DRIVE,
+                                    "entrada": item["id"],
+                                    "nome": item["name"],
+                                    "destino": id_saida,
+                                    "md5": item.get("md5Checksum"),
+                                    "extras": dados_turma,
+                                    "paginas": [
+                                        pagina["id"] for pagina in paginas(item)
+                                    ],
+                                }
+                                for item in agrupar_redacoes(
+                                    drive_service.iterar_imagens_pendentes(id_entrada)
+                                )
+                            ),
+                        )
+                    finally:
+                        drive_service.fechar()
 
-                if not itens:
+                if not enfileiradas:
                     st.warning("Nenhuma imagem encontrada na pasta do Drive informada.")
                 else:
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    log_container = st.container()
-
-                    sucessos_drive = 0
-                    erros_drive = 0
-
-                    for i, item in enumerate(itens):
-                        file_id = item["id"]
-                        file_name = item["name"]
-                        status_text.text(
-                            f"Processando ({i + 1}/{len(itens)}): {file_name}"
-                        )
-
-                        caminho_temp = os.path.join(Config.TMP_DIR, file_name)
-
-                        try:
-                            # 1. Download
-                            conteudo = drive_service.download_file(file_id)
-                            with open(caminho_temp, "wb") as f:
-                                f.write(conteudo)
-
-                            # 2. IA
-                            dados = ai_service.analisar_redacao(
-                                caminho_temp, PROMPT_MESTRE
-                            )
-
-                            if dados:
-                                dados["ano_turma"] = entrada_ano
-                                dados["bimestre"] = entrada_bimestre
-
-                                # 3. DOCX
-                                doc_buffer = report_service.preencher_e_gerar_docx(
-                                    dados
-                                )
-
-                                if doc_buffer:
-                                    # 4. Upload
-                                    nome_aluno = dados.get(
-                                        "nome_aluno", f"Aluno_{i}"
-                                    ).replace(" ", "_")
-                                    nome_final = f"Correcao_{nome_aluno}.docx"
-
-                                    novo_id = drive_service.upload_docx(
-                                        doc_buffer, nome_final, id_saida
-                                    )
-
-                                    if novo_id:
-                                        sucessos_drive += 1
-                                        log_container.success(
-                                            f"✅ Sucesso: {file_name} enviado para o Drive."
-                                        )
-                                    else:
-                                        erros_drive += 1
-                                        log_container.error(
-                                            f"❌ Falha no upload: {file_name}"
-                                        )
-                                else:
-                                    erros_drive += 1
-                                    log_container.error(
-                                        f"❌ Erro ao gerar DOCX: {file_name}"
-                                    )
-                            else:
-                                erros_drive += 1
-                                log_container.error(f"❌ Falha na IA: {file_name}")
-
-                        except Exception as e:
-                            erros_drive += 1
-                            log_container.error(f"💥 Erro em {file_name}: {e}")
-                        finally:
-                            if os.path.exists(caminho_temp):
-                                os.remove(caminho_temp)
-
-                        progress_bar.progress((i + 1) / len(itens))
-
-                    st.success(
-                        f"Concluído! Sucessos: {sucessos_drive}, Erros: {erros_drive}"
-                    )
+                    st.session_state["lote_drive"] = lote
+                    acompanhar_lote(lote)
 
             except Exception as drive_err:
                 st.error(f"Erro ao acessar o Google Drive: {drive_err}")
+
+    elif st.session_state.get("lote_drive"):
+        exibir_lote_anterior(st.session_state["lote_drive"], "drive")
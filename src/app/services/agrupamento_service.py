@@ -0,0 +1,145 @@
+import csv
+import hashlib
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+# Convenção de nomes para redações com mais de uma foto: o mesmo nome seguido
+# do número da página, ex.: "maria_p1.jpg" e "maria_p2.jpg", "João - pag 2.png"
+PADRAO_PAGINA = re.compile(
+    r"^(?P<base>.+?)[\s._-]+(?:p|pag|pág|pagina|página)[\s._-]*(?P<numero>\d{1,2})$",
+    re.IGNORECASE,
+)
+
+# Texto enviado junto com as fotos quando a redação tem mais de uma página
+INSTRUCAO_PAGINAS = (
+    "Esta redação foi fotografada em {total} imagens, enviadas na ordem das "
+    "páginas. Trate-as como um único texto contínuo e faça uma única correção."
+)
+
+Item = Dict[str, Any]
+
+
+def identificar_pagina(nome: str) -> Tuple[str, Optional[int]]:
+    """
+    Separa o nome do arquivo (sem extensão) em nome da redação e número da
+    página. Arquivos fora da convenção retornam (nome, None).
+    """
+    raiz = os.path.splitext(nome)[0]
+    match = PADRAO_PAGINA.match(raiz)
+    if not match:
+        return raiz, None
+    return match.group("base"), int(match.group("numero"))
+
+
+def instrucao_paginas(total: int) -> Optional[str]:
+    """Instrução para a IA sobre as páginas, ou None se houver só uma."""
+    return INSTRUCAO_PAGINAS.format(total=total) if total > 1 else None
+
+
+def paginas(item: Item) -> List[Item]:
+    """Páginas de uma redação, na ordem (redações de uma foto têm uma só)."""
+    return item.get("paginas") or [item]
+
+
+def md5_combinado(md5s: Iterable[Optional[str]]) -> str:
+    """md5 de uma redação com várias páginas: muda se qualquer página mudar."""
+    return hashlib.md5("".join(md5 or "" for md5 in md5s).encode()).hexdigest()
+
+
+def carregar_manifesto(caminho: str) -> Dict[str, str]:
+    """
+    Lê o manifesto de páginas: um CSV com as colunas `arquivo` e `redacao`,
+    uma linha por foto, na ordem das páginas. Fotos com o mesmo valor em
+    `redacao` formam uma única redação.
+    """
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        return {
+            linha["arquivo"].strip(): linha["redacao"].strip()
+            for linha in csv.DictReader(f)
+            if linha.get("arquivo") and linha.get("redacao")
+        }
+
+
+def _juntar(nome: str, grupo: List[Item]) -> Item:
+    if len(grupo) == 1:
+        return grupo[0]
+    # O ID da primeira página identifica a redação (registro de processamento,
+    # nome do relatório)
+    return {
+        "id": grupo[0]["id"],
+        "name": nome,
+        "md5Checksum": md5_combinado(pagina.get("md5Checksum") for pagina in grupo),
+        "paginas": grupo,
+    }
+
+
+def agrupar_paginas(
+    itens: Iterable[Item],
+    manifesto: Optional[Dict[str, str]] = None,
+    chave: Callable[[Item], str] = lambda item: item["name"],
+) -> Iterator[Item]:
+    """
+    Junta as fotos de uma mesma redação, pelo manifesto ou pela convenção de
+    nomes (ver PADRAO_PAGINA).
+
+    Fotos avulsas seguem adiante assim que chegam; só as que parecem fazer
+    parte de uma redação com várias páginas esperam o fim da listagem, já que
+    a outra página pode vir depois. Redações com mais de uma página saem como
+    um item com a lista `paginas` (na ordem), o ID da primeira e um md5 que
+    combina o de todas.
+
+    Args:
+        itens (Iterable[Item]): Arquivos listados (ex.: ArquivoDrive).
+        manifesto (Optional[Dict[str, str]]): Arquivo → redação, na ordem das
+            páginas (ver `carregar_manifesto`).
+        chave (Callable): Nome usado para agrupar (ex.: o caminho relativo,
+            para não juntar fotos de pastas diferentes).
+    """
+    manifesto = manifesto or {}
+    ordem_manifesto = {arquivo: i for i, arquivo in enumerate(manifesto)}
+    grupos: Dict[str, List[Tuple[int, Item]]] = {}
+
+    for item in itens:
+        nome = chave(item)
+        if nome in manifesto:
+            grupo, numero = f"manifesto:{manifesto[nome]}", ordem_manifesto[nome]
+        else:
+            base, numero = identificar_pagina(nome)
+            if numero is None:
+                yield item
+                continue
+            grupo = base
+        grupos.setdefault(grupo, []).append((numero, item))
+
+    for grupo, membros in grupos.items():
+        membros.sort(key=lambda membro: membro[0])
+        numeros = [numero for numero, _ in membros]
+        if len(set(numeros)) != len(numeros):
+            logger.warning(f"Páginas repetidas na redação '{grupo}': {numeros}")
+
+        nome = grupo.split(":", 1)[1] if grupo.startswith("manifesto:") else grupo
+        yield _juntar(os.path.basename(nome), [item for _, item in membros])
+
+
+def agrupar_redacoes(
+    itens: Iterable[Item],
+    manifesto: Optional[str] = None,
+    chave: Callable[[Item], str] = lambda item: item["name"],
+) -> Iterator[Item]:
+    """
+    `agrupar_paginas` conforme a configuração (AGRUPAR_PAGINAS e o manifesto
+    em MANIFESTO_PAGINAS_PATH). Um manifesto informado na chamada vale mesmo
+    com o agrupamento desativado na configuração.
+    """
+    if not Config.AGRUPAR_PAGINAS and not manifesto:
+        return iter(itens)
+    caminho = manifesto or Config.MANIFESTO_PAGINAS_PATH
+    return agrupar_paginas(
+        itens, carregar_manifesto(caminho) if caminho else None, chave
+    )
@@ -1,15 +1,90 @@
+import io
 import json
+import logging
 import os
-from typing import Any, Dict, Optional, TypedDict
-
-import google.generativeai as genai
-from PIL import Image
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+    is_typeddict,
+)
 
 from app.core.logger import get_logger
+from app.services.agrupamento_service import instrucao_paginas
+from app.services.cache_service import gerar_chave, obter_cache
+from app.services.image_service import (
+    eh_imagem_pil,
+    parametros_preprocessamento,
+    preparar_para_envio,
+)
+from app.services.metricas_service import (
+    ETAPA_IA,
+    ETAPA_JSON,
+    ETAPA_PREPROCESSAMENTO,
+    ETAPA_VALIDACAO,
+    obter_coletor,
+)
+from app.services.prompt_cache_service import obter_gerenciador
+from app.services.rate_limit_service import obter_agendador
+from app.services.stream_json_service import Caminho, RespostaInvalida, ler_stream_json
 from config import Config
 
+# O SDK do Gemini e o Pillow levam quase um segundo para importar: ficam para
+# a primeira chamada, e os scripts que só listam ou enfileiram iniciam rápido
+if TYPE_CHECKING:
+    import google.generativeai as genai
+    from PIL import Image
+
 logger = get_logger(__name__)
 
+# Formas aceitas para a imagem da redação: bytes, arquivo aberto ou imagem PIL
+FonteImagem = Union[bytes, BinaryIO, "Image.Image"]
+
+# Separador entre as páginas na chave do cache de redações com várias fotos
+SEPARADOR_PAGINAS = b"\0--pagina--\0"
+
+# Competências avaliadas e notas permitidas em cada uma (escala de 40 pontos
+# do prompt.txt)
+COMPETENCIAS = ("c1", "c2", "c3", "c4", "c5")
+ESCALA_NOTAS = (0, 40, 80, 120, 160, 200)
+NOTA_MAXIMA_COMPETENCIA = ESCALA_NOTAS[-1]
+
+# Pedido de nova correção só das competências que vieram com problema
+INSTRUCAO_RECORRECAO = (
+    "As competências {competencias} da sua correção vieram ausentes, sem "
+    "análise ou com nota fora da escala {escala}. Corrija de novo apenas essas "
+    "competências desta mesma redação, seguindo as mesmas regras, e responda "
+    "somente com o JSON delas."
+)
+
+
+# Estimativa de tokens por chamada, reservada na cota antes do envio e
+# corrigida depois pelo uso real informado na resposta
+TOKENS_POR_IMAGEM = 258
+TOKENS_SAIDA_ESTIMADOS = 2000
+
+# Registro de modelos do processo, reaproveitados entre chamadas, threads e
+# reruns do Streamlit (o módulo só é importado uma vez por processo)
+_modelos: Dict[Tuple[str, str, Optional[str]], "genai.GenerativeModel"] = {}
+_registro_lock = threading.Lock()
+_ia_configurada = False
+
+# Prompt lido do disco, recarregado apenas quando o arquivo muda
+_prompts: Dict[str, Tuple[float, str]] = {}
+
 
 class DetalheCompetencia(TypedDict):
     nota: int
@@ -34,39 +109,183 @@ class CorrecaoRedacao(TypedDict):
     analise_competencias: AnaliseCompetencias
 
 
-def configurar_ia() -> None:
+def erros_transporte() -> Tuple[type, ...]:
+    """
+    Falhas de comunicação que justificam repetir a chamada inteira (429/503 já
+    são repetidos pelo agendador).
+    """
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        ConnectionError,
+        TimeoutError,
+    )
+
+
+# Tipos Python -> tipos do Schema da API (subconjunto OpenAPI do Gemini)
+_TIPOS_SCHEMA = {str: "STRING", int: "INTEGER", float: "NUMBER", bool: "BOOLEAN"}
+
+
+def compilar_schema(tipo: Any) -> Dict[str, Any]:
+    """
+    Converte um TypedDict (e os tipos dos seus campos) no `response_schema`
+    aceito pelo Gemini, em forma de dicionário serializável em JSON (usado
+    também na chave do cache e nas requisições da Batch API).
+
+    Suporta str, int, float, bool, Optional[...], List[...] e TypedDicts
+    aninhados.
+    """
+    argumentos = [a for a in get_args(tipo) if a is not type(None)]
+
+    if get_origin(tipo) is Union:
+        if len(argumentos) != 1:
+            raise TypeError(f"União não suportada no schema: {tipo}")
+        return {**compilar_schema(argumentos[0]), "nullable": True}
+
+    if get_origin(tipo) in (list, List):
+        return {"type": "ARRAY", "items": compilar_schema(argumentos[0])}
+
+    if is_typeddict(tipo):
+        campos = get_type_hints(tipo)
+        return {
+            "type": "OBJECT",
+            "properties": {
+                nome: compilar_schema(tipo_campo)
+                for nome, tipo_campo in campos.items()
+            },
+            "required": [nome for nome in campos if nome in tipo.__required_keys__],
+        }
+
+    if tipo in _TIPOS_SCHEMA:
+        return {"type": _TIPOS_SCHEMA[tipo]}
+
+    raise TypeError(f"Tipo não suportado no schema: {tipo}")
+
+
+# Parâmetros de geração usados na correção (também compõem a chave do cache).
+# O schema obriga o modelo a devolver exatamente a estrutura de
+# CorrecaoRedacao, sem cercas de markdown nem campos faltando.
+PARAMETROS_GERACAO: Dict[str, Any] = {
+    "response_mime_type": "application/json",
+    "response_schema": compilar_schema(CorrecaoRedacao),
+    "temperature": 0.1,  # ← Mudou de 0.3 para 0.1 (mais determinístico)
+    "max_output_tokens": 8000,
+}
+
+
+def configurar_ia(forcar: bool = False) -> None:
     """
     Configura a autenticação usando a API KEY direta.
+    Executa apenas uma vez por processo, a menos que `forcar` seja True.
     """
-    try:
-        api_key = os.getenv("GEMINI_API_KEY")
+    global _ia_configurada
+    with _registro_lock:
+        if _ia_configurada and not forcar:
+            return
 
-        if not api_key:
-            logger.warning(
-                "GEMINI_API_KEY não encontrada. Tentando método legado (JSON)..."
-            )
-            cred_file = Config.GOOGLE_CREDENTIALS_PATH
-            if os.path.exists(cred_file):
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred_file
-            else:
-                raise ValueError(
-                    "Nenhuma chave de API ou arquivo de credenciais encontrado."
+        try:
+            api_key = os.getenv("GEMINI_API_KEY")
+
+            if not api_key:
+                logger.warning(
+                    "GEMINI_API_KEY não encontrada. Tentando método legado (JSON)..."
                 )
+                cred_file = Config.GOOGLE_CREDENTIALS_PATH
+                if os.path.exists(cred_file):
+                    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred_file
+                else:
+                    raise ValueError(
+                        "Nenhuma chave de API ou arquivo de credenciais encontrado."
+                    )
+
+            if api_key:
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+
+            # Modelos criados antes de uma reconfiguração usariam o cliente antigo
+            _modelos.clear()
+            _ia_configurada = True
+            logger.info("IA Configurada com sucesso (Método API Key).")
+
+        except Exception as e:
+            logger.error(f"Erro ao configurar a API: {e}")
+            raise
+
+
+def obter_modelo(
+    model_name: Optional[str] = None,
+    parametros_geracao: Optional[Dict[str, Any]] = None,
+    contexto_cacheado: Optional[str] = None,
+) -> "genai.GenerativeModel":
+    """
+    Retorna o modelo Gemini do registro do processo, criando-o na primeira vez.
 
-        if api_key:
-            genai.configure(api_key=api_key)
+    Os modelos são indexados pelo nome e pelos parâmetros de geração, e são
+    compartilhados com segurança entre threads.
 
-        logger.info("IA Configurada com sucesso (Método API Key).")
+    Args:
+        model_name (Optional[str]): Nome do modelo (padrão: Config.MODEL_NAME).
+        parametros_geracao (Optional[Dict[str, Any]]): Parâmetros do
+            `GenerationConfig`; None usa os padrões do modelo.
+        contexto_cacheado (Optional[str]): Nome de um contexto em cache
+            ("cachedContents/..."); o modelo passa a usá-lo em toda chamada.
 
-    except Exception as e:
-        logger.error(f"Erro ao configurar a API: {e}")
-        raise
+    Returns:
+        genai.GenerativeModel: Instância compartilhada do modelo.
+    """
+    model_name = model_name or Config.MODEL_NAME
+    chave = (
+        model_name,
+        json.dumps(parametros_geracao or {}, sort_keys=True),
+        contexto_cacheado,
+    )
+
+    modelo = _modelos.get(chave)
+    if modelo is not None:
+        return modelo
+
+    import google.generativeai as genai
+
+    with _registro_lock:
+        modelo = _modelos.get(chave)
+        if modelo is None:
+            generation_config = (
+                genai.GenerationConfig(**parametros_geracao)
+                if parametros_geracao
+                else None
+            )
+            if contexto_cacheado:
+                modelo = genai.GenerativeModel.from_cached_content(
+                    contexto_cacheado, generation_config=generation_config
+                )
+            else:
+                modelo = genai.GenerativeModel(
+                    model_name=model_name, generation_config=generation_config
+                )
+            _modelos[chave] = modelo
+            logger.info(f"Modelo '{model_name}' registrado para reuso.")
+        return modelo
 
 
 def carregar_prompt(caminho_prompt: str = Config.PROMPT_PATH) -> str:
-    """Carrega o prompt do arquivo."""
+    """
+    Carrega o prompt do arquivo. O conteúdo fica em memória e só é lido de novo
+    quando o arquivo é modificado.
+    """
+    modificado_em = os.path.getmtime(caminho_prompt)
+    em_memoria = _prompts.get(caminho_prompt)
+    if em_memoria and em_memoria[0] == modificado_em:
+        return em_memoria[1]
+
     with open(caminho_prompt, "r", encoding="utf-8") as f:
-        return f.read()
+        prompt = f.read()
+    if em_memoria:
+        logger.info(f"Prompt alterado em disco, recarregado: {caminho_prompt}")
+    _prompts[caminho_prompt] = (modificado_em, prompt)
+    return prompt
 
 
 def limpar_resposta_json(texto: str) -> str:
@@ -115,75 +334,565 @@ def validar_e_corrigir_dados(dados: Dict[str, Any]) -> Dict[str, Any]:
     return dados
 
 
+def abrir_imagem(imagem: FonteImagem) -> "Image.Image":
+    """
+    Converte a fonte recebida em uma imagem PIL, sem passar pelo disco.
+
+    Args:
+        imagem (FonteImagem): Bytes, objeto file-like ou imagem PIL.
+
+    Returns:
+        Image.Image: A imagem pronta para envio à IA.
+    """
+    if eh_imagem_pil(imagem):
+        return imagem
+    from PIL import Image
+
+    if isinstance(imagem, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(imagem))
+    return Image.open(imagem)
+
+
 def analisar_redacao(caminho_imagem: str, prompt: str) -> Optional[Dict[str, Any]]:
+    """
+    Analisa uma redação a partir de um arquivo de imagem no disco.
+    Mantido para compatibilidade; delega para `analisar_redacao_em_memoria`.
+    """
+    if not os.path.exists(caminho_imagem):
+        logger.error(f"Imagem não encontrada: {caminho_imagem}")
+        return None
+
+    logger.info(f"Carregando imagem: {caminho_imagem}")
+    try:
+        with open(caminho_imagem, "rb") as f:
+            conteudo = f.read()
+    except OSError as e:
+        logger.error(f"Erro ao ler a imagem '{caminho_imagem}': {e}")
+        return None
+
+    return analisar_redacao_em_memoria(conteudo, prompt)
+
+
+def _conteudo_para_chave(imagem: Union[bytes, "Image.Image"]) -> bytes:
+    """Retorna os bytes que identificam a imagem na chave do cache."""
+    if eh_imagem_pil(imagem):
+        cabecalho = f"{imagem.mode}:{imagem.size}".encode()
+        return cabecalho + imagem.tobytes()
+    return bytes(imagem)
+
+
+def analisar_redacao_em_memoria(
+    imagem: Union[FonteImagem, List[FonteImagem], Tuple[FonteImagem, ...]],
+    prompt: str,
+    usar_cache: bool = True,
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Analisa uma redação usando o Gemini Vision.
-    Retorna um dicionário com os dados da correção.
+    Aceita a imagem em memória (bytes, file-like ou PIL) e
+    retorna um dicionário com os dados da correção.
+
+    Redações fotografadas em mais de uma imagem são passadas como uma lista
+    de páginas, na ordem: todas vão na mesma chamada e recebem uma única
+    correção.
+
+    Correções já feitas para a mesma imagem, prompt, modelo e parâmetros de
+    geração são devolvidas do cache persistente, sem nova chamada à IA.
+    Use `usar_cache=False` para forçar uma nova correção.
+
+    Com `ao_receber_campo`, cada valor da resposta (ex.: nome do aluno, nota de
+    uma competência) é repassado assim que chega do streaming, com o caminho
+    dele no JSON, ex.: ("analise_competencias", "c1", "nota").
     """
+    paginas = list(imagem) if isinstance(imagem, (list, tuple)) else [imagem]
+    paginas = [
+        pagina
+        if eh_imagem_pil(pagina) or isinstance(pagina, (bytes, bytearray, memoryview))
+        else pagina.read()
+        for pagina in paginas
+    ]
+
+    cache = obter_cache() if usar_cache else None
+    chave = None
+    if cache:
+        try:
+            # Uma página só: mesma chave de antes do suporte a várias páginas
+            chave = gerar_chave(
+                SEPARADOR_PAGINAS.join(map(_conteudo_para_chave, paginas)),
+                prompt,
+                Config.MODEL_NAME,
+                {
+                    **PARAMETROS_GERACAO,
+                    "preprocessamento": parametros_preprocessamento(),
+                },
+            )
+            dados = cache.obter(chave)
+            if dados:
+                logger.info(
+                    f"Correção recuperada do cache: {dados.get('nome_aluno')}"
+                )
+                return dados
+        except Exception as e:
+            logger.warning(f"Cache de correções indisponível (ignorando): {e}")
+            chave = None
+
+    dados = _consultar_ia(paginas, prompt, ao_receber_campo)
+
+    if dados and cache and chave:
+        try:
+            cache.salvar(chave, dados)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar a correção no cache: {e}")
+
+    return dados
+
+
+def estimar_tokens(prompt: str, paginas: int = 1) -> int:
+    """
+    Estimativa grosseira do total de tokens de uma correção (~4 caracteres por
+    token no prompt, mais as imagens e a resposta).
+    """
+    return len(prompt) // 4 + TOKENS_POR_IMAGEM * paginas + TOKENS_SAIDA_ESTIMADOS
+
+
+def _tokens_usados(response: Any) -> Optional[int]:
+    uso = getattr(response, "usage_metadata", None)
+    return getattr(uso, "total_token_count", None) or None
+
+
+def _uso_tokens(response: Any) -> Dict[str, int]:
+    """Tokens de entrada, saída e do contexto em cache, para as métricas."""
     try:
-        generation_config = genai.GenerationConfig(
-            response_mime_type="application/json",
-            temperature=0.1,  # ← Mudou de 0.3 para 0.1 (mais determinístico)
-            max_output_tokens=8000,
-        )
+        uso = response.usage_metadata
+    except Exception:
+        # Streaming interrompido antes dos metadados
+        return {}
+    if not uso:
+        return {}
+    return {
+        "tokens_entrada": getattr(uso, "prompt_token_count", 0) or 0,
+        "tokens_saida": getattr(uso, "candidates_token_count", 0) or 0,
+        "tokens_cache": getattr(uso, "cached_content_token_count", 0) or 0,
+    }
+
+
+def _nota_na_escala(valor: Any) -> bool:
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        return False
+    return valor in ESCALA_NOTAS
+
+
+def validar_campo_correcao(caminho: Caminho, valor: Any) -> Optional[str]:
+    """
+    Regras verificadas em cada campo da correção assim que ele chega no
+    streaming, para abortar cedo uma resposta fora do formato.
+    """
+    if not caminho:
+        return None
 
-        model = genai.GenerativeModel(
-            model_name=Config.MODEL_NAME, generation_config=generation_config
-        )
+    if caminho[0] == "nota_final" and len(caminho) == 1:
+        if not isinstance(valor, int) or isinstance(valor, bool):
+            return f"nota_final não numérica: {valor!r}"
+        if valor % ESCALA_NOTAS[1] or not 0 <= valor <= NOTA_MAXIMA_COMPETENCIA * 5:
+            return f"nota_final fora da escala: {valor}"
 
-        if not os.path.exists(caminho_imagem):
-            logger.error(f"Imagem não encontrada: {caminho_imagem}")
-            return None
+    elif caminho[0] == "analise_competencias" and len(caminho) >= 2:
+        competencia = caminho[1]
+        if competencia not in COMPETENCIAS:
+            return f"Competência desconhecida: {competencia}"
+        if caminho[2:] == ("nota",) and not _nota_na_escala(valor):
+            return f"Nota de {competencia} fora da escala {ESCALA_NOTAS}: {valor!r}"
 
-        logger.info(f"Carregando imagem: {caminho_imagem}")
-        img = Image.open(caminho_imagem)
+    return None
 
-        logger.info("Enviando para a IA...")
-        response = model.generate_content([prompt, img])
 
-        if not response or not response.text:
-            logger.error("IA retornou resposta vazia")
-            return None
+def problemas_competencias(dados: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Competências que vieram ausentes, sem análise ou com nota fora da escala,
+    com o motivo de cada uma. Podem ser recorrigidas isoladamente.
+    """
+    competencias = dados.get("analise_competencias")
+    if not isinstance(competencias, dict):
+        competencias = {}
+
+    problemas: Dict[str, str] = {}
+    for competencia in COMPETENCIAS:
+        detalhe = competencias.get(competencia)
+        if not isinstance(detalhe, dict) or "nota" not in detalhe:
+            problemas[competencia] = f"Nota de {competencia} ausente"
+        elif not _nota_na_escala(detalhe["nota"]):
+            problemas[competencia] = (
+                f"Nota de {competencia} fora da escala {ESCALA_NOTAS}: "
+                f"{detalhe['nota']!r}"
+            )
+        elif not str(detalhe.get("analise") or "").strip():
+            problemas[competencia] = f"Análise de {competencia} vazia"
+    return problemas
 
-        # Log da resposta bruta
-        logger.info("=" * 70)
-        logger.info("RESPOSTA BRUTA DA IA:")
-        logger.info(
-            response.text[:500] + "..." if len(response.text) > 500 else response.text
-        )
-        logger.info("=" * 70)
 
-        # Limpa e parseia o JSON
-        texto_limpo = limpar_resposta_json(response.text)
-        dados = json.loads(texto_limpo)
+def _validar_estrutura(dados: Any) -> Optional[str]:
+    """Problemas que invalidam a resposta inteira (exigem nova chamada)."""
+    if not isinstance(dados, dict):
+        return "A resposta não é um objeto JSON"
 
-        # Valida e corrige os dados
-        dados = validar_e_corrigir_dados(dados)
+    for campo in CorrecaoRedacao.__required_keys__:
+        if campo not in dados:
+            return f"Campo obrigatório ausente: {campo}"
 
-        # Log dos dados extraídos
-        logger.info("Dados extraídos após validação:")
-        logger.info(f"  - Nome: {dados.get('nome_aluno')}")
-        logger.info(f"  - Tema: {dados.get('tema_redacao', '')[:50]}...")
-        logger.info(f"  - Data: {dados.get('data_redacao')}")
-        logger.info(f"  - Nota Final: {dados.get('nota_final')}")
+    if not isinstance(dados["analise_competencias"], dict):
+        return "analise_competencias não é um objeto"
+    for competencia in dados["analise_competencias"]:
+        if competencia not in COMPETENCIAS:
+            return f"Competência desconhecida: {competencia}"
 
-        for i in range(1, 6):
-            nota = dados["analise_competencias"].get(f"c{i}", {}).get("nota", 0)
-            logger.info(f"  - C{i}: {nota} pontos")
+    return validar_campo_correcao(("nota_final",), dados["nota_final"])
 
-        return dados
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Erro ao parsear JSON da IA: {e}")
-        # 'response' pode não estar definido se o erro ocorrer antes da atribuição
-        response_text_for_log = (
-            response.text if "response" in locals() and response else "N/A"
+def validar_correcao(dados: Any) -> Optional[str]:
+    """
+    Validação rápida da correção completa: estrutura de CorrecaoRedacao e
+    notas na escala 0/40/80/120/160/200.
+
+    Returns:
+        Optional[str]: O primeiro problema encontrado, ou None se válida.
+    """
+    problema = _validar_estrutura(dados)
+    if problema:
+        return problema
+    return next(iter(problemas_competencias(dados).values()), None)
+
+
+def _validar_campo_estrutura(caminho: Caminho, valor: Any) -> Optional[str]:
+    # Com a recorreção parcial, uma nota fora da escala não interrompe o
+    # streaming: só aquela competência é pedida de novo no final
+    if caminho[:1] == ("analise_competencias",) and caminho[2:] == ("nota",):
+        return None
+    return validar_campo_correcao(caminho, valor)
+
+
+def _textos_do_stream(response: Any, leitura: Dict[str, float]) -> Iterator[str]:
+    # Acumula em `leitura` o tempo esperando a rede e os bytes recebidos, para
+    # separar a geração do modelo da leitura do JSON nas métricas
+    pedacos = iter(response)
+    while True:
+        inicio = time.perf_counter()
+        try:
+            pedaco = next(pedacos)
+        except StopIteration:
+            return
+        finally:
+            leitura["espera"] += time.perf_counter() - inicio
+        leitura.setdefault("primeiro_pedaco_ms", leitura["espera"] * 1000)
+
+        try:
+            texto = pedaco.text
+        except ValueError:
+            # Pedaço sem texto (ex.: só o motivo de término ou metadados)
+            continue
+        if texto:
+            leitura["bytes_resposta"] += len(texto.encode("utf-8"))
+            yield texto
+
+
+def _chamar_modelo(
+    model: "genai.GenerativeModel",
+    conteudo: List[Any],
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]],
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Faz uma chamada ao modelo e retorna a resposta e o JSON lido dela.
+
+    Em streaming, cada campo é validado conforme chega e a leitura para no
+    primeiro problema, sem esperar o restante da geração.
+
+    Raises:
+        RespostaInvalida: Resposta vazia, truncada ou fora do formato.
+    """
+    parcial = Config.IA_RECORRECAO_PARCIAL
+    coletor = obter_coletor()
+
+    if not Config.IA_STREAMING:
+        with coletor.medir(ETAPA_IA, streaming=False) as span:
+            response = model.generate_content(conteudo)
+            if not response or not response.text:
+                raise RespostaInvalida("IA retornou resposta vazia")
+            span.update(
+                _uso_tokens(response),
+                bytes_resposta=len(response.text.encode("utf-8")),
+            )
+        with coletor.medir(ETAPA_JSON):
+            try:
+                dados = json.loads(limpar_resposta_json(response.text))
+            except json.JSONDecodeError as e:
+                logger.debug(f"Texto recebido: {response.text[:500]}")
+                raise RespostaInvalida(f"Erro ao parsear JSON da IA: {e}") from e
+    else:
+        with coletor.medir(ETAPA_IA, streaming=True) as span:
+            response = model.generate_content(conteudo, stream=True)
+            leitura = {"espera": 0.0, "bytes_resposta": 0}
+            inicio = time.perf_counter()
+            try:
+                dados = ler_stream_json(
+                    _textos_do_stream(response, leitura),
+                    _validar_campo_estrutura if parcial else validar_campo_correcao,
+                    ao_receber_campo,
+                )
+            finally:
+                # A leitura do JSON acontece entre um pedaço e outro: o que não
+                # foi espera pela rede é tempo de parsing e validação por campo
+                coletor.registrar(
+                    ETAPA_JSON,
+                    time.perf_counter() - inicio - leitura.pop("espera"),
+                    bytes=leitura["bytes_resposta"],
+                )
+                span.update(_uso_tokens(response), **leitura)
+
+    with coletor.medir(ETAPA_VALIDACAO):
+        problema = _validar_estrutura(dados) if parcial else validar_correcao(dados)
+    if problema:
+        raise RespostaInvalida(problema)
+    return response, dados
+
+
+def _conteudo_inicial(
+    imgs: List[Any], prompt: str, contexto: Optional[str]
+) -> List[Any]:
+    # Com um contexto em cache, o prompt já está no servidor
+    conteudo = [] if contexto else [prompt]
+    instrucao = instrucao_paginas(len(imgs))
+    if instrucao:
+        conteudo.append(instrucao)
+    return conteudo + imgs
+
+
+def _gerar_resposta(
+    imgs: List[Any],
+    prompt: str,
+    contexto: Optional[str],
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]] = None,
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Chama o modelo pelo agendador, que respeita as cotas (RPM/TPM), ajusta a
+    concorrência e repete a chamada em caso de 429/503. Com um contexto em
+    cache, o prompt já está no servidor e só as imagens são enviadas.
+    """
+    model = obter_modelo(Config.MODEL_NAME, PARAMETROS_GERACAO, contexto)
+    conteudo = _conteudo_inicial(imgs, prompt, contexto)
+    return obter_agendador().executar(
+        lambda: _chamar_modelo(model, conteudo, ao_receber_campo),
+        tokens_estimados=estimar_tokens(prompt, len(imgs)),
+        contar_tokens=lambda resultado: _tokens_usados(resultado[0]),
+    )
+
+
+def _gerar_competencias(
+    imgs: List[Any],
+    prompt: str,
+    contexto: Optional[str],
+    dados: Dict[str, Any],
+    competencias: List[str],
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Pede ao modelo só as competências informadas, continuando a conversa da
+    correção anterior (mesmas imagens já preparadas e mesmo contexto em cache).
+    O schema da resposta contém apenas essas competências.
+    """
+    parametros = {
+        **PARAMETROS_GERACAO,
+        "response_schema": {
+            "type": "OBJECT",
+            "properties": {
+                competencia: compilar_schema(DetalheCompetencia)
+                for competencia in competencias
+            },
+            "required": competencias,
+        },
+    }
+    model = obter_modelo(Config.MODEL_NAME, parametros, contexto)
+    conteudo = [
+        {"role": "user", "parts": _conteudo_inicial(imgs, prompt, contexto)},
+        {"role": "model", "parts": [json.dumps(dados, ensure_ascii=False)]},
+        {
+            "role": "user",
+            "parts": [
+                INSTRUCAO_RECORRECAO.format(
+                    competencias=", ".join(competencias), escala=ESCALA_NOTAS
+                )
+            ],
+        },
+    ]
+
+    def chamar() -> Tuple[Any, Dict[str, Any]]:
+        with obter_coletor().medir(ETAPA_IA, recorrecao=len(competencias)) as span:
+            response = model.generate_content(conteudo)
+            span.update(
+                _uso_tokens(response),
+                bytes_resposta=len(response.text.encode("utf-8")),
+            )
+        with obter_coletor().medir(ETAPA_JSON):
+            return response, json.loads(limpar_resposta_json(response.text))
+
+    return obter_agendador().executar(
+        chamar,
+        tokens_estimados=estimar_tokens(prompt, len(imgs)),
+        contar_tokens=lambda resultado: _tokens_usados(resultado[0]),
+    )
+
+
+def _recorrigir_competencias(
+    imgs: List[Any],
+    prompt: str,
+    contexto: Optional[str],
+    dados: Dict[str, Any],
+    problemas: Dict[str, str],
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Recorrige apenas as competências com problema e as incorpora à correção.
+    Retorna None se alguma continuar inválida depois da última tentativa: a
+    correção não é aproveitada (nem guardada no cache) e a redação fica como
+    falha, para ser corrigida de novo na próxima execução.
+    """
+    gerenciador = obter_gerenciador()
+    competencias = dados["analise_competencias"]
+
+    tentativas = max(0, Config.IA_TENTATIVAS_RECORRECAO)
+    for tentativa in range(1, tentativas + 1):
+        if not problemas:
+            break
+        faltando = list(problemas)
+        logger.warning(
+            f"Recorrigindo só {', '.join(faltando)} "
+            f"(tentativa {tentativa}/{tentativas}): {'; '.join(problemas.values())}"
         )
+        try:
+            response, parcial = _gerar_competencias(
+                imgs, prompt, contexto, dados, faltando
+            )
+        except Exception as e:
+            logger.warning(f"Falha na recorreção parcial: {e}")
+            continue
+
+        if gerenciador:
+            gerenciador.registrar_uso(response)
+        for competencia in faltando:
+            if isinstance(parcial, dict) and competencia in parcial:
+                competencias[competencia] = parcial[competencia]
+        problemas = problemas_competencias(dados)
+
+        if ao_receber_campo:
+            for competencia in faltando:
+                if competencia not in problemas:
+                    caminho = ("analise_competencias", competencia, "nota")
+                    ao_receber_campo(caminho, competencias[competencia]["nota"])
+
+    if problemas:
         logger.error(
-            f"Texto recebido: {response_text_for_log[:500] if response_text_for_log else 'N/A'}"
+            f"Competências sem correção válida após a recorreção: "
+            f"{'; '.join(problemas.values())}"
         )
         return None
 
+    # A nota final passa a ser recalculada a partir das competências
+    dados["nota_final"] = 0
+    return dados
+
+
+def _consultar_ia(
+    paginas: List[Union[bytes, "Image.Image"]],
+    prompt: str,
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Envia as páginas e o prompt ao Gemini e retorna os dados validados.
+
+    Política de novas tentativas (além do 429/503, tratado pelo agendador):
+    falhas de comunicação e respostas truncadas ou malformadas repetem a
+    chamada inteira, até Config.IA_TENTATIVAS_RESPOSTA vezes; competências
+    ausentes ou fora da escala são pedidas de novo isoladamente, e a correção
+    é descartada (None) se alguma continuar inválida.
+    """
+    from google.api_core import exceptions as google_exceptions
+
+    try:
+        # Normaliza/recodifica as imagens para reduzir o payload enviado
+        with obter_coletor().medir(
+            ETAPA_PREPROCESSAMENTO, paginas=len(paginas)
+        ) as span:
+            imgs = [preparar_para_envio(pagina) for pagina in paginas]
+            if all(isinstance(p, (bytes, bytearray, memoryview)) for p in paginas):
+                span["bytes_entrada"] = sum(len(pagina) for pagina in paginas)
+            if all(isinstance(img, dict) for img in imgs):
+                span["bytes_saida"] = sum(len(img["data"]) for img in imgs)
+
+        gerenciador = obter_gerenciador()
+        contexto = gerenciador.obter(prompt, Config.MODEL_NAME) if gerenciador else None
+
+        tentativas = max(1, Config.IA_TENTATIVAS_RESPOSTA)
+        for tentativa in range(1, tentativas + 1):
+            logger.info("Enviando para a IA...")
+            try:
+                try:
+                    response, dados = _gerar_resposta(
+                        imgs, prompt, contexto, ao_receber_campo
+                    )
+                except (
+                    google_exceptions.NotFound,
+                    google_exceptions.PermissionDenied,
+                ) as e:
+                    if not contexto:
+                        raise
+                    # Contexto expirado ou removido no servidor: volta ao
+                    # prompt completo
+                    logger.warning(
+                        f"Contexto em cache inválido ({e}); reenviando o prompt."
+                    )
+                    gerenciador.invalidar(contexto)
+                    contexto = None
+                    response, dados = _gerar_resposta(
+                        imgs, prompt, None, ao_receber_campo
+                    )
+                break
+            except (RespostaInvalida, *erros_transporte()) as e:
+                motivo = (
+                    "Resposta inválida da IA"
+                    if isinstance(e, RespostaInvalida)
+                    else "Falha de comunicação com a IA"
+                )
+                logger.warning(f"{motivo} (tentativa {tentativa}/{tentativas}): {e}")
+                if tentativa == tentativas:
+                    logger.error("IA não retornou uma correção válida.")
+                    return None
+
+        if gerenciador:
+            gerenciador.registrar_uso(response)
+
+        # Resposta bruta só no nível DEBUG (tempos e tokens ficam nas métricas)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Resposta bruta da IA: {response.text[:500]}")
+
+        problemas = problemas_competencias(dados)
+        if problemas:
+            dados = _recorrigir_competencias(
+                imgs, prompt, contexto, dados, problemas, ao_receber_campo
+            )
+            if dados is None:
+                return None
+
+        # Valida e corrige os dados
+        dados = validar_e_corrigir_dados(dados)
+
+        competencias = dados["analise_competencias"]
+        notas = ", ".join(
+            f"{c.upper()}={competencias[c]['nota']}" for c in COMPETENCIAS
+        )
+        logger.info(
+            f"Correção de {dados.get('nome_aluno')}: nota final "
+            f"{dados.get('nota_final')} ({notas})"
+        )
+
+        return dados
+
     except Exception as e:
         logger.error(f"Erro na chamada da IA: {e}")
         import traceback
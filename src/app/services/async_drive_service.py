@@ -0,0 +1,286 @@
+import asyncio
+import io
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from app.core.logger import get_logger
+from app.services.drive_service import (
+    CAMPOS_LISTAGEM,
+    TAMANHO_PAGINA,
+    ArquivoDrive,
+    Progresso,
+    _repetindo,
+    baixar_em_pedacos,
+    enviar_em_pedacos,
+    midia_docx,
+    nova_conexao,
+    obter_cliente,
+    obter_credenciais,
+    query_imagens_pendentes,
+)
+from app.services.metricas_service import ETAPA_DOWNLOAD, ETAPA_UPLOAD, medir
+from config import Config
+
+# Bibliotecas do Google importadas só no uso (ver drive_service)
+if TYPE_CHECKING:
+    import httplib2
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import Resource
+    from googleapiclient.http import HttpRequest
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolConexoes:
+    """
+    Pool de conexões HTTP (httplib2) reutilizáveis.
+
+    Cada conexão é usada por uma requisição de cada vez e devolvida ao pool ao
+    final, mantendo o socket aberto (keep-alive) para as próximas transferências.
+    """
+
+    def __init__(self, creds: Optional["Credentials"], tamanho: int):
+        self._conexoes: "queue.Queue[httplib2.Http]" = queue.Queue()
+        for _ in range(max(1, tamanho)):
+            self._conexoes.put(nova_conexao(creds))
+
+    @contextmanager
+    def conexao(self) -> Iterator["httplib2.Http"]:
+        http = self._conexoes.get()
+        try:
+            yield http
+        finally:
+            self._conexoes.put(http)
+
+
+class AsyncGoogleDriveService:
+    """
+    Versão assíncrona do GoogleDriveService, com a mesma interface
+    (list_pending_images, download_file, upload_docx) em corrotinas.
+
+    As requisições são montadas com o cliente da API e executadas em um pool
+    de threads, cada uma com uma conexão emprestada do PoolConexoes. Assim,
+    até `max_conexoes` transferências ficam em andamento ao mesmo tempo.
+
+    Credenciais e cliente da API são os do processo (ver drive_service):
+    criar uma nova instância não autentica de novo.
+    """
+
+    def __init__(
+        self, max_conexoes: Optional[int] = None, api_endpoint: Optional[str] = None
+    ):
+        self.max_conexoes = max(1, max_conexoes or Config.DRIVE_MAX_CONEXOES)
+        self.api_endpoint = api_endpoint or Config.DRIVE_API_ENDPOINT
+
+        # Endpoints alternativos (servidor fake local) dispensam autenticação
+        self._creds = None if self.api_endpoint else obter_credenciais()
+
+        self._pool = PoolConexoes(self._creds, self.max_conexoes)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_conexoes, thread_name_prefix="drive"
+        )
+
+    @property
+    def service(self) -> "Resource":
+        """Cliente do Drive, montado no primeiro uso."""
+        return obter_cliente(self.api_endpoint)
+
+    def _com_conexao(self, transferir: Callable[["httplib2.Http"], T]) -> T:
+        # A conexão fica emprestada durante a transferência inteira (todos os
+        # pedaços de um download ou upload)
+        with self._pool.conexao() as http:
+            return transferir(http)
+
+    async def _em_thread(self, transferir: Callable[["httplib2.Http"], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._com_conexao, transferir)
+
+    async def _executar(self, request: "HttpRequest", descricao: str) -> Any:
+        # Falhas transitórias são repetidas com a mesma política dos pedaços
+        return await self._em_thread(
+            lambda http: _repetindo(lambda: request.execute(http=http), descricao)
+        )
+
+    async def iterar_imagens_pendentes(
+        self, folder_id: str, tamanho_pagina: int = TAMANHO_PAGINA
+    ) -> AsyncIterator[ArquivoDrive]:
+        """
+        Percorre as imagens (jpg/png) de uma pasta, página a página.
+
+        A próxima página já é pedida enquanto os arquivos da atual são
+        consumidos. Uma página que falha é pedida de novo, como os pedaços das
+        transferências; se continuar falhando, a exceção é propagada, para uma
+        listagem incompleta nunca parecer completa (as páginas já entregues
+        continuam válidas).
+        """
+        query = query_imagens_pendentes(folder_id)
+        descricao = f"Listagem da pasta {folder_id}"
+
+        def pagina(page_token: Optional[str]) -> "asyncio.Future[Any]":
+            request = self.service.files().list(
+                q=query,
+                fields=CAMPOS_LISTAGEM,
+                pageSize=tamanho_pagina,
+                pageToken=page_token,
+            )
+            return asyncio.ensure_future(self._executar(request, descricao))
+
+        proxima = pagina(None)
+        try:
+            while proxima is not None:
+                results = await proxima
+                page_token = results.get("nextPageToken")
+                proxima = pagina(page_token) if page_token else None
+
+                for arquivo in results.get("files", []):
+                    yield arquivo
+        except Exception as e:
+            logger.error(f"Erro ao listar arquivos na pasta {folder_id}: {e}")
+            raise
+        finally:
+            if proxima is not None:
+                proxima.cancel()
+
+    async def list_pending_images(self, folder_id: str) -> List[ArquivoDrive]:
+        """
+        Lista todas as imagens (jpg/png) de uma pasta específica.
+        Ignora arquivos na lixeira. Falhas na listagem são propagadas.
+        """
+        return [arquivo async for arquivo in self.iterar_imagens_pendentes(folder_id)]
+
+    async def download_file(
+        self, file_id: str, progresso: Optional[Progresso] = None
+    ) -> Optional[bytes]:
+        """
+        Faz o download do conteúdo de um arquivo e retorna em bytes.
+        O download é feito em pedaços (ver drive_service.baixar_em_pedacos).
+        """
+        try:
+            request = self.service.files().get_media(fileId=file_id)
+            return await self._em_thread(
+                lambda http: baixar_em_pedacos(
+                    request, http, progresso, f"Download do arquivo ID {file_id}"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Erro ao baixar arquivo ID {file_id}: {e}")
+            return None
+
+    async def upload_docx(
+        self,
+        file_buffer: io.BytesIO,
+        file_name: str,
+        folder_id: str,
+        progresso: Optional[Progresso] = None,
+    ) -> Optional[str]:
+        """
+        Faz o upload de um arquivo .docx (memória) para uma pasta no Drive.
+        Retorna o ID do novo arquivo. O envio é feito em pedaços, pelo upload
+        retomável (ver drive_service.enviar_em_pedacos).
+        """
+        try:
+            file_metadata = {"name": file_name, "parents": [folder_id]}
+            media = midia_docx(file_buffer)
+
+            request = self.service.files().create(
+                body=file_metadata, media_body=media, fields="id"
+            )
+            file = await self._em_thread(
+                lambda http: enviar_em_pedacos(
+                    request, media, http, progresso, f"Upload de {file_name}"
+                )
+            )
+
+            logger.info(f"Upload concluído: {file_name} (ID: {file.get('id')})")
+            return file.get("id")
+
+        except Exception as e:
+            logger.error(f"Erro ao fazer upload do arquivo {file_name}: {e}")
+            return None
+
+    def fechar(self) -> None:
+        """Encerra o pool de threads das transferências."""
+        self._executor.shutdown(wait=True)
+
+
+class DriveSincrono:
+    """
+    Ponte síncrona para o AsyncGoogleDriveService, para código baseado em
+    threads (como o pipeline do corrigir_em_lote.py).
+
+    Mantém um event loop dedicado em segundo plano: chamadas de várias threads
+    são agendadas nele e compartilham o mesmo pool de conexões.
+    """
+
+    def __init__(self, servico: AsyncGoogleDriveService):
+        self.servico = servico
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="drive-loop", daemon=True
+        )
+        self._thread.start()
+
+    def _aguardar(self, corrotina: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(corrotina, self._loop).result()
+
+    def iterar_imagens_pendentes(
+        self, folder_id: str, tamanho_pagina: int = TAMANHO_PAGINA
+    ) -> Iterator[ArquivoDrive]:
+        listagem = self.servico.iterar_imagens_pendentes(folder_id, tamanho_pagina)
+
+        async def proximo() -> Optional[ArquivoDrive]:
+            return await listagem.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield self._aguardar(proximo())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self._aguardar(listagem.aclose())
+
+    def list_pending_images(self, folder_id: str) -> List[ArquivoDrive]:
+        return self._aguardar(self.servico.list_pending_images(folder_id))
+
+    def download_file(
+        self, file_id: str, progresso: Optional[Progresso] = None
+    ) -> Optional[bytes]:
+        with medir(ETAPA_DOWNLOAD) as span:
+            conteudo = self._aguardar(self.servico.download_file(file_id, progresso))
+            span["bytes"] = len(conteudo) if conteudo else 0
+            return conteudo
+
+    def upload_docx(
+        self,
+        file_buffer: io.BytesIO,
+        file_name: str,
+        folder_id: str,
+        progresso: Optional[Progresso] = None,
+    ) -> Optional[str]:
+        with medir(ETAPA_UPLOAD, bytes=file_buffer.getbuffer().nbytes):
+            return self._aguardar(
+                self.servico.upload_docx(file_buffer, file_name, folder_id, progresso)
+            )
+
+    def fechar(self) -> None:
+        """Para o event loop e encerra o serviço assíncrono."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self.servico.fechar()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+
+def gerar_chave(
+    imagem: bytes, prompt: str, model_name: str, generation_config: Dict[str, Any]
+) -> str:
+    """
+    Gera a chave de cache (SHA-256) a partir de tudo que influencia a resposta.
+
+    Args:
+        imagem (bytes): Conteúdo da imagem da redação.
+        prompt (str): Texto do prompt enviado à IA.
+        model_name (str): Nome do modelo Gemini.
+        generation_config (Dict[str, Any]): Parâmetros de geração usados na chamada.
+
+    Returns:
+        str: Hash hexadecimal que identifica a correção.
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(imagem).digest())
+    h.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+    h.update(model_name.encode("utf-8"))
+    h.update(json.dumps(generation_config, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class CacheCorrecoes:
+    """
+    Cache persistente (SQLite) de correções já validadas, endereçado por conteúdo.
+
+    Entradas mais antigas que `max_idade_segundos` são descartadas e, quando o
+    total ultrapassa `max_bytes`, as menos acessadas recentemente são removidas.
+    """
+
+    def __init__(self, caminho_db: str, max_bytes: int, max_idade_segundos: int):
+        self.caminho_db = caminho_db
+        self.max_bytes = max_bytes
+        self.max_idade_segundos = max_idade_segundos
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(caminho_db), exist_ok=True)
+        with self._conectar() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS correcoes (
+                    chave TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a correção armazenada para a chave, ou None se ausente/expirada.
+        """
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT dados, criado_em FROM correcoes WHERE chave = ?", (chave,)
+            ).fetchone()
+            if not linha:
+                return None
+
+            dados, criado_em = linha
+            if agora - criado_em > self.max_idade_segundos:
+                conn.execute("DELETE FROM correcoes WHERE chave = ?", (chave,))
+                return None
+
+            conn.execute(
+                "UPDATE correcoes SET acessado_em = ? WHERE chave = ?", (agora, chave)
+            )
+
+        return json.loads(dados)
+
+    def salvar(self, chave: str, dados: Dict[str, Any]) -> None:
+        """
+        Armazena a correção e aplica a política de expiração e tamanho máximo.
+        """
+        conteudo = json.dumps(dados, ensure_ascii=False)
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO correcoes VALUES (?, ?, ?, ?, ?)",
+                (chave, conteudo, len(conteudo.encode("utf-8")), agora, agora),
+            )
+            self._despejar(conn, agora)
+
+    def _despejar(self, conn: sqlite3.Connection, agora: float) -> None:
+        conn.execute(
+            "DELETE FROM correcoes WHERE criado_em < ?",
+            (agora - self.max_idade_segundos,),
+        )
+
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM correcoes"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        excesso = total - self.max_bytes
+        removidos = 0
+        for chave, tamanho in conn.execute(
+            "SELECT chave, tamanho FROM correcoes ORDER BY acessado_em"
+        ).fetchall():
+            if excesso <= 0:
+                break
+            conn.execute("DELETE FROM correcoes WHERE chave = ?", (chave,))
+            excesso -= tamanho
+            removidos += 1
+
+        logger.info(f"Cache de correções: {removidos} entradas antigas removidas.")
+
+    def limpar(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM correcoes")
+
+
+_cache: Optional[CacheCorrecoes] = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache() -> Optional[CacheCorrecoes]:
+    """
+    Retorna a instância única do cache, ou None se o cache estiver desativado.
+    """
+    global _cache
+    if not Config.CACHE_CORRECOES_ATIVO:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheCorrecoes(
+                Config.CACHE_DB_PATH,
+                max_bytes=Config.CACHE_MAX_MB * 1024 * 1024,
+                max_idade_segundos=Config.CACHE_MAX_DIAS * 24 * 3600,
+            )
+        return _cache
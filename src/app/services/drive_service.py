@@ -1,126 +1,582 @@
+import datetime
+import http.client
 import io
+import json
 import os
-from typing import Dict, List, Optional
-
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import Resource, build
-from googleapiclient.http import MediaIoBaseUpload
+import random
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypedDict,
+    TypeVar,
+)
 
 from app.core.logger import get_logger
 from config import Config
 
+# As bibliotecas do Google (autenticação, discovery e HTTP) somam quase um
+# segundo de importação: só são carregadas quando o Drive é de fato usado
+if TYPE_CHECKING:
+    import httplib2
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import Resource
+    from googleapiclient.http import HttpRequest, MediaInMemoryUpload
+
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 SCOPES = ["https://www.googleapis.com/auth/drive"]
 
+# Documento de discovery baixado quando a biblioteca não traz o embarcado
+URL_DISCOVERY = "https://www.googleapis.com/discovery/v1/apis/drive/v3/rest"
 
-class GoogleDriveService:
+# Depois de uma falha ao renovar o token em segundo plano, tenta de novo após
+# este tempo (segundos)
+ESPERA_APOS_FALHA_RENOVACAO = 60
+
+# O upload retomável exige pedaços múltiplos de 256 KB
+MULTIPLO_PEDACO = 256 * 1024
+
+# Respostas do Drive que valem nova tentativa (limite de taxa e instabilidade)
+STATUS_TRANSITORIOS = (408, 429, 500, 502, 503, 504)
+
+# Espera (segundos) antes da primeira nova tentativa de um pedaço; dobra a
+# cada falha seguida, até o teto
+ESPERA_TENTATIVA = 0.5
+ESPERA_TENTATIVA_MAX = 30.0
+
+# Recebe os bytes já transferidos e o total (None enquanto desconhecido)
+Progresso = Callable[[int, Optional[int]], None]
+
+# Maior página aceita por files().list
+TAMANHO_PAGINA = 1000
+
+# Só os campos usados no processamento (menos dados por página)
+CAMPOS_LISTAGEM = "nextPageToken, files(id, name, md5Checksum, size, modifiedTime)"
+
+
+class ArquivoDrive(TypedDict, total=False):
+    """Metadados de um arquivo retornados pela listagem do Drive."""
+
+    id: str
+    name: str
+    md5Checksum: str
+    size: str
+    modifiedTime: str
+
+
+def query_imagens_pendentes(folder_id: str) -> str:
     """
-    Serviço responsável por todas as interações com a API do Google Drive.
-    Encapsula autenticação, listagem, download e upload de arquivos.
+    Monta a consulta de imagens (jpg/png) de uma pasta, ignorando a lixeira.
     """
+    return (
+        f"'{folder_id}' in parents and "
+        f"(mimeType='image/jpeg' or mimeType='image/png') and "
+        f"trashed=false"
+    )
 
-    def __init__(self):
-        self.service = self._authenticate()
 
-    def _authenticate(self) -> Resource:
-        """
-        Realiza a autenticação OAuth2 e retorna o cliente do Drive.
-        """
-        creds = None
-        token_path = Config.DRIVE_TOKEN_PATH
-        credentials_path = Config.DRIVE_CREDENTIALS_PATH
+# Tipo MIME dos relatórios gerados
+DOCX_MIMETYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
 
-        # 1. Tenta carregar token existente
-        if os.path.exists(token_path):
+
+# Credenciais, documento de discovery e clientes do processo, reaproveitados
+# entre instâncias dos serviços, threads e sessões do Streamlit (o módulo só é
+# importado uma vez por processo)
+_credenciais: Optional["Credentials"] = None
+_renovador: Optional["RenovadorCredenciais"] = None
+_documento_discovery: Optional[str] = None
+_clientes: Dict[str, "Resource"] = {}
+_registro_lock = threading.RLock()
+
+
+def _salvar_token(creds: "Credentials") -> None:
+    token_path = Config.DRIVE_TOKEN_PATH
+    os.makedirs(os.path.dirname(token_path), exist_ok=True)
+    temporario = f"{token_path}.tmp"
+    with open(temporario, "w") as token:
+        token.write(creds.to_json())
+    os.replace(temporario, token_path)
+
+
+def carregar_credenciais() -> "Credentials":
+    """
+    Realiza a autenticação OAuth2 e retorna as credenciais do Drive.
+    Prefira `obter_credenciais`, que reaproveita as do processo.
+    """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
+    creds = None
+    token_path = Config.DRIVE_TOKEN_PATH
+    credentials_path = Config.DRIVE_CREDENTIALS_PATH
+
+    # 1. Tenta carregar token existente
+    if os.path.exists(token_path):
+        try:
+            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+        except Exception as e:
+            logger.warning(f"Token inválido ou corrompido: {e}")
+
+    # 2. Se não válido, faz refresh ou novo login
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
             try:
-                creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+                creds.refresh(Request())
+                logger.info("Token de acesso atualizado via Refresh Token.")
             except Exception as e:
-                logger.warning(f"Token inválido ou corrompido: {e}")
-
-        # 2. Se não válido, faz refresh ou novo login
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    creds.refresh(Request())
-                    logger.info("Token de acesso atualizado via Refresh Token.")
-                except Exception as e:
-                    logger.warning(
-                        f"Falha ao atualizar token: {e}. Solicitando novo login."
-                    )
-                    creds = None
-
-            if not creds:
-                if not os.path.exists(credentials_path):
-                    msg = f"Credenciais OAuth não encontradas em: {credentials_path}"
-                    logger.critical(msg)
-                    raise FileNotFoundError(msg)
-
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    credentials_path, SCOPES
+                logger.warning(
+                    f"Falha ao atualizar token: {e}. Solicitando novo login."
                 )
-                creds = flow.run_local_server(port=0)
-                logger.info("Autenticação via navegador realizada com sucesso.")
+                creds = None
 
-            # 3. Salva o token atualizado
-            with open(token_path, "w") as token:
-                token.write(creds.to_json())
+        if not creds:
+            if not os.path.exists(credentials_path):
+                msg = f"Credenciais OAuth não encontradas em: {credentials_path}"
+                logger.critical(msg)
+                raise FileNotFoundError(msg)
 
-        return build("drive", "v3", credentials=creds)
+            from google_auth_oauthlib.flow import InstalledAppFlow
 
-    def list_pending_images(self, folder_id: str) -> List[Dict[str, str]]:
-        """
-        Lista arquivos de imagem (jpg/png) em uma pasta específica.
-        Ignora arquivos na lixeira.
-        """
-        query = (
-            f"'{folder_id}' in parents and "
-            f"(mimeType='image/jpeg' or mimeType='image/png') and "
-            f"trashed=false"
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
+            creds = flow.run_local_server(port=0)
+            logger.info("Autenticação via navegador realizada com sucesso.")
+
+        # 3. Salva o token atualizado
+        _salvar_token(creds)
+
+    return creds
+
+
+class RenovadorCredenciais:
+    """
+    Renova o token de acesso em segundo plano, `margem` segundos antes de ele
+    expirar, e grava o novo token em disco.
+
+    Sem isso, o token (válido por cerca de uma hora) só é renovado na primeira
+    requisição depois de vencido, que então espera a ida ao servidor de
+    autenticação; com vários lotes e sessões compartilhando as credenciais,
+    a renovação acontece uma vez só, fora do caminho das transferências.
+    """
+
+    def __init__(self, creds: "Credentials", margem: float):
+        self.creds = creds
+        self.margem = margem
+        self._parar = threading.Event()
+        self._thread = threading.Thread(
+            target=self._executar, name="drive-token", daemon=True
         )
+
+    def iniciar(self) -> "RenovadorCredenciais":
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def segundos_ate_renovar(self) -> float:
+        if not self.creds.expiry:
+            return 0.0
+        # O google-auth guarda a validade em UTC, sem fuso
+        agora = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (self.creds.expiry - agora).total_seconds() - self.margem
+
+    def renovar(self) -> None:
+        from google.auth.transport.requests import Request
+
+        with _registro_lock:
+            self.creds.refresh(Request())
+            _salvar_token(self.creds)
+        logger.info("Token do Drive renovado em segundo plano.")
+
+    def _executar(self) -> None:
+        while not self._parar.wait(max(0.0, self.segundos_ate_renovar())):
+            try:
+                self.renovar()
+            except Exception as e:
+                # Se continuar falhando, a renovação sob demanda da própria
+                # requisição ainda funciona
+                logger.warning(f"Falha ao renovar o token do Drive: {e}")
+                if self._parar.wait(ESPERA_APOS_FALHA_RENOVACAO):
+                    return
+
+
+def obter_credenciais() -> "Credentials":
+    """
+    Retorna as credenciais do Drive do processo, carregando-as (token.json,
+    renovação ou login) só na primeira vez. Com refresh token, o token de
+    acesso passa a ser renovado em segundo plano antes de expirar.
+    """
+    global _credenciais, _renovador
+    with _registro_lock:
+        if _credenciais is not None and (
+            _credenciais.valid or _credenciais.refresh_token
+        ):
+            return _credenciais
+
+        _credenciais = carregar_credenciais()
+        if _renovador:
+            _renovador.parar()
+            _renovador = None
+        if _credenciais.refresh_token and _credenciais.expiry:
+            _renovador = RenovadorCredenciais(
+                _credenciais, Config.DRIVE_TOKEN_MARGEM_SEGUNDOS
+            ).iniciar()
+        return _credenciais
+
+
+def documento_discovery() -> str:
+    """
+    Documento de discovery do Drive v3 (JSON), guardado em
+    Config.DRIVE_DISCOVERY_PATH: depois da primeira vez, montar o cliente não
+    depende da rede nem da versão da biblioteca.
+    """
+    global _documento_discovery
+    with _registro_lock:
+        if _documento_discovery:
+            return _documento_discovery
+
+        caminho = Config.DRIVE_DISCOVERY_PATH
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                _documento_discovery = f.read()
+            return _documento_discovery
+
+        from googleapiclient.discovery_cache import get_static_doc
+
+        documento = get_static_doc("drive", "v3")
+        if not documento:
+            import httplib2
+
+            resposta, conteudo = httplib2.Http().request(URL_DISCOVERY)
+            if resposta.status != 200:
+                raise RuntimeError(
+                    f"Falha ao baixar o discovery do Drive (HTTP {resposta.status})"
+                )
+            documento = conteudo.decode("utf-8")
+
         try:
-            results = (
-                self.service.files().list(q=query, fields="files(id, name)").execute()
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = f"{caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(documento)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            logger.warning(f"Não foi possível guardar o discovery do Drive: {e}")
+        _documento_discovery = documento
+        return documento
+
+
+def construir_cliente(api_endpoint: Optional[str] = None) -> "Resource":
+    """
+    Constrói o cliente da API do Drive a partir do documento de discovery.
+
+    O cliente só monta as requisições: quem as executa passa a própria conexão
+    (autenticada) em `execute(http=...)`, então o mesmo cliente serve para
+    qualquer credencial e thread.
+
+    Args:
+        api_endpoint (Optional[str]): URL raiz alternativa da API
+            (ex.: "http://127.0.0.1:8765/").
+    """
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+
+    documento = json.loads(documento_discovery())
+    if api_endpoint:
+        # Troca a raiz no documento de discovery, para que listagem, download
+        # e upload apontem todos para o endpoint informado
+        raiz = api_endpoint.rstrip("/") + "/"
+        documento["rootUrl"] = raiz
+        documento["mtlsRootUrl"] = raiz
+        documento["baseUrl"] = raiz + documento["servicePath"]
+
+    return build_from_document(documento, http=httplib2.Http())
+
+
+def obter_cliente(api_endpoint: Optional[str] = None) -> "Resource":
+    """Retorna o cliente do Drive do processo para o endpoint, criando-o uma vez."""
+    chave = api_endpoint or ""
+    cliente = _clientes.get(chave)
+    if cliente is None:
+        with _registro_lock:
+            cliente = _clientes.get(chave)
+            if cliente is None:
+                cliente = _clientes[chave] = construir_cliente(api_endpoint)
+    return cliente
+
+
+def nova_conexao(creds: Optional["Credentials"]) -> "httplib2.Http":
+    """
+    Cria uma conexão HTTP (autenticada, se houver credenciais).
+    Conexões httplib2 não são thread-safe: use uma por thread/requisição.
+
+    Montada como a do cliente padrão da API (`build_http`): com timeout, para
+    uma conexão travada virar erro e o pedaço ser repetido, e sem tratar o
+    308 do upload retomável como redirecionamento.
+    """
+    from googleapiclient.http import build_http
+
+    if creds is None:
+        return build_http()
+    import google_auth_httplib2
+
+    return google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+
+
+def tamanho_pedaco() -> int:
+    """DRIVE_PEDACO_BYTES arredondado para um múltiplo de 256 KB."""
+    multiplos = max(1, round(Config.DRIVE_PEDACO_BYTES / MULTIPLO_PEDACO))
+    return multiplos * MULTIPLO_PEDACO
+
+
+def erro_transitorio(erro: Exception) -> bool:
+    """Falhas de rede e respostas 408/429/5xx, que valem nova tentativa."""
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    if isinstance(erro, HttpError):
+        return erro.resp.status in STATUS_TRANSITORIOS
+    return isinstance(
+        erro, (OSError, http.client.HTTPException, httplib2.HttpLib2Error)
+    )
+
+
+def _repetindo(passo: Callable[[], T], descricao: str) -> T:
+    """
+    Executa um passo (pedaço da transferência ou página da listagem),
+    repetindo-o após falhas transitórias até DRIVE_TENTATIVAS vezes, com espera
+    crescente. O contador vale por passo: uma conexão instável que ainda avança
+    não esgota as tentativas da transferência inteira.
+    """
+    tentativa = 0
+    while True:
+        tentativa += 1
+        try:
+            return passo()
+        except Exception as e:
+            if tentativa > Config.DRIVE_TENTATIVAS or not erro_transitorio(e):
+                raise
+            espera = min(ESPERA_TENTATIVA * 2 ** (tentativa - 1), ESPERA_TENTATIVA_MAX)
+            espera *= random.uniform(0.5, 1.0)
+            logger.warning(
+                f"{descricao}: {e!r}. Nova tentativa "
+                f"({tentativa}/{Config.DRIVE_TENTATIVAS}) em {espera:.1f}s."
+            )
+            time.sleep(espera)
+
+
+def baixar_em_pedacos(
+    request: "HttpRequest",
+    http: "httplib2.Http",
+    progresso: Optional[Progresso] = None,
+    descricao: str = "Download",
+) -> bytes:
+    """
+    Baixa a mídia da requisição em pedaços de `tamanho_pedaco()` bytes
+    (cabeçalho Range).
+
+    Se a conexão cair, só o pedaço em andamento é repetido, a partir do
+    último byte recebido, e cada resposta HTTP guarda no máximo um pedaço em
+    memória (em vez do arquivo inteiro, mais as cópias feitas pelo httplib2).
+    """
+    from googleapiclient.http import MediaIoBaseDownload
+
+    # O downloader executa os pedaços com a conexão da própria requisição
+    request.http = http
+    destino = io.BytesIO()
+    downloader = MediaIoBaseDownload(destino, request, chunksize=tamanho_pedaco())
+
+    concluido = False
+    while not concluido:
+        status, concluido = _repetindo(downloader.next_chunk, descricao)
+        if progresso:
+            progresso(status.resumable_progress, status.total_size)
+    return destino.getvalue()
+
+
+def midia_docx(file_buffer: io.BytesIO) -> "MediaInMemoryUpload":
+    """
+    Mídia de um relatório .docx para upload. Todo upload usa a sessão
+    retomável, enviada em pedaços de `tamanho_pedaco()` bytes: repetir um
+    pedaço após uma falha nunca cria um segundo arquivo no Drive.
+    """
+    from googleapiclient.http import MediaInMemoryUpload
+
+    return MediaInMemoryUpload(
+        file_buffer.getvalue(),
+        mimetype=DOCX_MIMETYPE,
+        chunksize=tamanho_pedaco(),
+        resumable=True,
+    )
+
+
+def enviar_em_pedacos(
+    request: "HttpRequest",
+    media: "MediaInMemoryUpload",
+    http: "httplib2.Http",
+    progresso: Optional[Progresso] = None,
+    descricao: str = "Upload",
+) -> Dict[str, Any]:
+    """
+    Executa o upload retomável e retorna a resposta da API.
+
+    Um pedaço que falha é repetido a partir do último byte confirmado pelo
+    servidor: a biblioteca consulta a sessão (`Content-Range: bytes */total`)
+    antes de reenviar. Se a resposta final se perder, a consulta devolve o
+    arquivo já criado; repetir a abertura da sessão só abre outra sessão, sem
+    criar arquivo. Por isso as repetições nunca duplicam o relatório.
+    """
+    resposta = None
+    while resposta is None:
+        status, resposta = _repetindo(lambda: request.next_chunk(http=http), descricao)
+        if status and progresso:
+            progresso(status.resumable_progress, status.total_size)
+
+    if progresso:
+        progresso(media.size(), media.size())
+    return resposta
+
+
+def progresso_no_log(descricao: str) -> Progresso:
+    """
+    Callback de progresso que registra no log o andamento das transferências
+    com mais de um pedaço (as menores terminam numa requisição só).
+    """
+
+    def registrar(transferidos: int, total: Optional[int]) -> None:
+        if total and total > tamanho_pedaco():
+            logger.info(
+                f"{descricao}: {transferidos / total:.0%} "
+                f"({transferidos / 2**20:.1f} de {total / 2**20:.1f} MB)"
             )
-            items = results.get("files", [])
-            return items
+
+    return registrar
+
+
+class GoogleDriveService:
+    """
+    Serviço responsável por todas as interações com a API do Google Drive.
+    Encapsula autenticação, listagem, download e upload de arquivos.
+
+    Pode ser usado por várias threads ao mesmo tempo: cada thread executa as
+    requisições com sua própria conexão HTTP (httplib2 não é thread-safe).
+
+    Credenciais e cliente da API são os do processo (`obter_credenciais` e
+    `obter_cliente`): criar uma nova instância não autentica de novo.
+    """
+
+    def __init__(self, api_endpoint: Optional[str] = None):
+        self._local = threading.local()
+        self.api_endpoint = api_endpoint or Config.DRIVE_API_ENDPOINT
+        # Endpoints alternativos (DRIVE_API_ENDPOINT) são usados sem autenticação
+        self._creds = None if self.api_endpoint else obter_credenciais()
+
+    @property
+    def service(self) -> "Resource":
+        """Cliente do Drive, montado no primeiro uso."""
+        return obter_cliente(self.api_endpoint)
+
+    def _http(self) -> "httplib2.Http":
+        """
+        Retorna a conexão HTTP exclusiva da thread atual.
+        """
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = nova_conexao(self._creds)
+            self._local.http = http
+        return http
+
+    def iterar_imagens_pendentes(
+        self, folder_id: str, tamanho_pagina: int = TAMANHO_PAGINA
+    ) -> Iterator[ArquivoDrive]:
+        """
+        Percorre as imagens (jpg/png) de uma pasta, página a página.
+
+        Os arquivos de cada página são entregues assim que ela chega, sem
+        esperar a listagem completa. Uma página que falha é pedida de novo,
+        como os pedaços das transferências (ver `_repetindo`); se continuar
+        falhando, a exceção é propagada, para uma listagem incompleta nunca
+        parecer completa (as páginas já entregues continuam válidas).
+        """
+        query = query_imagens_pendentes(folder_id)
+        page_token = None
+        try:
+            while True:
+                request = self.service.files().list(
+                    q=query,
+                    fields=CAMPOS_LISTAGEM,
+                    pageSize=tamanho_pagina,
+                    pageToken=page_token,
+                )
+                results = _repetindo(
+                    lambda: request.execute(http=self._http()),
+                    f"Listagem da pasta {folder_id}",
+                )
+                yield from results.get("files", [])
+
+                page_token = results.get("nextPageToken")
+                if not page_token:
+                    break
         except Exception as e:
             logger.error(f"Erro ao listar arquivos na pasta {folder_id}: {e}")
-            return []
+            raise
 
-    def download_file(self, file_id: str) -> Optional[bytes]:
+    def list_pending_images(self, folder_id: str) -> List[ArquivoDrive]:
+        """
+        Lista todas as imagens (jpg/png) de uma pasta específica.
+        Ignora arquivos na lixeira. Falhas na listagem são propagadas.
+        """
+        return list(self.iterar_imagens_pendentes(folder_id))
+
+    def download_file(
+        self, file_id: str, progresso: Optional[Progresso] = None
+    ) -> Optional[bytes]:
         """
         Faz o download do conteúdo de um arquivo e retorna em bytes.
+        O download é feito em pedaços (ver `baixar_em_pedacos`).
         """
         try:
             request = self.service.files().get_media(fileId=file_id)
-            file_data = request.execute()
-            return file_data
+            return baixar_em_pedacos(
+                request, self._http(), progresso, f"Download do arquivo ID {file_id}"
+            )
         except Exception as e:
             logger.error(f"Erro ao baixar arquivo ID {file_id}: {e}")
             return None
 
     def upload_docx(
-        self, file_buffer: io.BytesIO, file_name: str, folder_id: str
+        self,
+        file_buffer: io.BytesIO,
+        file_name: str,
+        folder_id: str,
+        progresso: Optional[Progresso] = None,
     ) -> Optional[str]:
         """
         Faz o upload de um arquivo .docx (memória) para uma pasta no Drive.
-        Retorna o ID do novo arquivo.
+        Retorna o ID do novo arquivo. O envio é feito em pedaços, pelo upload
+        retomável (ver `enviar_em_pedacos`).
         """
         try:
             file_metadata = {"name": file_name, "parents": [folder_id]}
 
-            media = MediaIoBaseUpload(
-                file_buffer,
-                mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            )
+            media = midia_docx(file_buffer)
 
-            file = (
-                self.service.files()
-                .create(body=file_metadata, media_body=media, fields="id")
-                .execute()
+            request = self.service.files().create(
+                body=file_metadata, media_body=media, fields="id"
+            )
+            file = enviar_em_pedacos(
+                request, media, self._http(), progresso, f"Upload de {file_name}"
             )
 
             logger.info(f"Upload concluído: {file_name} (ID: {file.get('id')})")
@@ -0,0 +1,352 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypedDict
+
+from app.core.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+# Origens das imagens: arquivo local ou arquivo do Google Drive
+ORIGEM_LOCAL = "local"
+ORIGEM_DRIVE = "drive"
+
+# Situações de uma tarefa na fila
+STATUS_PENDENTE = "pendente"
+STATUS_EXECUTANDO = "executando"
+STATUS_CONCLUIDA = "concluida"
+STATUS_FALHA = "falha"
+
+
+class NovaTarefa(TypedDict, total=False):
+    origem: str  # ORIGEM_LOCAL ou ORIGEM_DRIVE
+    entrada: str  # Caminho da imagem ou ID do arquivo no Drive
+    nome: str  # Nome exibido (nome do arquivo)
+    destino: str  # Pasta local ou ID da pasta do Drive do relatório
+    md5: Optional[str]  # md5Checksum do Drive (para o registro de processamento)
+    extras: Dict[str, Any]  # Campos acrescentados à correção (ex.: ano_turma)
+    # Redação com várias fotos: caminhos ou IDs de todas as páginas, na ordem
+    # (a primeira é a própria entrada)
+    paginas: List[str]
+
+
+class Tarefa(TypedDict):
+    id: int
+    lote: str
+    origem: str
+    entrada: str
+    nome: str
+    destino: str
+    md5: Optional[str]
+    extras: Dict[str, Any]
+    paginas: List[str]
+    status: str
+    tentativas: int
+    trabalhador: Optional[str]
+    resultado: Optional[str]
+    erro: Optional[str]
+    criado_em: float
+    atualizado_em: float
+
+
+def identificador_trabalhador() -> str:
+    """Identifica o processo trabalhador (máquina e PID)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def novo_lote() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def _tarefa(linha: sqlite3.Row) -> Tarefa:
+    tarefa = dict(linha)
+    tarefa.pop("expira_em", None)
+    tarefa["extras"] = json.loads(tarefa["extras"] or "{}")
+    tarefa["paginas"] = json.loads(tarefa["paginas"] or "[]") or [tarefa["entrada"]]
+    return tarefa
+
+
+class FilaCorrecoes:
+    """
+    Fila persistente (SQLite) de correções: carregar a imagem, analisar com a
+    IA, gerar o relatório e armazená-lo.
+
+    A interface e o script de lote só enfileiram e acompanham; quem executa são
+    os trabalhadores (`trabalhador_fila.py`), quantos forem necessários. Cada
+    tarefa é reservada por um trabalhador com prazo (lease), renovado enquanto
+    ele está vivo: se o processo morrer, a tarefa volta para a fila quando o
+    prazo vence. Falhas são repetidas até `max_tentativas`.
+
+    A reserva é um único UPDATE atômico, então vários processos podem consumir
+    a mesma fila com segurança (o banco deve estar em disco local: o SQLite não
+    garante travas em sistemas de arquivos de rede).
+    """
+
+    def __init__(
+        self,
+        caminho_db: str,
+        lease_segundos: float = 300,
+        max_tentativas: int = 3,
+    ):
+        self.caminho_db = caminho_db
+        self.lease_segundos = lease_segundos
+        self.max_tentativas = max(1, max_tentativas)
+
+        os.makedirs(os.path.dirname(caminho_db), exist_ok=True)
+        with self._conectar() as conn:
+            # WAL: a interface consulta o progresso enquanto os trabalhadores
+            # escrevem, sem bloqueios entre leitura e escrita
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lote TEXT NOT NULL,
+                    origem TEXT NOT NULL,
+                    entrada TEXT NOT NULL,
+                    nome TEXT NOT NULL,
+                    destino TEXT NOT NULL,
+                    md5 TEXT,
+                    extras TEXT,
+                    paginas TEXT,
+                    status TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    trabalhador TEXT,
+                    expira_em REAL,
+                    resultado TEXT,
+                    erro TEXT,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_tarefas_status
+                    ON tarefas (status, id);
+                CREATE INDEX IF NOT EXISTS idx_tarefas_lote ON tarefas (lote);
+                -- A mesma imagem não entra duas vezes enquanto está na fila
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_tarefas_ativas
+                    ON tarefas (origem, entrada, destino)
+                    WHERE status IN ('pendente', 'executando');
+                CREATE TABLE IF NOT EXISTS trabalhadores (
+                    id TEXT PRIMARY KEY,
+                    visto_em REAL NOT NULL
+                );
+                """
+            )
+            # Filas criadas antes do suporte a redações com várias páginas
+            colunas = {
+                linha["name"] for linha in conn.execute("PRAGMA table_info(tarefas)")
+            }
+            if "paginas" not in colunas:
+                conn.execute("ALTER TABLE tarefas ADD COLUMN paginas TEXT")
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Produtores (interface e script de lote) ---
+    def enfileirar(self, lote: str, tarefas: Iterable[NovaTarefa]) -> int:
+        """
+        Adiciona as tarefas ao lote e retorna quantas entraram (imagens que já
+        estão na fila, com o mesmo destino, são ignoradas).
+        """
+        agora = time.time()
+        linhas = (
+            (
+                lote,
+                tarefa["origem"],
+                tarefa["entrada"],
+                tarefa.get("nome") or os.path.basename(tarefa["entrada"]),
+                tarefa["destino"],
+                tarefa.get("md5"),
+                json.dumps(tarefa.get("extras") or {}, ensure_ascii=False),
+                json.dumps(tarefa.get("paginas") or [tarefa["entrada"]]),
+                STATUS_PENDENTE,
+                agora,
+                agora,
+            )
+            for tarefa in tarefas
+        )
+        with self._conectar() as conn:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tarefas (lote, origem, entrada, nome, "
+                "destino, md5, extras, paginas, status, criado_em, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                linhas,
+            )
+            return conn.total_changes - antes
+
+    def progresso(self, lote: str) -> Dict[str, int]:
+        """Quantidade de tarefas do lote em cada situação."""
+        with self._conectar() as conn:
+            linhas = conn.execute(
+                "SELECT status, COUNT(*) FROM tarefas WHERE lote = ? GROUP BY status",
+                (lote,),
+            ).fetchall()
+        contagem = {
+            status: 0
+            for status in (
+                STATUS_PENDENTE,
+                STATUS_EXECUTANDO,
+                STATUS_CONCLUIDA,
+                STATUS_FALHA,
+            )
+        }
+        contagem.update({status: total for status, total in linhas})
+        return contagem
+
+    def tarefas(self, lote: str, desde_id: int = 0) -> List[Tarefa]:
+        """Tarefas do lote (a partir de um ID, para consultas incrementais)."""
+        with self._conectar() as conn:
+            linhas = conn.execute(
+                "SELECT * FROM tarefas WHERE lote = ? AND id > ? ORDER BY id",
+                (lote, desde_id),
+            ).fetchall()
+        return [_tarefa(linha) for linha in linhas]
+
+    def acompanhar(
+        self, lote: str, intervalo: Optional[float] = None
+    ) -> Iterator[Dict[str, int]]:
+        """
+        Gera o progresso do lote a cada mudança, até não restar tarefa pendente
+        nem em execução.
+        """
+        intervalo = intervalo or Config.FILA_INTERVALO_CONSULTA
+        anterior = None
+        while True:
+            atual = self.progresso(lote)
+            if atual != anterior:
+                yield atual
+                anterior = atual
+            if not atual[STATUS_PENDENTE] and not atual[STATUS_EXECUTANDO]:
+                return
+            time.sleep(intervalo)
+
+    def trabalhadores_ativos(self, janela: Optional[float] = None) -> int:
+        """Trabalhadores que deram sinal de vida recentemente."""
+        janela = janela or self.lease_segundos
+        with self._conectar() as conn:
+            (total,) = conn.execute(
+                "SELECT COUNT(*) FROM trabalhadores WHERE visto_em > ?",
+                (time.time() - janela,),
+            ).fetchone()
+        return total
+
+    # --- Trabalhadores ---
+    def reservar(self, trabalhador: str) -> Optional[Tarefa]:
+        """
+        Reserva a próxima tarefa pendente (ou abandonada por um trabalhador que
+        parou de renovar o prazo) e a retorna, ou None se a fila está vazia.
+        """
+        agora = time.time()
+        with self._conectar() as conn:
+            # Abandonadas que já esgotaram as tentativas não voltam para a fila
+            conn.execute(
+                "UPDATE tarefas SET status = ?, erro = ?, atualizado_em = ? "
+                "WHERE status = ? AND expira_em < ? AND tentativas >= ?",
+                (
+                    STATUS_FALHA,
+                    "Trabalhador interrompido durante a execução",
+                    agora,
+                    STATUS_EXECUTANDO,
+                    agora,
+                    self.max_tentativas,
+                ),
+            )
+            linha = conn.execute(
+                "UPDATE tarefas SET status = ?, trabalhador = ?, expira_em = ?, "
+                "tentativas = tentativas + 1, atualizado_em = ? "
+                "WHERE id = (SELECT id FROM tarefas WHERE status = ? "
+                "OR (status = ? AND expira_em < ?) ORDER BY id LIMIT 1) "
+                "RETURNING *",
+                (
+                    STATUS_EXECUTANDO,
+                    trabalhador,
+                    agora + self.lease_segundos,
+                    agora,
+                    STATUS_PENDENTE,
+                    STATUS_EXECUTANDO,
+                    agora,
+                ),
+            ).fetchone()
+        return _tarefa(linha) if linha else None
+
+    def renovar(self, trabalhador: str) -> None:
+        """
+        Sinal de vida do trabalhador: estende o prazo de todas as tarefas que
+        ele está executando.
+        """
+        agora = time.time()
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO trabalhadores (id, visto_em) VALUES (?, ?)",
+                (trabalhador, agora),
+            )
+            conn.execute(
+                "UPDATE tarefas SET expira_em = ? "
+                "WHERE status = ? AND trabalhador = ?",
+                (agora + self.lease_segundos, STATUS_EXECUTANDO, trabalhador),
+            )
+
+    def concluir(self, tarefa: Tarefa, resultado: str) -> None:
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE tarefas SET status = ?, resultado = ?, erro = NULL, "
+                "atualizado_em = ? WHERE id = ? AND trabalhador = ?",
+                (
+                    STATUS_CONCLUIDA,
+                    resultado,
+                    time.time(),
+                    tarefa["id"],
+                    tarefa["trabalhador"],
+                ),
+            )
+
+    def falhar(self, tarefa: Tarefa, erro: str) -> bool:
+        """
+        Registra a falha. A tarefa volta para a fila enquanto houver
+        tentativas; retorna True se ela será tentada de novo.
+        """
+        repetir = tarefa["tentativas"] < self.max_tentativas
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE tarefas SET status = ?, erro = ?, atualizado_em = ? "
+                "WHERE id = ? AND trabalhador = ?",
+                (
+                    STATUS_PENDENTE if repetir else STATUS_FALHA,
+                    erro,
+                    time.time(),
+                    tarefa["id"],
+                    tarefa["trabalhador"],
+                ),
+            )
+        return repetir
+
+    def encerrar_trabalhador(self, trabalhador: str) -> None:
+        """Devolve à fila o que o trabalhador ainda não terminou."""
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE tarefas SET status = ?, tentativas = tentativas - 1, "
+                "atualizado_em = ? WHERE status = ? AND trabalhador = ?",
+                (STATUS_PENDENTE, time.time(), STATUS_EXECUTANDO, trabalhador),
+            )
+            conn.execute("DELETE FROM trabalhadores WHERE id = ?", (trabalhador,))
+
+
+def obter_fila() -> FilaCorrecoes:
+    """Retorna a fila de correções configurada."""
+    return FilaCorrecoes(
+        Config.FILA_DB_PATH,
+        lease_segundos=Config.FILA_LEASE_SEGUNDOS,
+        max_tentativas=Config.FILA_MAX_TENTATIVAS,
+    )
@@ -0,0 +1,253 @@
+import base64
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, TypedDict, Union
+
+from app.core.logger import get_logger
+from app.services.agrupamento_service import instrucao_paginas
+from app.services.image_service import preparar_para_envio
+from config import Config
+
+logger = get_logger(__name__)
+
+# Estados finais de um job de batch (a API usa o prefixo BATCH_STATE_)
+ESTADOS_FINAIS = ("SUCCEEDED", "FAILED", "CANCELLED", "EXPIRED")
+
+
+def estado_final(estado: Optional[str]) -> bool:
+    return bool(estado) and estado.endswith(ESTADOS_FINAIS)
+
+
+def estado_sucesso(estado: Optional[str]) -> bool:
+    return bool(estado) and estado.endswith("SUCCEEDED")
+
+
+def montar_requisicao(
+    chave: str,
+    prompt: str,
+    imagem: Union[bytes, List[bytes]],
+    parametros_geracao: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Monta uma linha do arquivo JSONL de entrada do batch (prompt + imagem, ou
+    as páginas de uma redação com várias fotos, na ordem).
+
+    As imagens passam pelo mesmo pré-processamento do modo online.
+    """
+    paginas = imagem if isinstance(imagem, list) else [imagem]
+    partes: List[Dict[str, Any]] = [{"text": prompt}]
+    instrucao = instrucao_paginas(len(paginas))
+    if instrucao:
+        partes.append({"text": instrucao})
+    for pagina in paginas:
+        preparada = preparar_para_envio(pagina)
+        partes.append(
+            {
+                "inline_data": {
+                    "mime_type": preparada["mime_type"],
+                    "data": base64.b64encode(preparada["data"]).decode(),
+                }
+            }
+        )
+    return {
+        "key": chave,
+        "request": {
+            "contents": [{"role": "user", "parts": partes}],
+            "generation_config": parametros_geracao,
+        },
+    }
+
+
+def extrair_texto(resposta: Dict[str, Any]) -> str:
+    """
+    Junta o texto do primeiro candidato de uma resposta do generateContent (REST).
+    """
+    candidatos = resposta.get("candidates") or []
+    if not candidatos:
+        return ""
+    partes = (candidatos[0].get("content") or {}).get("parts") or []
+    return "".join(parte.get("text", "") for parte in partes)
+
+
+class ClienteBatchGemini:
+    """
+    Cliente REST mínimo da Batch API do Gemini: envio do arquivo de entrada,
+    criação e consulta do job e download dos resultados.
+
+    Args:
+        api_key (str): Chave da API (GEMINI_API_KEY).
+        endpoint (Optional[str]): Raiz da API (padrão: Config.GEMINI_API_ENDPOINT;
+            um servidor fake local pode ser usado em testes).
+    """
+
+    def __init__(self, api_key: str, endpoint: Optional[str] = None):
+        # Importado aqui: só o modo batch usa o requests
+        import requests
+
+        self.endpoint = (endpoint or Config.GEMINI_API_ENDPOINT).rstrip("/")
+        self._sessao = requests.Session()
+        self._sessao.headers["x-goog-api-key"] = api_key
+
+    def _url(self, caminho: str) -> str:
+        return f"{self.endpoint}/{caminho.lstrip('/')}"
+
+    def enviar_arquivo(self, caminho: str, nome_exibicao: str) -> str:
+        """
+        Envia o JSONL de entrada pela Files API (protocolo resumable) e retorna
+        o nome do arquivo remoto ("files/...").
+        """
+        tamanho = os.path.getsize(caminho)
+        inicio = self._sessao.post(
+            self._url("upload/v1beta/files"),
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(tamanho),
+                "X-Goog-Upload-Header-Content-Type": "application/jsonl",
+            },
+            json={"file": {"display_name": nome_exibicao}},
+            timeout=60,
+        )
+        inicio.raise_for_status()
+        url_envio = inicio.headers["X-Goog-Upload-URL"]
+
+        with open(caminho, "rb") as arquivo:
+            envio = self._sessao.post(
+                url_envio,
+                headers={
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                },
+                data=arquivo,
+                timeout=(60, 3600),
+            )
+        envio.raise_for_status()
+        return envio.json()["file"]["name"]
+
+    def criar_job(self, modelo: str, arquivo_entrada: str, nome_exibicao: str) -> str:
+        """
+        Cria o job de batch a partir do arquivo enviado e retorna seu nome
+        ("batches/...").
+        """
+        modelo = modelo if modelo.startswith("models/") else f"models/{modelo}"
+        resposta = self._sessao.post(
+            self._url(f"v1beta/{modelo}:batchGenerateContent"),
+            json={
+                "batch": {
+                    "display_name": nome_exibicao,
+                    "input_config": {"file_name": arquivo_entrada},
+                }
+            },
+            timeout=60,
+        )
+        resposta.raise_for_status()
+        return resposta.json()["name"]
+
+    def consultar_job(self, nome_job: str) -> Dict[str, Any]:
+        """Retorna o recurso do job (estado e, ao final, o arquivo de resultados)."""
+        resposta = self._sessao.get(self._url(f"v1beta/{nome_job}"), timeout=60)
+        resposta.raise_for_status()
+        return resposta.json()
+
+    @staticmethod
+    def estado(job: Dict[str, Any]) -> Optional[str]:
+        return (job.get("metadata") or {}).get("state") or job.get("state")
+
+    @staticmethod
+    def arquivo_resultados(job: Dict[str, Any]) -> Optional[str]:
+        for origem in (
+            job.get("response") or {},
+            (job.get("metadata") or {}).get("output") or {},
+            job.get("output") or {},
+        ):
+            if origem.get("responsesFile"):
+                return origem["responsesFile"]
+        return None
+
+    def baixar_resultados(self, arquivo: str) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as linhas do arquivo de resultados conforme chegam pela rede,
+        sem carregar o arquivo inteiro em memória.
+        """
+        with self._sessao.get(
+            self._url(f"download/v1beta/{arquivo}:download"),
+            params={"alt": "media"},
+            stream=True,
+            timeout=(60, 600),
+        ) as resposta:
+            resposta.raise_for_status()
+            for linha in resposta.iter_lines():
+                if linha.strip():
+                    yield json.loads(linha)
+
+
+class ItemBatch(TypedDict, total=False):
+    name: str
+    md5Checksum: Optional[str]
+    status: str
+    output_file_id: Optional[str]
+    erro: Optional[str]
+
+
+class ManifestoBatch:
+    """
+    Estado persistente (JSON) de uma correção em batch, para retomar a execução
+    em qualquer fase: preparo, envio, espera pelo job e ingestão dos resultados.
+
+    Cada alteração é gravada de forma atômica (arquivo temporário + rename).
+    """
+
+    def __init__(self, caminho: str, dados: Dict[str, Any]):
+        self.caminho = caminho
+        self.dados = dados
+        self._lock = threading.RLock()
+
+    @classmethod
+    def carregar(cls, caminho: str) -> Optional["ManifestoBatch"]:
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, encoding="utf-8") as f:
+            return cls(caminho, json.load(f))
+
+    @classmethod
+    def criar(cls, caminho: str, **campos: Any) -> "ManifestoBatch":
+        dados = {
+            "arquivo_entrada": None,
+            "job": None,
+            "estado": None,
+            "itens": {},
+            "criado_em": time.time(),
+            **campos,
+        }
+        manifesto = cls(caminho, dados)
+        manifesto.salvar()
+        return manifesto
+
+    @property
+    def itens(self) -> Dict[str, ItemBatch]:
+        return self.dados["itens"]
+
+    def salvar(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(self.dados, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+
+    def atualizar(self, **campos: Any) -> None:
+        with self._lock:
+            self.dados.update(campos)
+            self.salvar()
+
+    def atualizar_item(self, chave: str, **campos: Any) -> None:
+        with self._lock:
+            self.itens[chave].update(campos)
+            self.salvar()
+
+    def remover(self) -> None:
+        for caminho in (self.caminho, self.dados.get("caminho_jsonl")):
+            if caminho and os.path.exists(caminho):
+                os.remove(caminho)
@@ -0,0 +1,170 @@
+import io
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, TypedDict, Union
+
+from app.core.logger import get_logger
+from config import Config
+
+# O Pillow só é importado quando uma imagem é de fato processada
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = get_logger(__name__)
+
+
+class ImagemPreparada(TypedDict):
+    """Imagem no formato de 'blob' aceito pelo Gemini."""
+
+    mime_type: str
+    data: bytes
+
+
+class EstatisticasPreprocessamento(TypedDict):
+    bytes_originais: Optional[int]
+    bytes_finais: int
+    bytes_economizados: Optional[int]
+    tempo_ms: float
+    dimensoes_originais: Tuple[int, int]
+    dimensoes_finais: Tuple[int, int]
+
+
+_MIME_POR_FORMATO = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def eh_imagem_pil(objeto: Any) -> bool:
+    """
+    Indica se o objeto é uma imagem PIL, sem importar o Pillow (se ele ainda
+    não foi carregado, o objeto não pode ser uma imagem PIL).
+    """
+    modulo = sys.modules.get("PIL.Image")
+    return modulo is not None and isinstance(objeto, modulo.Image)
+
+
+def parametros_preprocessamento() -> Dict[str, Any]:
+    """
+    Retorna os parâmetros de pré-processamento configurados (ou {} se desativado).
+    """
+    if not Config.IMG_PREPROCESSAR:
+        return {}
+    return {
+        "max_lado": Config.IMG_MAX_LADO,
+        "escala_cinza": Config.IMG_ESCALA_CINZA,
+        "formato": Config.IMG_FORMATO,
+        "qualidade": Config.IMG_QUALIDADE,
+    }
+
+
+def preprocessar_imagem(
+    imagem: Union[bytes, "Image.Image"],
+    max_lado: int,
+    escala_cinza: bool,
+    formato: str,
+    qualidade: int,
+) -> Tuple[ImagemPreparada, EstatisticasPreprocessamento]:
+    """
+    Normaliza a foto da redação antes do envio à IA.
+
+    Etapas: corrige a orientação EXIF, reduz o maior lado para `max_lado`,
+    opcionalmente converte para tons de cinza com contraste automático e
+    recodifica em JPEG/WebP com a qualidade indicada.
+
+    Args:
+        imagem (Union[bytes, Image.Image]): Imagem original.
+        max_lado (int): Tamanho máximo, em pixels, do maior lado.
+        escala_cinza (bool): Converte para tons de cinza e normaliza o contraste.
+        formato (str): Formato de saída ("JPEG" ou "WEBP").
+        qualidade (int): Qualidade de compressão (1-100).
+
+    Returns:
+        Tuple[ImagemPreparada, EstatisticasPreprocessamento]: A imagem
+        recodificada e as estatísticas de tamanho e tempo.
+    """
+    from PIL import Image, ImageOps
+
+    inicio = time.perf_counter()
+
+    bytes_originais = None
+    if isinstance(imagem, (bytes, bytearray, memoryview)):
+        bytes_originais = len(imagem)
+        img = Image.open(io.BytesIO(imagem))
+    else:
+        img = imagem
+
+    dimensoes_originais = img.size
+
+    # Fotos de celular costumam vir "deitadas" com a rotação só na tag EXIF.
+    # exif_transpose sempre devolve uma cópia, então a original não é alterada.
+    img = ImageOps.exif_transpose(img)
+
+    if max(img.size) > max_lado:
+        img.thumbnail((max_lado, max_lado), Image.Resampling.LANCZOS)
+
+    if escala_cinza:
+        img = ImageOps.autocontrast(img.convert("L"), cutoff=1)
+    elif img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    formato = formato.upper()
+    buffer = io.BytesIO()
+    img.save(buffer, format=formato, quality=qualidade, optimize=True)
+    dados = buffer.getvalue()
+
+    tempo_ms = (time.perf_counter() - inicio) * 1000
+    estatisticas: EstatisticasPreprocessamento = {
+        "bytes_originais": bytes_originais,
+        "bytes_finais": len(dados),
+        "bytes_economizados": (
+            bytes_originais - len(dados) if bytes_originais is not None else None
+        ),
+        "tempo_ms": tempo_ms,
+        "dimensoes_originais": dimensoes_originais,
+        "dimensoes_finais": img.size,
+    }
+    preparada: ImagemPreparada = {
+        "mime_type": _MIME_POR_FORMATO.get(formato, "image/jpeg"),
+        "data": dados,
+    }
+    return preparada, estatisticas
+
+
+def preparar_para_envio(
+    imagem: Union[bytes, "Image.Image"],
+) -> Union[ImagemPreparada, "Image.Image"]:
+    """
+    Prepara a imagem para compor o conteúdo enviado ao Gemini.
+
+    Com o pré-processamento ativo, a imagem é normalizada e recodificada.
+    Caso contrário, bytes são enviados como estão e imagens PIL seguem
+    inalteradas (o SDK as converte internamente).
+    """
+    parametros = parametros_preprocessamento()
+
+    if not parametros:
+        if eh_imagem_pil(imagem):
+            return imagem
+        from PIL import Image
+
+        formato = Image.open(io.BytesIO(imagem)).format
+        return {"mime_type": Image.MIME.get(formato, "image/jpeg"), "data": imagem}
+
+    preparada, estatisticas = preprocessar_imagem(imagem, **parametros)
+
+    largura, altura = estatisticas["dimensoes_finais"]
+    if estatisticas["bytes_originais"] is not None:
+        kb_originais = estatisticas["bytes_originais"] / 1024
+        economia = estatisticas["bytes_economizados"] / max(
+            1, estatisticas["bytes_originais"]
+        )
+        logger.info(
+            f"Imagem pré-processada: {kb_originais:.0f} KB → "
+            f"{estatisticas['bytes_finais'] / 1024:.0f} KB ({economia:.0%} menor), "
+            f"{largura}x{altura}, em {estatisticas['tempo_ms']:.0f} ms"
+        )
+    else:
+        logger.info(
+            f"Imagem pré-processada: {estatisticas['bytes_finais'] / 1024:.0f} KB, "
+            f"{largura}x{altura}, em {estatisticas['tempo_ms']:.0f} ms"
+        )
+
+    return preparada
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple, TypedDict
+
+from app.core.logger import get_logger
+from app.services.drive_service import ArquivoDrive
+from config import Config
+
+logger = get_logger(__name__)
+
+# Situações possíveis de um arquivo no registro
+STATUS_CONCLUIDO = "concluido"
+STATUS_FALHA = "falha"
+
+
+class RegistroProcessamento(TypedDict):
+    file_id: str
+    nome: str
+    md5_checksum: Optional[str]
+    modelo: str
+    versao_prompt: str
+    status: str
+    output_file_id: Optional[str]
+    erro: Optional[str]
+    atualizado_em: float
+
+
+def versao_prompt(prompt: str) -> str:
+    """
+    Identifica a versão do prompt pelo conteúdo (12 primeiros dígitos do SHA-256).
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class LedgerProcessamento:
+    """
+    Registro persistente (SQLite) dos arquivos do Drive já processados.
+
+    Um arquivo é considerado resolvido quando foi concluído com o mesmo
+    md5Checksum, o mesmo modelo e a mesma versão de prompt. Qualquer mudança
+    (imagem substituída, troca de modelo ou de prompt) o torna pendente de novo,
+    assim como falhas em execuções anteriores.
+    """
+
+    def __init__(self, caminho_db: str):
+        self.caminho_db = caminho_db
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(caminho_db), exist_ok=True)
+        with self._conectar() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS processamentos (
+                    file_id TEXT PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    md5_checksum TEXT,
+                    modelo TEXT NOT NULL,
+                    versao_prompt TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    output_file_id TEXT,
+                    erro TEXT,
+                    atualizado_em REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _concluidos(self) -> Dict[str, Tuple[Optional[str], str, str]]:
+        with self._lock, self._conectar() as conn:
+            linhas = conn.execute(
+                "SELECT file_id, md5_checksum, modelo, versao_prompt "
+                "FROM processamentos WHERE status = ?",
+                (STATUS_CONCLUIDO,),
+            ).fetchall()
+        return {linha[0]: tuple(linha[1:]) for linha in linhas}
+
+    def filtrar_pendentes(
+        self, arquivos: Iterable[ArquivoDrive], modelo: str, versao: str
+    ) -> Iterator[ArquivoDrive]:
+        """
+        Repassa apenas os arquivos novos, alterados ou que falharam antes.
+
+        Os concluídos são carregados uma única vez, então a verificação de cada
+        arquivo listado não faz consultas ao banco.
+        """
+        concluidos = self._concluidos()
+        ignorados = 0
+        for arquivo in arquivos:
+            anterior = concluidos.get(arquivo["id"])
+            if anterior == (arquivo.get("md5Checksum"), modelo, versao):
+                ignorados += 1
+                continue
+            yield arquivo
+
+        if ignorados:
+            logger.info(f"{ignorados} redações já corrigidas anteriormente ignoradas.")
+
+    def _registrar(
+        self,
+        arquivo: ArquivoDrive,
+        modelo: str,
+        versao: str,
+        status: str,
+        output_file_id: Optional[str] = None,
+        erro: Optional[str] = None,
+    ) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processamentos "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    arquivo["id"],
+                    arquivo.get("name", ""),
+                    arquivo.get("md5Checksum"),
+                    modelo,
+                    versao,
+                    status,
+                    output_file_id,
+                    erro,
+                    time.time(),
+                ),
+            )
+
+    def registrar_conclusao(
+        self, arquivo: ArquivoDrive, modelo: str, versao: str, output_file_id: str
+    ) -> None:
+        """Marca o arquivo como corrigido, guardando o ID do relatório enviado."""
+        self._registrar(
+            arquivo, modelo, versao, STATUS_CONCLUIDO, output_file_id=output_file_id
+        )
+
+    def registrar_falha(
+        self, arquivo: ArquivoDrive, modelo: str, versao: str, erro: str
+    ) -> None:
+        """Marca o arquivo como falho (será tentado de novo na próxima execução)."""
+        self._registrar(arquivo, modelo, versao, STATUS_FALHA, erro=erro)
+
+    def obter(self, file_id: str) -> Optional[RegistroProcessamento]:
+        """Retorna o registro de um arquivo, ou None se nunca foi processado."""
+        with self._lock, self._conectar() as conn:
+            conn.row_factory = sqlite3.Row
+            linha = conn.execute(
+                "SELECT * FROM processamentos WHERE file_id = ?", (file_id,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+
+def obter_ledger() -> Optional[LedgerProcessamento]:
+    """
+    Retorna o registro de processamento, ou None se estiver desativado.
+    """
+    if not Config.LEDGER_ATIVO:
+        return None
+    return LedgerProcessamento(Config.LEDGER_DB_PATH)
@@ -0,0 +1,296 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional
+
+from app.core.logger import get_logger
+from config import Config
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = get_logger(__name__)
+
+# Etapas medidas por redação
+ETAPA_DOWNLOAD = "download"
+ETAPA_PREPROCESSAMENTO = "preprocessamento"
+ETAPA_IA = "ia"
+ETAPA_JSON = "json"
+ETAPA_VALIDACAO = "validacao"
+ETAPA_DOCX = "docx"
+ETAPA_UPLOAD = "upload"
+
+PERCENTIS = (50, 95, 99)
+
+# Durações mais recentes guardadas por etapa para os percentis: o trabalhador
+# da fila roda por dias, e guardar todo o histórico faria a memória (e a
+# ordenação a cada coleta do Prometheus) crescer sem limite. Contagem e soma
+# continuam cobrindo todo o histórico.
+AMOSTRAS_POR_ETAPA = 10_000
+
+# Atributos somados por etapa no resumo e no Prometheus (os demais, como o
+# tempo até o primeiro pedaço da resposta, ficam só no JSONL)
+MEDIDAS_SOMADAS = ("bytes", "tokens")
+
+# Rótulos do item em processamento (ex.: redação e lote). Cada estágio do
+# pipeline roda o item com os seus rótulos, então as medições feitas nos
+# serviços chamados por ele são atribuídas à redação certa.
+_rotulos: ContextVar[Dict[str, Any]] = ContextVar("rotulos_metricas", default={})
+
+
+@contextmanager
+def rotulos(**valores: Any) -> Iterator[None]:
+    """Associa as medições feitas dentro do bloco aos rótulos informados."""
+    token = _rotulos.set({**_rotulos.get(), **valores})
+    try:
+        yield
+    finally:
+        _rotulos.reset(token)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo método do valor mais próximo (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+class ColetorMetricas:
+    """
+    Coleta a duração de cada etapa de cada redação (spans), com tamanhos em
+    bytes e tokens informados pela própria etapa.
+
+    Cada span é gravado como uma linha JSON (se houver arquivo configurado) e
+    acumulado em memória para o resumo de percentis e para o formato texto do
+    Prometheus. Os percentis usam as últimas AMOSTRAS_POR_ETAPA durações de
+    cada etapa.
+    """
+
+    def __init__(self, caminho_jsonl: Optional[str] = None):
+        self.caminho_jsonl = caminho_jsonl
+        self._lock = threading.Lock()
+        self._duracoes: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=AMOSTRAS_POR_ETAPA)
+        )
+        self._contagens: Dict[str, int] = defaultdict(int)
+        self._totais_duracao: Dict[str, float] = defaultdict(float)
+        self._erros: Dict[str, int] = defaultdict(int)
+        # Soma dos atributos numéricos (bytes, tokens) por etapa
+        self._somas: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._inicio = time.time()
+        self._arquivo = None
+        if caminho_jsonl:
+            os.makedirs(os.path.dirname(caminho_jsonl), exist_ok=True)
+            self._arquivo = open(caminho_jsonl, "a", encoding="utf-8")
+
+    @contextmanager
+    def medir(self, etapa: str, **atributos: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Mede o bloco como um span da etapa. O dicionário retornado aceita
+        atributos conhecidos só no fim (ex.: bytes recebidos, tokens).
+        """
+        inicio = time.perf_counter()
+        try:
+            yield atributos
+        except BaseException as e:
+            atributos.setdefault("erro", type(e).__name__)
+            raise
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio, **atributos)
+
+    def registrar(self, etapa: str, duracao: float, **atributos: Any) -> None:
+        """Registra um span já medido (duração em segundos)."""
+        span = {
+            "ts": round(time.time(), 3),
+            **_rotulos.get(),
+            "etapa": etapa,
+            "duracao_ms": round(duracao * 1000, 2),
+            **atributos,
+        }
+        linha = json.dumps(span, ensure_ascii=False, default=str)
+        with self._lock:
+            self._acumular(etapa, duracao, atributos)
+            if self._arquivo:
+                try:
+                    self._arquivo.write(linha + "\n")
+                    self._arquivo.flush()
+                except OSError as e:
+                    logger.warning(f"Falha ao gravar métricas em disco: {e}")
+
+    def _acumular(self, etapa: str, duracao: float, atributos: Dict[str, Any]) -> None:
+        self._duracoes[etapa].append(duracao)
+        self._contagens[etapa] += 1
+        self._totais_duracao[etapa] += duracao
+        if atributos.get("erro"):
+            self._erros[etapa] += 1
+        for nome, valor in atributos.items():
+            if nome.startswith(MEDIDAS_SOMADAS) and isinstance(valor, (int, float)):
+                self._somas[etapa][nome] += valor
+
+    @classmethod
+    def carregar(cls, caminho_jsonl: str, **filtro: Any) -> "ColetorMetricas":
+        """
+        Monta um coletor (só em memória) com os spans de um arquivo JSONL que
+        tenham os rótulos do filtro, ex.: `carregar(caminho, lote="...")`.
+        """
+        coletor = cls()
+        if not os.path.exists(caminho_jsonl):
+            return coletor
+        with open(caminho_jsonl, encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    span = json.loads(linha)
+                except ValueError:
+                    continue
+                if any(span.get(chave) != valor for chave, valor in filtro.items()):
+                    continue
+                coletor._inicio = min(coletor._inicio, span.get("ts", coletor._inicio))
+                atributos = {
+                    chave: valor
+                    for chave, valor in span.items()
+                    if chave not in ("ts", "etapa", "duracao_ms", *filtro)
+                }
+                coletor._acumular(span["etapa"], span["duracao_ms"] / 1000, atributos)
+        return coletor
+
+    def _copia(self):
+        with self._lock:
+            duracoes = {etapa: sorted(v) for etapa, v in self._duracoes.items()}
+            somas = {etapa: dict(v) for etapa, v in self._somas.items()}
+            # Contagem e duração total de todo o histórico, por etapa
+            totais = {
+                etapa: (self._contagens[etapa], self._totais_duracao[etapa])
+                for etapa in self._duracoes
+            }
+            return duracoes, dict(self._erros), somas, totais
+
+    def resumo(self) -> str:
+        """Tabela com contagem, vazão e p50/p95/p99 (ms) de cada etapa."""
+        duracoes, erros, somas, totais_etapa = self._copia()
+        if not duracoes:
+            return "Nenhuma etapa medida."
+
+        decorrido = max(1e-9, time.time() - self._inicio)
+        cabecalho = "".join(f"{f'p{p}':>9}" for p in PERCENTIS)
+        linhas = [f"{'etapa':<17}{'qtd':>6}{'erros':>6}{'por min':>9}{cabecalho}"]
+        for etapa, valores in duracoes.items():
+            colunas = "".join(
+                f"{percentil(valores, p) * 1000:>9.1f}" for p in PERCENTIS
+            )
+            quantidade = totais_etapa[etapa][0]
+            linhas.append(
+                f"{etapa:<17}{quantidade:>6}{erros.get(etapa, 0):>6}"
+                f"{quantidade / decorrido * 60:>9.1f}{colunas}"
+            )
+            totais = ", ".join(
+                f"{nome}={valor:.0f}" for nome, valor in somas.get(etapa, {}).items()
+            )
+            if totais:
+                linhas.append(f"{'':<17}totais: {totais}")
+        return "Tempo por etapa (ms):\n" + "\n".join(linhas)
+
+    def prometheus(self) -> str:
+        """Métricas no formato texto de exposição do Prometheus."""
+        duracoes, erros, somas, totais_etapa = self._copia()
+        linhas = [
+            "# HELP corretor_etapa_segundos Duração das etapas por redação.",
+            "# TYPE corretor_etapa_segundos summary",
+        ]
+        for etapa, valores in duracoes.items():
+            for p in PERCENTIS:
+                linhas.append(
+                    f'corretor_etapa_segundos{{etapa="{etapa}",quantile="{p / 100}"}} '
+                    f"{percentil(valores, p):.6f}"
+                )
+            quantidade, duracao_total = totais_etapa[etapa]
+            linhas.append(
+                f'corretor_etapa_segundos_sum{{etapa="{etapa}"}} {duracao_total:.6f}'
+            )
+            linhas.append(
+                f'corretor_etapa_segundos_count{{etapa="{etapa}"}} {quantidade}'
+            )
+
+        linhas += [
+            "# HELP corretor_etapa_erros_total Etapas que terminaram com erro.",
+            "# TYPE corretor_etapa_erros_total counter",
+        ]
+        for etapa, total in erros.items():
+            linhas.append(f'corretor_etapa_erros_total{{etapa="{etapa}"}} {total}')
+
+        linhas += [
+            "# HELP corretor_etapa_total Soma de bytes e tokens por etapa.",
+            "# TYPE corretor_etapa_total counter",
+        ]
+        for etapa, atributos in somas.items():
+            for nome, valor in atributos.items():
+                linhas.append(
+                    f'corretor_etapa_total{{etapa="{etapa}",medida="{nome}"}} {valor:g}'
+                )
+        return "\n".join(linhas) + "\n"
+
+    def servir(self, porta: int) -> "ThreadingHTTPServer":
+        """Expõe `prometheus()` em http://0.0.0.0:<porta>/metrics."""
+        # Importado aqui: o endpoint só existe com METRICAS_PORTA
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        coletor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                corpo = coletor.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        servidor = ThreadingHTTPServer(("0.0.0.0", porta), _Handler)
+        threading.Thread(
+            target=servidor.serve_forever, name="metricas-http", daemon=True
+        ).start()
+        logger.info(f"Métricas disponíveis em http://0.0.0.0:{porta}/metrics")
+        return servidor
+
+
+_coletor: Optional[ColetorMetricas] = None
+_coletor_lock = threading.Lock()
+
+
+def obter_coletor() -> ColetorMetricas:
+    """
+    Retorna o coletor único do processo. Sem METRICAS_ATIVO, as medições
+    ficam só em memória; com METRICAS_PORTA, o endpoint do Prometheus é
+    iniciado na primeira chamada.
+    """
+    global _coletor
+    with _coletor_lock:
+        if _coletor is None:
+            _coletor = ColetorMetricas(
+                Config.METRICAS_JSONL_PATH if Config.METRICAS_ATIVO else None
+            )
+            if Config.METRICAS_PORTA:
+                try:
+                    _coletor.servir(Config.METRICAS_PORTA)
+                except OSError as e:
+                    # Ex.: outro trabalhador na mesma máquina já usa a porta
+                    logger.warning(f"Endpoint de métricas não iniciado: {e}")
+        return _coletor
+
+
+def medir(etapa: str, **atributos: Any):
+    """Atalho para `obter_coletor().medir(...)`."""
+    return obter_coletor().medir(etapa, **atributos)
@@ -0,0 +1,154 @@
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from app.core.logger import get_logger
+from app.services.metricas_service import rotulos
+
+logger = get_logger(__name__)
+
+# Sinal interno de fim de fluxo entre os estágios
+_FIM = object()
+
+
+class Estagio(NamedTuple):
+    """
+    Um estágio do pipeline.
+
+    Attributes:
+        nome (str): Nome do estágio (usado nos logs e nas threads).
+        funcao (Callable): Recebe o item e retorna o item para o próximo estágio,
+            ou None para descartá-lo (falha já tratada/logada pelo estágio).
+        workers (int): Quantidade de threads concorrentes neste estágio.
+    """
+
+    nome: str
+    funcao: Callable[[Any], Optional[Any]]
+    workers: int = 1
+
+
+def executar_pipeline(
+    itens: Iterable[Any],
+    estagios: List[Estagio],
+    tamanho_fila: int,
+    ao_falhar: Optional[Callable[[Any, Exception], None]] = None,
+    identificar: Optional[Callable[[Any], Dict[str, Any]]] = None,
+) -> List[Any]:
+    """
+    Executa os itens através de uma sequência de estágios concorrentes.
+
+    Cada estágio possui seu próprio conjunto de threads e as filas entre eles são
+    limitadas (back-pressure): se um estágio lento acumular `tamanho_fila` itens,
+    os estágios anteriores aguardam em vez de carregar tudo em memória.
+
+    Args:
+        itens (Iterable[Any]): Itens de entrada (pode ser um gerador).
+        estagios (List[Estagio]): Estágios na ordem de execução.
+        tamanho_fila (int): Capacidade máxima de cada fila entre estágios.
+        ao_falhar (Optional[Callable]): Chamado com (item, exceção) quando um
+            estágio lança exceção. O item é descartado em seguida.
+        identificar (Optional[Callable]): Retorna os rótulos do item nas
+            métricas (ex.: {"redacao": nome}); as etapas medidas durante cada
+            estágio ficam associadas a eles.
+
+    Returns:
+        List[Any]: Itens que passaram por todos os estágios com sucesso.
+
+    Raises:
+        Exception: O erro lançado pelos `itens` de entrada, depois que os itens
+            já recebidos terminam de passar pelos estágios (uma entrada
+            incompleta não é tratada como completa).
+    """
+    filas = [queue.Queue(maxsize=max(1, tamanho_fila)) for _ in estagios]
+    workers = [max(1, estagio.workers) for estagio in estagios]
+    concluidos: List[Any] = []
+    lock_concluidos = threading.Lock()
+    erro_entrada: List[Exception] = []
+
+    def alimentar() -> None:
+        try:
+            for item in itens:
+                filas[0].put(item)
+        except Exception as e:
+            logger.error(f"Erro ao obter itens de entrada do pipeline: {e}")
+            erro_entrada.append(e)
+        finally:
+            for _ in range(workers[0]):
+                filas[0].put(_FIM)
+
+    def trabalhar(indice: int) -> None:
+        estagio = estagios[indice]
+        entrada = filas[indice]
+        saida = filas[indice + 1] if indice + 1 < len(filas) else None
+
+        while True:
+            item = entrada.get()
+            if item is _FIM:
+                break
+            try:
+                with rotulos(**identificar(item)) if identificar else nullcontext():
+                    resultado = estagio.funcao(item)
+            except Exception as e:
+                if not ao_falhar:
+                    logger.error(f"Erro no estágio '{estagio.nome}': {e}")
+                    continue
+                # Uma falha no próprio tratamento (ex.: banco travado ao
+                # registrar) não pode derrubar a thread: sem ela, o sinal de
+                # fim não avança e o pipeline fica parado com a fila cheia
+                try:
+                    ao_falhar(item, e)
+                except Exception as erro_tratamento:
+                    logger.error(
+                        f"Erro ao tratar falha no estágio '{estagio.nome}': "
+                        f"{erro_tratamento} (falha original: {e})"
+                    )
+                continue
+
+            if resultado is None:
+                continue
+            if saida is not None:
+                saida.put(resultado)
+            else:
+                with lock_concluidos:
+                    concluidos.append(resultado)
+
+    alimentador = threading.Thread(
+        target=alimentar, name="pipeline-entrada", daemon=True
+    )
+    alimentador.start()
+
+    for indice, estagio in enumerate(estagios):
+        threads = [
+            threading.Thread(
+                target=trabalhar,
+                args=(indice,),
+                name=f"pipeline-{estagio.nome}-{n}",
+                daemon=True,
+            )
+            for n in range(workers[indice])
+        ]
+        for t in threads:
+            t.start()
+
+        # O estágio seguinte só recebe o sinal de fim depois que todas as
+        # threads deste estágio terminarem de drenar a fila.
+        def encerrar(threads=threads, indice=indice) -> None:
+            for t in threads:
+                t.join()
+            if indice + 1 < len(estagios):
+                for _ in range(workers[indice + 1]):
+                    filas[indice + 1].put(_FIM)
+
+        finalizador = threading.Thread(
+            target=encerrar, name=f"pipeline-{estagio.nome}-fim", daemon=True
+        )
+        finalizador.start()
+        if indice == len(estagios) - 1:
+            ultimo_finalizador = finalizador
+
+    alimentador.join()
+    ultimo_finalizador.join()
+    if erro_entrada:
+        raise erro_entrada[0]
+    return concluidos
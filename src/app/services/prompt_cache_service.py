@@ -0,0 +1,281 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, TypedDict
+
+from app.core.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+# Depois de uma falha ao criar o contexto, espera este tempo antes de tentar de
+# novo (evita uma chamada extra, sempre falha, por redação)
+ESPERA_APOS_FALHA = 600
+
+# Tamanho mínimo (tokens) de um contexto em cache explícito, por prefixo do
+# nome do modelo, conforme a documentação do Gemini. Modelos fora da tabela
+# usam o menor mínimo conhecido: se a API recusar, vale a espera acima.
+MINIMO_TOKENS_CONTEXTO = (
+    ("gemini-1.5", 32768),
+    ("gemini-2.0", 4096),
+    ("gemini-2.5-pro", 4096),
+    ("gemini-2.5-flash", 1024),
+)
+MINIMO_TOKENS_PADRAO = 1024
+
+
+class ContextoRegistrado(TypedDict):
+    modelo: str
+    hash_prompt: str
+    nome: str
+    expira_em: float
+
+
+class EstatisticasContexto(TypedDict):
+    chamadas: int
+    chamadas_com_cache: int
+    tokens_entrada: int
+    tokens_do_cache: int
+
+
+def hash_prompt(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def minimo_tokens_contexto(model_name: str) -> int:
+    """Menor prompt (em tokens) que o modelo aceita como contexto em cache."""
+    nome = model_name.split("/")[-1]
+    for prefixo, minimo in MINIMO_TOKENS_CONTEXTO:
+        if nome.startswith(prefixo):
+            return minimo
+    return MINIMO_TOKENS_PADRAO
+
+
+class GerenciadorContexto:
+    """
+    Mantém o prompt mestre registrado como contexto em cache no Gemini.
+
+    O contexto é identificado pelo modelo e pelo hash do prompt: quando o
+    prompt.txt muda, um novo contexto é criado e o anterior é apagado. Contextos
+    perto de expirar têm o TTL renovado. O registro fica em disco, para que
+    execuções seguintes (e outros processos) reaproveitem o mesmo contexto.
+
+    Se o cache não estiver disponível (modelo sem suporte, prompt abaixo do
+    tamanho mínimo, falta de permissão), `obter` retorna None e a chamada segue
+    com o prompt completo. O tamanho do prompt é conferido (count_tokens) antes
+    de criar o contexto: abaixo do mínimo do modelo, o cache nem é tentado.
+    """
+
+    def __init__(self, caminho_registro: str, ttl_segundos: int):
+        self.caminho_registro = caminho_registro
+        self.ttl_segundos = ttl_segundos
+        # Renova quando falta menos de 1/4 do TTL (no mínimo 1 minuto)
+        self.margem_renovacao = max(60, ttl_segundos // 4)
+        self._lock = threading.Lock()
+        self._falhas: Dict[Tuple[str, str], float] = {}
+        self._em_uso: Dict[Tuple[str, str], ContextoRegistrado] = {}
+        self._estatisticas: EstatisticasContexto = {
+            "chamadas": 0,
+            "chamadas_com_cache": 0,
+            "tokens_entrada": 0,
+            "tokens_do_cache": 0,
+        }
+
+    # --- Registro em disco ---
+    def _ler_registro(self) -> Dict[str, ContextoRegistrado]:
+        if not os.path.exists(self.caminho_registro):
+            return {}
+        try:
+            with open(self.caminho_registro, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar_registro(self, registro: Dict[str, ContextoRegistrado]) -> None:
+        os.makedirs(os.path.dirname(self.caminho_registro), exist_ok=True)
+        temporario = f"{self.caminho_registro}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(registro, f)
+        os.replace(temporario, self.caminho_registro)
+
+    # --- Ciclo de vida do contexto ---
+    def _contar_tokens(self, prompt: str, model_name: str) -> int:
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(model_name).count_tokens(prompt).total_tokens
+
+    def _criar(self, prompt: str, model_name: str) -> ContextoRegistrado:
+        # SDK importado só quando o contexto é de fato criado ou consultado
+        from google.generativeai import caching
+
+        contexto = caching.CachedContent.create(
+            model=model_name,
+            display_name="prompt-mestre-correcao",
+            contents=[{"role": "user", "parts": [prompt]}],
+            ttl=datetime.timedelta(seconds=self.ttl_segundos),
+        )
+        tokens = getattr(contexto.usage_metadata, "total_token_count", "?")
+        logger.info(
+            f"Prompt registrado como contexto em cache ({tokens} tokens): "
+            f"{contexto.name}"
+        )
+        return {
+            "modelo": model_name,
+            "hash_prompt": hash_prompt(prompt),
+            "nome": contexto.name,
+            "expira_em": time.time() + self.ttl_segundos,
+        }
+
+    def _renovar(self, entrada: ContextoRegistrado) -> None:
+        from google.generativeai import caching
+
+        caching.CachedContent.get(entrada["nome"]).update(
+            ttl=datetime.timedelta(seconds=self.ttl_segundos)
+        )
+        entrada["expira_em"] = time.time() + self.ttl_segundos
+        logger.info(f"TTL do contexto em cache renovado: {entrada['nome']}")
+
+    def _apagar(self, entrada: ContextoRegistrado) -> None:
+        from google.generativeai import caching
+
+        try:
+            caching.CachedContent.get(entrada["nome"]).delete()
+            logger.info(f"Contexto em cache antigo removido: {entrada['nome']}")
+        except Exception as e:
+            # Já expirado ou removido: nada a fazer
+            logger.debug(f"Contexto {entrada['nome']} não pôde ser removido: {e}")
+
+    def obter(self, prompt: str, model_name: str) -> Optional[str]:
+        """
+        Retorna o nome do contexto em cache do prompt (criando ou renovando se
+        necessário), ou None se o cache não puder ser usado.
+        """
+        chave = (model_name, hash_prompt(prompt))
+        agora = time.time()
+
+        with self._lock:
+            if self._falhas.get(chave, 0) > agora:
+                return None
+
+            # Caminho rápido: contexto já validado por este processo
+            entrada = self._em_uso.get(chave)
+            if entrada and entrada["expira_em"] - agora > self.margem_renovacao:
+                return entrada["nome"]
+
+            registro = self._ler_registro()
+            entrada = registro.get(model_name)
+
+            try:
+                if entrada and entrada["hash_prompt"] != chave[1]:
+                    # O prompt.txt mudou: o contexto antigo não serve mais
+                    self._apagar(entrada)
+                    entrada = None
+
+                if entrada and entrada["expira_em"] - agora > self.margem_renovacao:
+                    self._em_uso[chave] = entrada
+                    return entrada["nome"]
+
+                if entrada and entrada["expira_em"] > agora:
+                    try:
+                        self._renovar(entrada)
+                    except Exception as e:
+                        logger.warning(f"Falha ao renovar o contexto em cache: {e}")
+                        entrada = None
+
+                if not entrada:
+                    tokens = self._contar_tokens(prompt, model_name)
+                    minimo = minimo_tokens_contexto(model_name)
+                    if tokens < minimo:
+                        logger.info(
+                            f"Prompt com {tokens} tokens, abaixo do mínimo de "
+                            f"{minimo} do cache de contexto do {model_name}. "
+                            "Enviando o prompt completo a cada redação."
+                        )
+                        # O mesmo prompt nunca vai caber: não tenta de novo
+                        self._falhas[chave] = float("inf")
+                        registro.pop(model_name, None)
+                        self._gravar_registro(registro)
+                        return None
+                    entrada = self._criar(prompt, model_name)
+
+            except Exception as e:
+                logger.warning(
+                    f"Cache de contexto indisponível ({e}). "
+                    "Enviando o prompt completo a cada redação."
+                )
+                self._falhas[chave] = agora + ESPERA_APOS_FALHA
+                registro.pop(model_name, None)
+                self._gravar_registro(registro)
+                return None
+
+            self._em_uso[chave] = entrada
+            registro[model_name] = entrada
+            self._gravar_registro(registro)
+            return entrada["nome"]
+
+    def invalidar(self, nome: str) -> None:
+        """Esquece um contexto que deixou de existir no servidor."""
+        with self._lock:
+            for chave, entrada in list(self._em_uso.items()):
+                if entrada["nome"] == nome:
+                    del self._em_uso[chave]
+            registro = self._ler_registro()
+            for model_name, entrada in list(registro.items()):
+                if entrada["nome"] == nome:
+                    del registro[model_name]
+            self._gravar_registro(registro)
+
+    # --- Economia de tokens ---
+    def registrar_uso(self, response: Any) -> None:
+        uso = getattr(response, "usage_metadata", None)
+        if uso is None:
+            return
+        do_cache = getattr(uso, "cached_content_token_count", 0) or 0
+        with self._lock:
+            self._estatisticas["chamadas"] += 1
+            self._estatisticas["tokens_entrada"] += (
+                getattr(uso, "prompt_token_count", 0) or 0
+            )
+            if do_cache:
+                self._estatisticas["chamadas_com_cache"] += 1
+                self._estatisticas["tokens_do_cache"] += do_cache
+
+    def estatisticas(self) -> EstatisticasContexto:
+        with self._lock:
+            return dict(self._estatisticas)
+
+    def resumo_economia(self) -> str:
+        est = self.estatisticas()
+        if not est["chamadas"]:
+            return "Contexto em cache: nenhuma chamada à IA."
+        proporcao = est["tokens_do_cache"] / max(1, est["tokens_entrada"])
+        return (
+            f"Contexto em cache: {est['chamadas_com_cache']}/{est['chamadas']} "
+            f"chamadas, {est['tokens_do_cache']} tokens de entrada servidos pelo "
+            f"cache ({proporcao:.0%} do total)."
+        )
+
+
+_gerenciador: Optional[GerenciadorContexto] = None
+_gerenciador_lock = threading.Lock()
+
+
+def obter_gerenciador() -> Optional[GerenciadorContexto]:
+    """
+    Retorna o gerenciador único do processo, ou None se o cache de contexto
+    estiver desativado.
+    """
+    global _gerenciador
+    if not Config.CONTEXTO_CACHE_ATIVO:
+        return None
+
+    with _gerenciador_lock:
+        if _gerenciador is None:
+            _gerenciador = GerenciadorContexto(
+                Config.CONTEXTO_REGISTRO_PATH,
+                ttl_segundos=Config.CONTEXTO_TTL_MINUTOS * 60,
+            )
+        return _gerenciador
@@ -0,0 +1,255 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from app.core.logger import get_logger
+from config import Config
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Códigos HTTP que indicam cota estourada ou serviço sobrecarregado
+CODIGOS_SOBRECARGA = (429, 503)
+
+
+def erro_de_sobrecarga(erro: Exception) -> bool:
+    """
+    Indica se a exceção é um 429/503 (as exceções do google.api_core trazem o
+    status HTTP em `code`).
+    """
+    return getattr(erro, "code", None) in CODIGOS_SOBRECARGA
+
+
+class TokenBucket:
+    """
+    Balde de fichas: libera `por_minuto` fichas por minuto, acumulando no
+    máximo `capacidade` (a rajada permitida).
+
+    Args:
+        por_minuto (float): Taxa de reposição.
+        capacidade (Optional[float]): Tamanho do balde (padrão: um segundo
+            de cota, o que distribui as chamadas ao longo do minuto).
+    """
+
+    def __init__(self, por_minuto: float, capacidade: Optional[float] = None):
+        self.por_segundo = por_minuto / 60
+        self.capacidade = max(1.0, capacidade or por_minuto / 60)
+        self._fichas = self.capacidade
+        self._ultima = time.monotonic()
+        self._pausado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _repor(self) -> None:
+        agora = time.monotonic()
+        self._fichas = min(
+            self.capacidade, self._fichas + (agora - self._ultima) * self.por_segundo
+        )
+        self._ultima = agora
+
+    def consumir(self, quantidade: float = 1) -> None:
+        """
+        Bloqueia até haver fichas disponíveis e consome `quantidade`.
+
+        Pedidos maiores que o balde esperam que ele encha e deixam o saldo
+        negativo, o que atrasa os próximos e mantém a taxa média.
+        """
+        necessario = min(quantidade, self.capacidade)
+        while True:
+            with self._lock:
+                espera = self._pausado_ate - time.monotonic()
+                if espera <= 0:
+                    self._repor()
+                    if self._fichas >= necessario:
+                        self._fichas -= quantidade
+                        return
+                    espera = (necessario - self._fichas) / self.por_segundo
+            time.sleep(espera)
+
+    def ajustar(self, diferenca: float) -> None:
+        """
+        Corrige o consumo depois que o custo real é conhecido (positivo debita,
+        negativo devolve). O saldo pode ficar negativo, atrasando os próximos.
+        """
+        with self._lock:
+            self._repor()
+            self._fichas = min(self.capacidade, self._fichas - diferenca)
+
+    def pausar(self, segundos: float) -> None:
+        """
+        Suspende a liberação de fichas para todos os consumidores e esvazia o
+        balde, para que a retomada não comece com uma rajada.
+        """
+        with self._lock:
+            self._repor()
+            self._fichas = min(self._fichas, 0.0)
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+
+
+class LimitadorAdaptativo:
+    """
+    Limite de chamadas simultâneas ajustado por AIMD.
+
+    Cada sucesso dentro da latência alvo, com o limite em uso, aumenta o limite
+    em 1/limite (cerca de +1 por "rodada" completa). Sobrecarga (429/503) corta
+    o limite pela metade, e respostas lentas o reduzem em 10%.
+    """
+
+    def __init__(self, inicial: int, minimo: int, maximo: int, latencia_alvo: float):
+        self.minimo = max(1, minimo)
+        self.maximo = max(self.minimo, maximo)
+        self.limite = float(min(max(inicial, self.minimo), self.maximo))
+        self.latencia_alvo = latencia_alvo
+        self.em_uso = 0
+        self._cond = threading.Condition()
+        self._ultima_reducao = 0.0
+
+    @contextmanager
+    def vaga(self) -> Iterator[None]:
+        with self._cond:
+            while self.em_uso >= int(self.limite):
+                self._cond.wait()
+            self.em_uso += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.em_uso -= 1
+                self._cond.notify_all()
+
+    def _reduzir(self, fator: float) -> None:
+        # Várias falhas da mesma rajada contam como um só sinal
+        agora = time.monotonic()
+        if agora - self._ultima_reducao < 1.0:
+            return
+        self._ultima_reducao = agora
+        self.limite = max(self.minimo, self.limite * fator)
+
+    def registrar_sucesso(self, latencia: float) -> None:
+        with self._cond:
+            if latencia > self.latencia_alvo:
+                self._reduzir(0.9)
+            elif self.em_uso >= int(self.limite) - 1:
+                # Só cresce quando o limite atual está sendo aproveitado
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self._cond.notify_all()
+
+    def registrar_sobrecarga(self) -> None:
+        with self._cond:
+            anterior = int(self.limite)
+            self._reduzir(0.5)
+            if int(self.limite) != anterior:
+                logger.warning(
+                    f"Sobrecarga na IA: concorrência reduzida de {anterior} "
+                    f"para {int(self.limite)}."
+                )
+
+
+class AgendadorIA:
+    """
+    Agenda as chamadas ao Gemini respeitando as cotas de requisições e tokens
+    por minuto, com concorrência adaptativa e novas tentativas (backoff
+    exponencial com jitter) em caso de 429/503.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        concorrencia_inicial: int,
+        concorrencia_maxima: int,
+        latencia_alvo: float,
+        max_tentativas: int,
+        espera_maxima: float = 60.0,
+    ):
+        self.requisicoes = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concorrencia = LimitadorAdaptativo(
+            concorrencia_inicial, 1, concorrencia_maxima, latencia_alvo
+        )
+        self.max_tentativas = max(1, max_tentativas)
+        self.espera_maxima = espera_maxima
+
+    def _espera(self, tentativa: int) -> float:
+        teto = min(self.espera_maxima, 2.0 ** (tentativa + 1))
+        return random.uniform(teto / 2, teto)
+
+    def executar(
+        self,
+        funcao: Callable[[], T],
+        tokens_estimados: int = 0,
+        contar_tokens: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """
+        Executa `funcao` quando houver cota e vaga de concorrência.
+
+        Args:
+            funcao (Callable): A chamada à IA.
+            tokens_estimados (int): Tokens reservados antes da chamada.
+            contar_tokens (Optional[Callable]): Extrai o total real de tokens do
+                resultado, para corrigir a reserva.
+
+        Raises:
+            Exception: O último erro, se não for de sobrecarga ou se as
+                tentativas se esgotarem.
+        """
+        for tentativa in range(self.max_tentativas):
+            # A cota é consumida já com a vaga garantida: quem está na fila da
+            # concorrência também respeita uma pausa causada por 429
+            with self.concorrencia.vaga():
+                self.requisicoes.consumir(1)
+                self.tokens.consumir(tokens_estimados)
+
+                inicio = time.perf_counter()
+                try:
+                    resultado = funcao()
+                except Exception as e:
+                    if not erro_de_sobrecarga(e):
+                        raise
+                    self.concorrencia.registrar_sobrecarga()
+                    if tentativa + 1 >= self.max_tentativas:
+                        raise
+                    erro = e
+                else:
+                    self.concorrencia.registrar_sucesso(time.perf_counter() - inicio)
+                    if contar_tokens:
+                        reais = contar_tokens(resultado)
+                        if reais is not None:
+                            self.tokens.ajustar(reais - tokens_estimados)
+                    return resultado
+
+            # Todas as chamadas recuam juntas (evita que as demais threads
+            # continuem batendo na cota), e esta aguarda fora da vaga
+            espera = self._espera(tentativa)
+            self.requisicoes.pausar(espera / 2)
+            logger.warning(
+                f"IA indisponível ({erro.code}); nova tentativa "
+                f"{tentativa + 2}/{self.max_tentativas} em {espera:.1f}s."
+            )
+            time.sleep(espera)
+
+        raise RuntimeError("Tentativas esgotadas")
+
+
+_agendador: Optional[AgendadorIA] = None
+_agendador_lock = threading.Lock()
+
+
+def obter_agendador() -> AgendadorIA:
+    """
+    Retorna o agendador único do processo, configurado a partir do Config.
+    """
+    global _agendador
+    with _agendador_lock:
+        if _agendador is None:
+            _agendador = AgendadorIA(
+                rpm=Config.GEMINI_RPM,
+                tpm=Config.GEMINI_TPM,
+                concorrencia_inicial=Config.BATCH_WORKERS,
+                concorrencia_maxima=Config.GEMINI_CONCORRENCIA_MAX,
+                latencia_alvo=Config.GEMINI_LATENCIA_ALVO,
+                max_tentativas=Config.GEMINI_MAX_TENTATIVAS,
+            )
+        return _agendador
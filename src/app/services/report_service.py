@@ -1,124 +1,435 @@
+import copy
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Any, Dict, Optional
-from docx import Document
-from docx.oxml.text.paragraph import CT_P
-from docx.oxml.table import CT_Tbl
-from docx.table import Table, _Cell
-from docx.text.paragraph import Paragraph
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
 
 from app.core.logger import get_logger
+from app.services.metricas_service import ETAPA_DOCX, medir
 from config import Config
 
+# O python-docx só é importado ao compilar o template (primeiro relatório)
+if TYPE_CHECKING:
+    from docx.document import Document as DocumentObject
+    from docx.oxml.xmlchemy import BaseOxmlElement
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
 logger = get_logger(__name__)
 
 
-def substituir_em_paragrafo(paragrafo: Paragraph, substituicoes: Dict[str, str]) -> None:
+# Qualquer token no formato {{NOME}} presente no template
+PADRAO_PLACEHOLDER = re.compile(r"\{\{[^{}]+\}\}")
+
+# O nome do aluno vem da leitura da folha pela IA: no nome do arquivo, tudo o
+# que não for letra (inclusive acentuada), dígito, "_" ou "-" vira "_"
+PADRAO_FORA_DO_NOME = re.compile(r"[^\w\-]")
+TAMANHO_MAXIMO_NOME_ALUNO = 60
+
+
+class MotorSubstituicao:
+    """
+    Substitui todos os placeholders de um texto em uma única passada.
+
+    Em vez de procurar cada chave separadamente (e reprocessar texto já
+    substituído), uma única expressão regular encontra todos os tokens
+    `{{...}}` e cada um é trocado pelo seu valor. Tokens sem valor no
+    mapeamento permanecem no texto e são registrados em `desconhecidos`.
+    """
+
+    def __init__(self, substituicoes: Dict[str, Any]):
+        self.valores = {chave: str(valor) for chave, valor in substituicoes.items()}
+        self.desconhecidos: Set[str] = set()
+
+    def _trocar(self, match: "re.Match[str]") -> str:
+        token = match.group(0)
+        valor = self.valores.get(token)
+        if valor is None:
+            self.desconhecidos.add(token)
+            return token
+        return valor
+
+    def contem_placeholder(self, texto: str) -> bool:
+        """Indica se o texto contém algum placeholder conhecido."""
+        if "{{" not in texto:
+            return False
+        return any(
+            match.group(0) in self.valores
+            for match in PADRAO_PLACEHOLDER.finditer(texto)
+        )
+
+    def substituir(self, texto: str) -> str:
+        """Retorna o texto com todos os placeholders conhecidos substituídos."""
+        if "{{" not in texto:
+            return texto
+        return PADRAO_PLACEHOLDER.sub(self._trocar, texto)
+
+
+def substituir_em_paragrafo(
+    paragrafo: "Paragraph", substituicoes: Union[Dict[str, str], MotorSubstituicao]
+) -> None:
     """
     Substitui placeholders em um parágrafo, lidando com o problema
     de placeholders quebrados em múltiplos runs.
-    
+
     Estratégia:
     1. Concatena todo o texto dos runs
     2. Verifica se há placeholders a substituir
     3. Se sim, reconstrói o parágrafo com o texto substituído
     """
+    motor = (
+        substituicoes
+        if isinstance(substituicoes, MotorSubstituicao)
+        else MotorSubstituicao(substituicoes)
+    )
+
     # Pega o texto completo do parágrafo
-    texto_completo = ''.join(run.text for run in paragrafo.runs)
-    
+    runs = paragrafo.runs
+    texto_completo = "".join(run.text for run in runs)
+
     # Verifica se há algum placeholder neste parágrafo
-    tem_placeholder = any(placeholder in texto_completo for placeholder in substituicoes.keys())
-    
-    if not tem_placeholder:
+    if not motor.contem_placeholder(texto_completo):
         return  # Nada a fazer
-    
-    # Aplica todas as substituições
-    texto_novo = texto_completo
-    for placeholder, valor in substituicoes.items():
-        if placeholder in texto_novo:
-            texto_novo = texto_novo.replace(placeholder, str(valor))
-    
+
+    # Aplica todas as substituições em uma única passada
+    texto_novo = motor.substituir(texto_completo)
+
     # Se o texto mudou, reconstrói o parágrafo
     if texto_novo != texto_completo:
         # Salva a formatação do primeiro run (se houver)
         formato_original = None
-        if paragrafo.runs:
-            primeiro_run = paragrafo.runs[0]
+        if runs:
+            primeiro_run = runs[0]
             formato_original = {
-                'bold': primeiro_run.bold,
-                'italic': primeiro_run.italic,
-                'underline': primeiro_run.underline,
-                'font_name': primeiro_run.font.name,
-                'font_size': primeiro_run.font.size,
+                "bold": primeiro_run.bold,
+                "italic": primeiro_run.italic,
+                "underline": primeiro_run.underline,
+                "font_name": primeiro_run.font.name,
+                "font_size": primeiro_run.font.size,
             }
-        
+
         # Limpa todos os runs
-        for run in paragrafo.runs:
-            run.text = ''
-        
+        for run in runs:
+            run.text = ""
+
         # Cria um novo run com o texto substituído
         novo_run = paragrafo.add_run(texto_novo)
-        
+
         # Restaura a formatação original (se possível)
         if formato_original:
             try:
-                novo_run.bold = formato_original['bold']
-                novo_run.italic = formato_original['italic']
-                novo_run.underline = formato_original['underline']
-                if formato_original['font_name']:
-                    novo_run.font.name = formato_original['font_name']
-                if formato_original['font_size']:
-                    novo_run.font.size = formato_original['font_size']
+                novo_run.bold = formato_original["bold"]
+                novo_run.italic = formato_original["italic"]
+                novo_run.underline = formato_original["underline"]
+                if formato_original["font_name"]:
+                    novo_run.font.name = formato_original["font_name"]
+                if formato_original["font_size"]:
+                    novo_run.font.size = formato_original["font_size"]
             except Exception as e:
                 logger.warning(f"Não foi possível restaurar formatação: {e}")
 
 
-def processar_tabela(tabela: Table, substituicoes: Dict[str, str]) -> None:
-    """Processa todas as células de uma tabela."""
+def substituir_em_texto(
+    elemento: "BaseOxmlElement",
+    substituicoes: Union[Dict[str, str], MotorSubstituicao],
+) -> None:
+    """
+    Substitui placeholders dentro de um único elemento <w:t> (usado para
+    caixas de texto e outros elementos fora dos parágrafos percorridos).
+    """
+    motor = (
+        substituicoes
+        if isinstance(substituicoes, MotorSubstituicao)
+        else MotorSubstituicao(substituicoes)
+    )
+    texto_original = elemento.text or ""
+    texto_novo = motor.substituir(texto_original)
+    if texto_novo != texto_original:
+        elemento.text = texto_novo
+
+
+def _paragrafos_da_tabela(tabela: "Table") -> Iterator["Paragraph"]:
+    """Percorre os parágrafos de todas as células de uma tabela."""
     for linha in tabela.rows:
         for celula in linha.cells:
-            for paragrafo in celula.paragraphs:
-                substituir_em_paragrafo(paragrafo, substituicoes)
-
-
-def processar_secao(section, substituicoes: Dict[str, str]) -> None:
-    """Processa cabeçalhos e rodapés de uma seção."""
-    # Processa cabeçalho
-    if section.header:
-        for paragrafo in section.header.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-        
-        # Processa tabelas no cabeçalho
-        for tabela in section.header.tables:
-            processar_tabela(tabela, substituicoes)
-    
-    # Processa rodapé
-    if section.footer:
-        for paragrafo in section.footer.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-        
-        # Processa tabelas no rodapé
-        for tabela in section.footer.tables:
-            processar_tabela(tabela, substituicoes)
-
-
-def processar_xpath_fallback(document: Document, substituicoes: Dict[str, str]) -> None:
-    """
-    Usa XPath como fallback para pegar elementos que não foram
-    capturados pelas abordagens anteriores (ex: caixas de texto).
+            yield from celula.paragraphs
+
+
+def _iterar_paragrafos(document: "DocumentObject") -> Iterator["Paragraph"]:
     """
-    try:
-        for element in document._element.xpath('.//w:t'):
-            texto_original = element.text or ''
-            texto_novo = texto_original
-            
-            for placeholder, valor in substituicoes.items():
-                if placeholder in texto_novo:
-                    texto_novo = texto_novo.replace(placeholder, str(valor))
-            
-            if texto_novo != texto_original:
-                element.text = texto_novo
-    except Exception as e:
-        logger.warning(f"Falha no processamento XPath (ignorando): {e}")
+    Percorre, nesta ordem, os parágrafos do corpo, das tabelas do corpo e dos
+    cabeçalhos e rodapés (incluindo suas tabelas) de todas as seções.
+    """
+    yield from document.paragraphs
+
+    for tabela in document.tables:
+        yield from _paragrafos_da_tabela(tabela)
+
+    for section in document.sections:
+        for parte in (section.header, section.footer):
+            yield from parte.paragraphs
+            for tabela in parte.tables:
+                yield from _paragrafos_da_tabela(tabela)
+
+
+def _caminho_do_elemento(elemento: "BaseOxmlElement") -> Tuple[int, ...]:
+    """Retorna a posição do elemento na árvore como índices a partir da raiz."""
+    caminho = []
+    pai = elemento.getparent()
+    while pai is not None:
+        caminho.append(pai.index(elemento))
+        elemento, pai = pai, pai.getparent()
+    return tuple(reversed(caminho))
+
+
+def _resolver_caminho(raiz: "BaseOxmlElement", caminho: Tuple[int, ...]):
+    elemento = raiz
+    for indice in caminho:
+        elemento = elemento[indice]
+    return elemento
+
+
+def _novo_zinfo(nome: str, date_time: Tuple[int, ...]) -> ZipInfo:
+    # Mesmos atributos que ZipFile.writestr atribui quando recebe só o nome
+    zinfo = ZipInfo(nome, date_time=date_time)
+    zinfo.compress_type = ZIP_DEFLATED
+    zinfo.external_attr = 0o600 << 16
+    return zinfo
+
+
+class _ParteAlvo(NamedTuple):
+    """Parte XML do template que contém placeholders."""
+
+    membername: str
+    raiz: "BaseOxmlElement"
+    paragrafos: List[Tuple[int, ...]]
+    textos: List[Tuple[int, ...]]
+
+
+class TemplateCompilado:
+    """
+    Template .docx analisado uma única vez.
+
+    Na compilação, o documento é percorrido do mesmo modo que a substituição
+    tradicional (corpo, tabelas, cabeçalhos, rodapés e o fallback XPath) e são
+    registradas apenas as posições que contêm placeholders, inclusive os
+    quebrados em vários runs. Cada renderização clona somente as partes XML
+    com placeholders, aplica as substituições nessas posições e reaproveita os
+    bytes já serializados de todo o resto do pacote.
+    """
+
+    def __init__(self, caminho_template: str, placeholders: Iterable[str]):
+        self.caminho_template = caminho_template
+        self.placeholders = tuple(placeholders)
+        self._lock = threading.Lock()
+
+        from docx import Document
+
+        document = Document(caminho_template)
+        package = document.part.package
+
+        motor = MotorSubstituicao(dict.fromkeys(self.placeholders, ""))
+        encontrados: Set[str] = set()
+
+        # 1. Parágrafos com placeholders (a travessia também cria as definições de
+        #    cabeçalho/rodapé ausentes, exatamente como a substituição direta faz)
+        paragrafos_por_raiz: Dict[BaseOxmlElement, List[BaseOxmlElement]] = {}
+        runs_limpos = set()
+        for paragrafo in _iterar_paragrafos(document):
+            p = paragrafo._p
+            texto = "".join(run.text for run in paragrafo.runs)
+            encontrados.update(PADRAO_PLACEHOLDER.findall(texto))
+            if not motor.contem_placeholder(texto):
+                continue
+            raiz = p.getroottree().getroot()
+            alvos = paragrafos_por_raiz.setdefault(raiz, [])
+            if p not in alvos:
+                alvos.append(p)
+                runs_limpos.update(p.r_lst)
+
+        # 2. Fallback XPath (somente no corpo): textos que continuarão com
+        #    placeholders após a substituição por parágrafo
+        raiz_corpo = document._element
+        textos_corpo = []
+        for t in raiz_corpo.xpath(".//w:t"):
+            if any(ancestral in runs_limpos for ancestral in t.iterancestors()):
+                continue
+            texto = t.text or ""
+            encontrados.update(PADRAO_PLACEHOLDER.findall(texto))
+            if motor.contem_placeholder(texto):
+                textos_corpo.append(t)
+
+        # Placeholders do template sem valor e valores sem placeholder no template
+        self.desconhecidos = sorted(encontrados - set(self.placeholders))
+        self.ausentes = sorted(set(self.placeholders) - encontrados)
+        if self.desconhecidos:
+            logger.warning(
+                f"Placeholders sem valor no template: {', '.join(self.desconhecidos)}"
+            )
+        if self.ausentes:
+            logger.warning(
+                f"Placeholders não encontrados no template: {', '.join(self.ausentes)}"
+            )
+
+        # 3. Partes com placeholders, regeneradas a cada relatório
+        self._alvos: List[_ParteAlvo] = []
+        for part in package.parts:
+            raiz = getattr(part, "_element", None)
+            paragrafos = paragrafos_por_raiz.get(raiz, [])
+            textos = textos_corpo if raiz is raiz_corpo else []
+            if paragrafos or textos:
+                self._alvos.append(
+                    _ParteAlvo(
+                        part.partname.membername,
+                        raiz,
+                        [_caminho_do_elemento(p) for p in paragrafos],
+                        [_caminho_do_elemento(t) for t in textos],
+                    )
+                )
+
+        # 4. Todo o resto do pacote já compactado: o template é salvo uma vez
+        #    pelo próprio python-docx e os membros sem placeholders vão para um
+        #    zip fixo. Cada relatório parte de uma cópia dele e só acrescenta
+        #    (e compacta) as partes regeneradas, em vez de compactar de novo a
+        #    imagem, os estilos e as demais partes que nunca mudam.
+        nomes_alvo = {alvo.membername for alvo in self._alvos}
+        salvo, fixo = BytesIO(), BytesIO()
+        document.save(salvo)
+        date_time = time.localtime(time.time())[:6]
+        with ZipFile(salvo) as origem, ZipFile(fixo, "w") as destino:
+            for info in origem.infolist():
+                if info.filename not in nomes_alvo:
+                    destino.writestr(
+                        _novo_zinfo(info.filename, date_time), origem.read(info)
+                    )
+        self._pacote_fixo = fixo.getvalue()
+
+        total_paragrafos = sum(len(a.paragrafos) for a in self._alvos)
+        logger.info(
+            f"Template compilado: {total_paragrafos} parágrafos e "
+            f"{len(textos_corpo)} textos avulsos com placeholders."
+        )
+
+    def renderizar(self, substituicoes: Dict[str, str]) -> BytesIO:
+        """
+        Gera o documento preenchido com as substituições informadas.
+
+        Args:
+            substituicoes (Dict[str, str]): Placeholders e seus valores.
+
+        Returns:
+            BytesIO: Buffer com o arquivo .docx gerado.
+        """
+        from docx.opc.oxml import serialize_part_xml
+        from docx.text.paragraph import Paragraph
+
+        motor = MotorSubstituicao(substituicoes)
+        blobs: Dict[str, bytes] = {}
+        for alvo in self._alvos:
+            with self._lock:
+                raiz = copy.deepcopy(alvo.raiz)
+
+            # Resolve todas as posições antes de alterar a árvore
+            paragrafos = [_resolver_caminho(raiz, c) for c in alvo.paragrafos]
+            textos = [_resolver_caminho(raiz, c) for c in alvo.textos]
+
+            for p in paragrafos:
+                substituir_em_paragrafo(Paragraph(p, None), motor)
+
+            for t in textos:
+                substituir_em_texto(t, motor)
+
+            blobs[alvo.membername] = serialize_part_xml(raiz)
+
+        buffer = BytesIO(self._pacote_fixo)
+        date_time = time.localtime(time.time())[:6]
+        with ZipFile(buffer, "a") as zipf:
+            for membername, blob in blobs.items():
+                zipf.writestr(_novo_zinfo(membername, date_time), blob)
+        buffer.seek(0)
+
+        if motor.desconhecidos:
+            logger.warning(
+                "Placeholders não preenchidos no relatório: "
+                f"{', '.join(sorted(motor.desconhecidos))}"
+            )
+        return buffer
+
+
+_templates: Dict[Tuple[str, int, Tuple[str, ...]], TemplateCompilado] = {}
+_templates_lock = threading.Lock()
+
+
+def obter_template_compilado(
+    caminho_template: str, placeholders: Iterable[str]
+) -> TemplateCompilado:
+    """
+    Retorna o template compilado do cache do processo, recompilando-o se o
+    arquivo for alterado no disco.
+    """
+    caminho = os.path.abspath(caminho_template)
+    chave = (caminho, os.stat(caminho).st_mtime_ns, tuple(placeholders))
+
+    with _templates_lock:
+        template = _templates.get(chave)
+        if template is None:
+            logger.info(f"📄 Compilando template: {caminho_template}")
+            for antiga in [k for k in _templates if k[0] == caminho]:
+                del _templates[antiga]
+            template = TemplateCompilado(caminho, chave[2])
+            _templates[chave] = template
+        return template
+
+
+def montar_substituicoes(dados: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Monta o dicionário de placeholders do template a partir dos dados da correção.
+    """
+    comps = dados.get("analise_competencias", {})
+
+    substituicoes = {
+        "{{NOME_ALUNO}}": dados.get("nome_aluno", "Não identificado"),
+        "{{TEMA}}": dados.get("tema_redacao", "Não identificado"),
+        "{{ANO}}": dados.get("ano_turma", "Não informado"),
+        "{{BIMESTRE}}": dados.get("bimestre", "Não informado"),
+        "{{NOTA_FINAL}}": str(dados.get("nota_final", 0)),
+        "{{COMENTARIOS}}": dados.get("comentarios_gerais", "Sem comentários."),
+        "{{ALERTA_ORIGINALIDADE}}": dados.get("alerta_originalidade") or ""
+    }
+
+    # Adiciona notas e análises das competências
+    for i in range(1, 6):
+        comp_data = comps.get(f"c{i}", {})
+        nota = str(comp_data.get("nota", 0))
+        analise = comp_data.get("analise", "Análise não disponível.")
+
+        # Remove markdown da análise
+        analise_limpa = analise.replace("**", "").replace("#", "").strip()
+
+        substituicoes[f"{{{{NOTA_C{i}}}}}"] = nota
+        substituicoes[f"{{{{ANALISE_C{i}}}}}"] = analise_limpa
+
+    return substituicoes
 
 
 def preencher_e_gerar_docx(
@@ -126,8 +437,9 @@ def preencher_e_gerar_docx(
 ) -> Optional[BytesIO]:
     """
     Preenche o template .docx com os dados da correção.
-    
-    Processa de forma robusta:
+
+    O template é compilado uma única vez por processo (ver `TemplateCompilado`)
+    e cobre de forma robusta:
     - Corpo do documento
     - Tabelas no corpo
     - Cabeçalhos (header)
@@ -135,60 +447,15 @@ def preencher_e_gerar_docx(
     - Caixas de texto (via XPath)
     """
     try:
-        logger.info(f"📄 Abrindo template: {caminho_template}")
-        document = Document(caminho_template)
-        comps = dados.get("analise_competencias", {})
-
         # 1. Prepara o Dicionário de Substituição
-        substituicoes = {
-            "{{NOME_ALUNO}}": dados.get("nome_aluno", "Não identificado"),
-            "{{TEMA}}": dados.get("tema_redacao", "Não identificado"),
-            "{{ANO}}": dados.get("ano_turma", "Não informado"),
-            "{{BIMESTRE}}": dados.get("bimestre", "Não informado"),
-            "{{NOTA_FINAL}}": str(dados.get("nota_final", 0)),
-            "{{COMENTARIOS}}": dados.get("comentarios_gerais", "Sem comentários."),
-            "{{ALERTA_ORIGINALIDADE}}": dados.get("alerta_originalidade") or ""
-        }
-
-        # Adiciona notas e análises das competências
-        for i in range(1, 6):
-            comp_data = comps.get(f"c{i}", {})
-            nota = str(comp_data.get("nota", 0))
-            analise = comp_data.get("analise", "Análise não disponível.")
-            
-            # Remove markdown da análise
-            analise_limpa = analise.replace("**", "").replace("#", "").strip()
-            
-            substituicoes[f"{{{{NOTA_C{i}}}}}"] = nota
-            substituicoes[f"{{{{ANALISE_C{i}}}}}"] = analise_limpa
-
-        logger.info("🔄 Iniciando substituições...")
-        logger.info(f"   Total de placeholders: {len(substituicoes)}")
-
-        # 2. Processa o CORPO do documento
-        logger.info("   📝 Processando corpo do documento...")
-        for paragrafo in document.paragraphs:
-            substituir_em_paragrafo(paragrafo, substituicoes)
-
-        # 3. Processa TABELAS no corpo
-        logger.info("   📊 Processando tabelas no corpo...")
-        for tabela in document.tables:
-            processar_tabela(tabela, substituicoes)
-
-        # 4. Processa CABEÇALHOS e RODAPÉS de todas as seções
-        logger.info("   📋 Processando cabeçalhos e rodapés...")
-        for i, section in enumerate(document.sections):
-            processar_secao(section, substituicoes)
-
-        # 5. XPath como FALLBACK (caixas de texto, elementos especiais)
-        logger.info("   🔍 Processando elementos especiais (XPath)...")
-        processar_xpath_fallback(document, substituicoes)
-
-        # 6. Salva o documento
-        buffer = BytesIO()
-        document.save(buffer)
-        buffer.seek(0)
-        
+        substituicoes = montar_substituicoes(dados)
+
+        # 2. Obtém o template já analisado (compila na primeira chamada)
+        template = obter_template_compilado(caminho_template, substituicoes.keys())
+
+        # 3. Aplica as substituições e gera o documento
+        buffer = template.renderizar(substituicoes)
+
         logger.info(f"✅ Relatório gerado com sucesso para: {dados.get('nome_aluno')}")
         return buffer
 
@@ -199,4 +466,141 @@ def preencher_e_gerar_docx(
         logger.error(f"❌ Erro ao gerar DOCX: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Renderização em processos paralelos ---
+def _iniciar_processo_renderizacao(caminho_template: str, log_desativado: int) -> None:
+    # Processos criados com spawn não herdam o logging.disable do principal
+    logging.disable(log_desativado)
+    # O template é compilado uma vez por processo, antes da primeira tarefa
+    obter_template_compilado(caminho_template, montar_substituicoes({}).keys())
+
+
+def _renderizar_em_processo(
+    dados: Dict[str, Any], caminho_template: str
+) -> Optional[bytes]:
+    buffer = preencher_e_gerar_docx(dados, caminho_template)
+    return buffer.getvalue() if buffer else None
+
+
+class RenderizadorRelatorios:
+    """
+    Gera relatórios .docx em um pool de processos.
+
+    A renderização é CPU pura (lxml e compressão do zip) e segura o GIL, então
+    threads não a aceleram: com o pool, cada processo compila o template uma
+    única vez e renderiza de forma independente, e a vazão cresce com o
+    número de núcleos. Com `processos=1`, renderiza no próprio processo.
+
+    Os processos são criados com `spawn` (não herdam as threads e conexões
+    abertas do processo principal) e só na primeira renderização.
+    """
+
+    def __init__(
+        self,
+        processos: Optional[int] = None,
+        caminho_template: str = Config.TEMPLATE_DOCX_PATH,
+    ):
+        self.processos = max(1, processos or os.cpu_count() or 1)
+        self.caminho_template = caminho_template
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                logger.info(
+                    f"Iniciando {self.processos} processos de renderização .docx"
+                )
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_iniciar_processo_renderizacao,
+                    initargs=(self.caminho_template, logging.root.manager.disable),
+                )
+            return self._pool
+
+    def enviar(self, dados: Dict[str, Any]) -> "Future[Optional[bytes]]":
+        """Agenda a renderização e retorna o Future com os bytes do .docx."""
+        if self.processos == 1:
+            futuro: "Future[Optional[bytes]]" = Future()
+            futuro.set_result(_renderizar_em_processo(dados, self.caminho_template))
+            return futuro
+        return self._executor().submit(
+            _renderizar_em_processo, dados, self.caminho_template
+        )
+
+    def gerar(self, dados: Dict[str, Any]) -> Optional[BytesIO]:
+        """
+        Mesmo contrato de `preencher_e_gerar_docx`, executado no pool (pode ser
+        chamado de várias threads ao mesmo tempo).
+        """
+        try:
+            with medir(ETAPA_DOCX) as span:
+                blob = self.enviar(dados).result()
+                span["bytes"] = len(blob) if blob else 0
+        except BrokenProcessPool as e:
+            logger.error(f"❌ Processo de renderização interrompido: {e}")
+            with self._lock:
+                # O próximo relatório recria o pool
+                self._pool = None
+            return None
+        return BytesIO(blob) if blob else None
+
+    def fechar(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self) -> "RenderizadorRelatorios":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.fechar()
+
+
+def obter_renderizador() -> RenderizadorRelatorios:
+    """Retorna um renderizador com a quantidade de processos configurada."""
+    return RenderizadorRelatorios(Config.DOCX_PROCESSOS)
+
+
+def nome_relatorio(
+    dados: Dict[str, Any], identificador: str, tamanho: Optional[int] = 4
+) -> str:
+    """
+    Nome do arquivo do relatório: nome do aluno mais (parte do) identificador
+    da imagem, como o ID do Drive ou o nome do arquivo, para evitar colisões
+    entre alunos com o mesmo nome.
+    """
+    nome_aluno = str(dados.get("nome_aluno") or "").strip()
+    nome_aluno = PADRAO_FORA_DO_NOME.sub("_", nome_aluno)
+    nome_aluno = nome_aluno[:TAMANHO_MAXIMO_NOME_ALUNO] or "Aluno"
+    return f"Correcao_{nome_aluno}_{identificador[:tamanho]}.docx"
+
+
+def salvar_relatorio(buffer: BytesIO, pasta: str, nome_arquivo: str) -> str:
+    """
+    Grava o relatório na pasta de forma atômica (arquivo temporário + rename):
+    um processo interrompido nunca deixa um .docx pela metade.
+
+    Returns:
+        str: Caminho do arquivo gravado.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, nome_arquivo)
+    # Temporário exclusivo: gravações simultâneas do mesmo relatório (outra
+    # thread ou processo) nunca compartilham o arquivo. Criado com 0o666 para
+    # o relatório ter as permissões de sempre (umask), e não as 0600 do mkstemp
+    temporario = os.path.join(pasta, f".{nome_arquivo}.{uuid.uuid4().hex}.tmp")
+    modo = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    descritor = os.open(temporario, modo, 0o666)
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            f.write(buffer.getbuffer())
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return caminho
@@ -0,0 +1,248 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Caminho de um valor dentro do documento, ex.: ("analise_competencias", "c1",
+# "nota")
+Caminho = Tuple[Union[str, int], ...]
+Evento = Tuple[Caminho, Any]
+
+_ESPACOS = " \t\r\n"
+_INICIO_ESCALAR = "-0123456789tfn"
+
+
+class ErroJsonIncremental(ValueError):
+    """JSON malformado detectado durante a leitura incremental."""
+
+
+class RespostaInvalida(ValueError):
+    """
+    A resposta da IA viola o formato esperado (ou terminou incompleta); a
+    geração pode ser interrompida e repetida.
+    """
+
+
+class _Container:
+    __slots__ = ("valor", "chave", "estado")
+
+    def __init__(self, valor: Union[Dict[str, Any], List[Any]]):
+        self.valor = valor
+        self.chave: Optional[str] = None
+        # Objeto: "chave" -> "dois_pontos" -> "valor" -> "virgula"
+        # Lista:  "valor" -> "virgula"
+        self.estado = "chave" if isinstance(valor, dict) else "valor"
+
+
+class ParserJsonIncremental:
+    """
+    Lê um documento JSON em pedaços, à medida que chega do modelo, e emite
+    um evento (caminho, valor) assim que cada valor escalar termina.
+
+    O texto antes do primeiro "{" (ex.: cercas de markdown) e depois do fim do
+    objeto raiz é ignorado. Ao terminar, `resultado` contém o documento
+    completo, sem necessidade de um `json.loads` sobre a resposta inteira.
+    """
+
+    def __init__(self):
+        self.resultado: Optional[Dict[str, Any]] = None
+        self.concluido = False
+        self._pilha: List[_Container] = []
+        self._token: List[str] = []
+        self._em_string = False
+        self._escape = False
+        self._em_escalar = False
+        self._eventos: List[Evento] = []
+
+    def _caminho(self) -> Caminho:
+        caminho: List[Union[str, int]] = []
+        for container in self._pilha:
+            if isinstance(container.valor, dict):
+                caminho.append(container.chave)
+            else:
+                caminho.append(len(container.valor))
+        return tuple(caminho)
+
+    def _erro(self, mensagem: str) -> ErroJsonIncremental:
+        return ErroJsonIncremental(f"{mensagem} (caminho {self._caminho()})")
+
+    def _adicionar_valor(self, valor: Any, escalar: bool) -> None:
+        topo = self._pilha[-1]
+        if topo.estado != "valor":
+            raise self._erro("Valor fora de posição")
+        if escalar:
+            self._eventos.append((self._caminho(), valor))
+        if isinstance(topo.valor, dict):
+            topo.valor[topo.chave] = valor
+        else:
+            topo.valor.append(valor)
+        topo.estado = "virgula"
+
+    def _abrir(self, valor: Union[Dict[str, Any], List[Any]]) -> None:
+        if not self._pilha:
+            if not isinstance(valor, dict):
+                raise self._erro("O documento deve ser um objeto")
+            self.resultado = valor
+        else:
+            self._adicionar_valor(valor, escalar=False)
+        self._pilha.append(_Container(valor))
+
+    def _fechar(self, caractere: str) -> None:
+        topo = self._pilha[-1]
+        objeto = isinstance(topo.valor, dict)
+        esperado = "}" if objeto else "]"
+        # Vazio só logo após a abertura: em '{"a":}' o objeto ainda não tem
+        # itens, mas falta o valor da chave
+        vazio = not topo.valor and topo.estado == ("chave" if objeto else "valor")
+        if caractere != esperado or not (topo.estado == "virgula" or vazio):
+            raise self._erro(f"'{caractere}' inesperado")
+        self._pilha.pop()
+        if not self._pilha:
+            self.concluido = True
+
+    def _fechar_string(self) -> None:
+        try:
+            texto = json.loads('"' + "".join(self._token) + '"')
+        except ValueError as e:
+            raise self._erro(f"String inválida: {e}") from e
+        self._token.clear()
+        self._em_string = False
+
+        topo = self._pilha[-1]
+        if isinstance(topo.valor, dict) and topo.estado == "chave":
+            topo.chave = texto
+            topo.estado = "dois_pontos"
+        else:
+            self._adicionar_valor(texto, escalar=True)
+
+    def _fechar_escalar(self) -> None:
+        token = "".join(self._token)
+        self._token.clear()
+        self._em_escalar = False
+        try:
+            valor = json.loads(token)
+        except ValueError as e:
+            raise self._erro(f"Valor inválido: {token!r}") from e
+        self._adicionar_valor(valor, escalar=True)
+
+    def alimentar(self, texto: str) -> List[Evento]:
+        """
+        Processa mais um pedaço do documento.
+
+        Returns:
+            List[Evento]: Os valores escalares concluídos neste pedaço.
+
+        Raises:
+            ErroJsonIncremental: Se o trecho não puder fazer parte de um JSON
+                válido.
+        """
+        self._eventos = []
+        for caractere in texto:
+            if self.concluido:
+                break
+
+            if self._em_string:
+                if self._escape:
+                    self._escape = False
+                elif caractere == "\\":
+                    self._escape = True
+                elif caractere == '"':
+                    self._fechar_string()
+                    continue
+                self._token.append(caractere)
+                continue
+
+            if self._em_escalar:
+                if caractere in _ESPACOS or caractere in ",}]":
+                    self._fechar_escalar()
+                else:
+                    self._token.append(caractere)
+                    continue
+
+            if not self._pilha:
+                # Ignora tudo até o início do objeto raiz
+                if caractere == "{":
+                    self._abrir({})
+                continue
+
+            if caractere in _ESPACOS:
+                continue
+
+            topo = self._pilha[-1]
+            if caractere in "}]":
+                self._fechar(caractere)
+            elif caractere == ",":
+                if topo.estado != "virgula":
+                    raise self._erro("',' inesperada")
+                topo.estado = "chave" if isinstance(topo.valor, dict) else "valor"
+            elif caractere == ":":
+                if topo.estado != "dois_pontos":
+                    raise self._erro("':' inesperado")
+                topo.estado = "valor"
+            elif caractere == '"':
+                if topo.estado not in ("chave", "valor"):
+                    raise self._erro("String fora de posição")
+                self._em_string = True
+            elif topo.estado != "valor":
+                raise self._erro(f"'{caractere}' inesperado")
+            elif caractere == "{":
+                self._abrir({})
+            elif caractere == "[":
+                self._abrir([])
+            elif caractere in _INICIO_ESCALAR:
+                self._em_escalar = True
+                self._token.append(caractere)
+            else:
+                raise self._erro(f"'{caractere}' inesperado")
+
+        return self._eventos
+
+
+# Validação antecipada de cada valor recebido: retorna a mensagem de erro, ou
+# None se o valor é aceitável
+ValidadorCampo = Callable[[Caminho, Any], Optional[str]]
+
+
+def ler_stream_json(
+    pedacos,
+    validar: Optional[ValidadorCampo] = None,
+    ao_receber_campo: Optional[Callable[[Caminho, Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Consome os pedaços de texto de uma resposta em streaming e monta o JSON,
+    validando cada campo no momento em que chega.
+
+    Args:
+        pedacos (Iterable[str]): Texto da resposta, em ordem de chegada.
+        validar (Optional[ValidadorCampo]): Regras do formato esperado.
+        ao_receber_campo (Optional[Callable]): Chamado para cada valor escalar
+            concluído (ex.: para atualizar a interface). Erros lançados por ele
+            são registrados no log e não interrompem a leitura.
+
+    Raises:
+        RespostaInvalida: Assim que um campo viola as regras, o JSON se torna
+            inválido ou o texto termina antes do fim do objeto. O restante da
+            resposta não é lido.
+    """
+    parser = ParserJsonIncremental()
+    for pedaco in pedacos:
+        try:
+            eventos = parser.alimentar(pedaco)
+        except ErroJsonIncremental as e:
+            raise RespostaInvalida(str(e)) from e
+
+        for caminho, valor in eventos:
+            problema = validar(caminho, valor) if validar else None
+            if problema:
+                raise RespostaInvalida(problema)
+            if ao_receber_campo:
+                try:
+                    ao_receber_campo(caminho, valor)
+                except Exception as e:
+                    logger.warning(f"Erro ao exibir o campo {caminho}: {e}")
+
+    if not parser.concluido:
+        raise RespostaInvalida("Resposta terminou antes do fim do JSON")
+    return parser.resultado
@@ -29,12 +29,64 @@ class Config:
     )
     PROMPT_PATH = os.path.join(ASSETS_DIR, os.getenv("PROMPT_FILE", "prompt.txt"))
 
-    # Diretório Temporário
+    # Diretório Temporário (criado por quem for usá-lo: importar a configuração
+    # não mexe no disco)
     TMP_DIR = os.path.join(BASE_DIR, os.getenv("TMP_DIR", "tmp"))
 
     # Configurações da IA
     MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro")
 
+    # Cotas e concorrência das chamadas ao Gemini
+    GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
+    GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+    GEMINI_CONCORRENCIA_MAX = int(os.getenv("GEMINI_CONCORRENCIA_MAX", "16"))
+    # Respostas mais lentas que isso (segundos) reduzem a concorrência
+    GEMINI_LATENCIA_ALVO = float(os.getenv("GEMINI_LATENCIA_ALVO", "60"))
+    GEMINI_MAX_TENTATIVAS = int(os.getenv("GEMINI_MAX_TENTATIVAS", "6"))
+
+    # Resposta em streaming, lida e validada conforme chega: uma correção fora
+    # do formato é interrompida e pedida de novo (até IA_TENTATIVAS_RESPOSTA)
+    IA_STREAMING = os.getenv("IA_STREAMING", "1") == "1"
+    IA_TENTATIVAS_RESPOSTA = int(os.getenv("IA_TENTATIVAS_RESPOSTA", "2"))
+    # Competências ausentes ou fora da escala são pedidas de novo sozinhas, em
+    # vez de repetir a correção inteira
+    IA_RECORRECAO_PARCIAL = os.getenv("IA_RECORRECAO_PARCIAL", "1") == "1"
+    IA_TENTATIVAS_RECORRECAO = int(os.getenv("IA_TENTATIVAS_RECORRECAO", "2"))
+
+    # Prompt mestre registrado como contexto em cache no Gemini (cada redação
+    # envia só a imagem e a referência ao contexto). Desligado por padrão: o
+    # prompt.txt padrão fica abaixo do mínimo de tokens do cache explícito
+    CONTEXTO_CACHE_ATIVO = os.getenv("CONTEXTO_CACHE_ATIVO", "0") == "1"
+    CONTEXTO_TTL_MINUTOS = int(os.getenv("CONTEXTO_TTL_MINUTOS", "60"))
+    CONTEXTO_REGISTRO_PATH = os.path.join(
+        BASE_DIR,
+        os.getenv("CONTEXTO_REGISTRO_FILE", os.path.join("cache", "contexto.json")),
+    )
+
+    # Batch API do Gemini (correção em lote sem resposta imediata)
+    GEMINI_API_ENDPOINT = os.getenv(
+        "GEMINI_API_ENDPOINT", "https://generativelanguage.googleapis.com"
+    )
+    BATCH_DIR = os.path.join(
+        BASE_DIR, os.getenv("BATCH_DIR", os.path.join("cache", "batch"))
+    )
+    BATCH_INTERVALO_CONSULTA = int(os.getenv("BATCH_INTERVALO_CONSULTA", "60"))
+
+    # Pré-processamento das fotos antes do envio à IA
+    IMG_PREPROCESSAR = os.getenv("IMG_PREPROCESSAR", "1") == "1"
+    IMG_MAX_LADO = int(os.getenv("IMG_MAX_LADO", "2048"))
+    IMG_ESCALA_CINZA = os.getenv("IMG_ESCALA_CINZA", "1") == "1"
+    IMG_FORMATO = os.getenv("IMG_FORMATO", "JPEG")
+    IMG_QUALIDADE = int(os.getenv("IMG_QUALIDADE", "85"))
+
+    # Cache persistente de correções (evita pagar de novo pela mesma imagem)
+    CACHE_CORRECOES_ATIVO = os.getenv("CACHE_CORRECOES_ATIVO", "1") == "1"
+    CACHE_DB_PATH = os.path.join(
+        BASE_DIR, os.getenv("CACHE_DB_FILE", os.path.join("cache", "correcoes.db"))
+    )
+    CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "200"))
+    CACHE_MAX_DIAS = int(os.getenv("CACHE_MAX_DIAS", "30"))
+
     # Configurações do Google Drive (Correção em Lote)
     DRIVE_FOLDER_INPUT_ID = os.getenv(
         "DRIVE_FOLDER_INPUT_ID", "1c_8ybbo6HAhMxlOeNKX71PPF8TfySKx-"
@@ -43,7 +95,72 @@ class Config:
         "DRIVE_FOLDER_OUTPUT_ID", "16xRIPkBY8gRp9vNzxgH1Ex4GhTnkzbed"
     )
 
+    # Endpoint alternativo da API do Drive, sem autenticação
+    # (ex.: servidor fake local em http://127.0.0.1:8765/ para testes)
+    DRIVE_API_ENDPOINT = os.getenv("DRIVE_API_ENDPOINT", "")
+
+    # Cópia local do documento de discovery da API do Drive (montar o cliente
+    # não depende da rede) e antecedência, em segundos, com que o token de
+    # acesso é renovado em segundo plano antes de expirar
+    DRIVE_DISCOVERY_PATH = os.path.join(
+        BASE_DIR,
+        os.getenv(
+            "DRIVE_DISCOVERY_FILE", os.path.join("cache", "drive_v3_discovery.json")
+        ),
+    )
+    DRIVE_TOKEN_MARGEM_SEGUNDOS = int(os.getenv("DRIVE_TOKEN_MARGEM_SEGUNDOS", "300"))
+
+    # Máximo de transferências simultâneas com o Drive (conexões no pool)
+    DRIVE_MAX_CONEXOES = int(os.getenv("DRIVE_MAX_CONEXOES", "8"))
+
+    # Downloads e uploads grandes vão em pedaços deste tamanho (arredondado
+    # para um múltiplo de 256 KB); um pedaço que falha é repetido até
+    # DRIVE_TENTATIVAS vezes, continuando do último byte confirmado
+    DRIVE_PEDACO_BYTES = int(os.getenv("DRIVE_PEDACO_KB", "1024")) * 1024
+    DRIVE_TENTATIVAS = int(os.getenv("DRIVE_TENTATIVAS", "5"))
+
+    # Concorrência do processamento em lote
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+    BATCH_TAMANHO_FILA = int(os.getenv("BATCH_TAMANHO_FILA", "8"))
+    # Processos que geram os relatórios .docx nos lotes (0 = um por núcleo;
+    # 1 = no próprio processo)
+    DOCX_PROCESSOS = int(os.getenv("DOCX_PROCESSOS", "0"))
+
+    # Tempo de cada etapa por redação (download, IA, relatório...), gravado em
+    # JSON lines; com METRICAS_PORTA, também exposto no formato do Prometheus
+    METRICAS_ATIVO = os.getenv("METRICAS_ATIVO", "1") == "1"
+    METRICAS_JSONL_PATH = os.path.join(
+        BASE_DIR,
+        os.getenv("METRICAS_JSONL_FILE", os.path.join("cache", "metricas.jsonl")),
+    )
+    METRICAS_PORTA = int(os.getenv("METRICAS_PORTA", "0"))
 
-# Criação dos diretórios necessários se não existirem
-os.makedirs(Config.TMP_DIR, exist_ok=True)
-os.makedirs(Config.SECRETS_DIR, exist_ok=True)
+    # Redações com várias fotos: "maria_p1.jpg" e "maria_p2.jpg" (ou as linhas
+    # do manifesto CSV, colunas arquivo e redacao) viram uma única correção
+    AGRUPAR_PAGINAS = os.getenv("AGRUPAR_PAGINAS", "1") == "1"
+    MANIFESTO_PAGINAS_PATH = (
+        os.path.join(BASE_DIR, os.environ["MANIFESTO_PAGINAS_FILE"])
+        if os.getenv("MANIFESTO_PAGINAS_FILE")
+        else ""
+    )
+
+    # Registro local do que já foi corrigido no lote do Drive (processamento
+    # incremental: só imagens novas ou alteradas são reenviadas à IA)
+    LEDGER_ATIVO = os.getenv("LEDGER_ATIVO", "1") == "1"
+    LEDGER_DB_PATH = os.path.join(
+        BASE_DIR, os.getenv("LEDGER_DB_FILE", os.path.join("cache", "lote_drive.db"))
+    )
+
+    # Fila persistente de correções, consumida pelo trabalhador_fila.py
+    FILA_DB_PATH = os.path.join(
+        BASE_DIR, os.getenv("FILA_DB_FILE", os.path.join("cache", "fila.db"))
+    )
+    # Prazo da reserva de uma tarefa: se o trabalhador parar de renová-lo
+    # (processo encerrado), a tarefa volta para a fila
+    FILA_LEASE_SEGUNDOS = int(os.getenv("FILA_LEASE_SEGUNDOS", "300"))
+    FILA_MAX_TENTATIVAS = int(os.getenv("FILA_MAX_TENTATIVAS", "3"))
+    # Tarefas reservadas por trabalhador ao mesmo tempo (em qualquer etapa): o
+    # restante fica na fila, livre para os outros trabalhadores
+    FILA_TAREFAS_POR_TRABALHADOR = int(os.getenv("FILA_TAREFAS_POR_TRABALHADOR", "4"))
+    # Intervalo entre consultas à fila (trabalhador ocioso e acompanhamento)
+    FILA_INTERVALO_CONSULTA = float(os.getenv("FILA_INTERVALO_CONSULTA", "2"))
@@ -0,0 +1,100 @@
+import importlib.util
+import io
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Os serviços da aplicação ficam em src/ (mesmo PYTHONPATH usado pelo run.sh) e
+# os servidores fake do Drive e do Gemini, em benchmarks/. src/ vem antes da
+# raiz, onde app.py e config.py antigos têm os mesmos nomes dos pacotes.
+for pasta in ("benchmarks", "src"):
+    caminho = os.path.join(RAIZ, pasta)
+    if caminho in sys.path:
+        sys.path.remove(caminho)
+    sys.path.insert(0, caminho)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """
+    Config isolada: caches, registro, fila e manifestos numa pasta temporária,
+    relatórios gerados no próprio processo e sem limites de cota.
+    """
+    from config import Config
+
+    valores = {
+        "CACHE_DB_PATH": str(tmp_path / "correcoes.db"),
+        "LEDGER_DB_PATH": str(tmp_path / "lote_drive.db"),
+        "FILA_DB_PATH": str(tmp_path / "fila.db"),
+        "BATCH_DIR": str(tmp_path / "batch"),
+        "CONTEXTO_REGISTRO_PATH": str(tmp_path / "contexto.json"),
+        "CONTEXTO_CACHE_ATIVO": False,
+        "METRICAS_ATIVO": False,
+        "METRICAS_PORTA": 0,
+        "DOCX_PROCESSOS": 1,
+        "GEMINI_RPM": 10**9,
+        "GEMINI_TPM": 10**9,
+        "BATCH_INTERVALO_CONSULTA": 0,
+        "DRIVE_FOLDER_INPUT_ID": "entrada",
+        "DRIVE_FOLDER_OUTPUT_ID": "saida",
+    }
+    for nome, valor in valores.items():
+        monkeypatch.setattr(Config, nome, valor)
+    return Config
+
+
+def carregar_script(nome):
+    """Carrega um script da raiz do projeto (ex.: corrigir_em_lote.py) como módulo."""
+    spec = importlib.util.spec_from_file_location(
+        nome, os.path.join(RAIZ, f"{nome}.py")
+    )
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture(scope="session")
+def corrigir_em_lote():
+    return carregar_script("corrigir_em_lote")
+
+
+@pytest.fixture(scope="session")
+def trabalhador_fila():
+    return carregar_script("trabalhador_fila")
+
+
+@pytest.fixture(scope="session")
+def foto():
+    """Foto pequena de uma redação (JPEG válido, para o pré-processamento)."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 96), "white").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def drive(config, monkeypatch):
+    """
+    Drive fake local, usado como endpoint do Drive (sem autenticação). O
+    sorteio das quedas tem semente fixa, para os testes serem reproduzíveis.
+    """
+    from fake_drive import FakeDrive
+
+    with FakeDrive(semente=0) as fake:
+        monkeypatch.setattr(config, "DRIVE_API_ENDPOINT", fake.url)
+        yield fake
+
+
+@pytest.fixture
+def gemini(config, monkeypatch):
+    """Batch API fake local, usada como endpoint do Gemini."""
+    from fake_gemini import FakeGemini
+
+    with FakeGemini() as fake:
+        monkeypatch.setattr(config, "GEMINI_API_ENDPOINT", fake.url)
+        monkeypatch.setenv("GEMINI_API_KEY", "teste")
+        yield fake
@@ -0,0 +1,146 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import drive_service
+from app.services.async_drive_service import AsyncGoogleDriveService, DriveSincrono
+from app.services.drive_service import DOCX_MIMETYPE, MULTIPLO_PEDACO
+
+
+@pytest.fixture
+def pedaco(config, monkeypatch):
+    """Pedaços do menor tamanho aceito, para as transferências terem vários."""
+    monkeypatch.setattr(config, "DRIVE_PEDACO_BYTES", MULTIPLO_PEDACO)
+    return MULTIPLO_PEDACO
+
+
+@pytest.fixture
+def ponte(drive):
+    servico = DriveSincrono(AsyncGoogleDriveService(max_conexoes=2))
+    yield servico
+    servico.fechar()
+
+
+def test_download_e_upload_em_pedacos(drive, pedaco):
+    conteudo = os.urandom(pedaco * 2 + 1000)
+    file_id = drive.adicionar_arquivo("entrada", "grande.jpg", conteudo)
+    relatorio = os.urandom(pedaco * 2 + 500)
+    progresso_download, progresso_upload = [], []
+
+    async def transferir():
+        servico = AsyncGoogleDriveService(max_conexoes=2)
+        try:
+            baixado = await servico.download_file(
+                file_id, lambda feito, total: progresso_download.append(feito)
+            )
+            novo_id = await servico.upload_docx(
+                io.BytesIO(relatorio),
+                "relatorio.docx",
+                "saida",
+                lambda feito, total: progresso_upload.append(feito),
+            )
+            return baixado, novo_id
+        finally:
+            servico.fechar()
+
+    baixado, novo_id = asyncio.run(transferir())
+
+    assert baixado == conteudo
+    assert progresso_download == [pedaco, pedaco * 2, len(conteudo)]
+
+    enviado = drive.arquivos[novo_id]
+    assert enviado["conteudo"] == relatorio
+    assert enviado["name"] == "relatorio.docx"
+    assert enviado["parents"] == ["saida"]
+    assert enviado["mimeType"] == DOCX_MIMETYPE
+    assert progresso_upload[-1] == len(relatorio)
+    assert len(progresso_upload) > 1
+
+
+def test_pool_limita_as_requisicoes_simultaneas(drive):
+    drive.latencia = 0.05
+    conteudos = {
+        drive.adicionar_arquivo("entrada", f"foto_{i}.jpg", os.urandom(100)): i
+        for i in range(8)
+    }
+
+    async def baixar_todos():
+        servico = AsyncGoogleDriveService(max_conexoes=3)
+        try:
+            return await asyncio.gather(
+                *(servico.download_file(file_id) for file_id in conteudos)
+            )
+        finally:
+            servico.fechar()
+
+    baixados = asyncio.run(baixar_todos())
+
+    assert baixados == [drive.arquivos[f]["conteudo"] for f in conteudos]
+    # Transferências em paralelo, mas nunca acima do tamanho do pool, e as
+    # conexões são reaproveitadas (keep-alive) em vez de abertas a cada pedido
+    assert drive.pico_simultaneas == 3
+    assert drive.conexoes <= 3
+
+
+def test_ponte_sincrona_compartilha_o_pool_entre_threads(drive, ponte):
+    drive.latencia = 0.02
+    ids = [
+        drive.adicionar_arquivo("entrada", f"foto_{i}.jpg", os.urandom(100))
+        for i in range(6)
+    ]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        baixados = list(executor.map(ponte.download_file, ids))
+        novos = list(
+            executor.map(
+                lambda i: ponte.upload_docx(
+                    io.BytesIO(baixados[i]), f"relatorio_{i}.docx", "saida"
+                ),
+                range(len(ids)),
+            )
+        )
+
+    assert baixados == [drive.arquivos[f]["conteudo"] for f in ids]
+    assert [drive.arquivos[n]["conteudo"] for n in novos] == baixados
+    assert drive.pico_simultaneas <= 2
+
+
+def test_falhas_de_transferencia_retornam_none(drive, ponte, monkeypatch):
+    monkeypatch.setattr(drive_service, "ESPERA_TENTATIVA", 0.001)
+    assert ponte.download_file("inexistente") is None
+
+    # Servidor fora do ar: as novas tentativas se esgotam e o erro é logado
+    drive.parar()
+    assert ponte.upload_docx(io.BytesIO(b"x"), "relatorio.docx", "saida") is None
+
+
+def test_interromper_a_listagem_encerra_o_gerador_assincrono(
+    drive, ponte, monkeypatch
+):
+    for i in range(10):
+        drive.adicionar_arquivo("entrada", f"foto_{i}.jpg", b"\xff\xd8")
+    geradores = []
+    iterar = ponte.servico.iterar_imagens_pendentes
+
+    def registrando(*args, **kwargs):
+        geradores.append(iterar(*args, **kwargs))
+        return geradores[-1]
+
+    monkeypatch.setattr(ponte.servico, "iterar_imagens_pendentes", registrando)
+
+    listagem = ponte.iterar_imagens_pendentes("entrada", tamanho_pagina=2)
+    primeiro = next(listagem)
+    listagem.close()
+
+    assert primeiro["name"].startswith("foto_")
+    # aclose() rodou no event loop da ponte: o gerador terminou e as demais
+    # páginas não são pedidas
+    assert geradores[0].ag_frame is None
+
+    # A ponte continua utilizável depois da interrupção; da primeira listagem,
+    # só a página entregue e a seguinte (já pedida) chegaram ao servidor
+    assert len(ponte.list_pending_images("entrada")) == 10
+    assert drive.requisicoes <= 3
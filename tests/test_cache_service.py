@@ -0,0 +1,120 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import cache_service
+from app.services.cache_service import CacheCorrecoes, gerar_chave
+
+DIA = 24 * 3600
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado pelo teste (segundos desde o início)."""
+    agora = SimpleNamespace(valor=1000.0)
+    monkeypatch.setattr(
+        cache_service, "time", SimpleNamespace(time=lambda: agora.valor)
+    )
+    return agora
+
+
+def correcao(nota, tamanho=0):
+    return {"nota": nota, "comentario": "x" * tamanho}
+
+
+def tamanho(dados):
+    return len(json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+
+
+@pytest.fixture
+def cache(tmp_path, relogio):
+    return CacheCorrecoes(
+        str(tmp_path / "cache" / "correcoes.db"),
+        max_bytes=3 * tamanho(correcao(0, 100)),
+        max_idade_segundos=30 * DIA,
+    )
+
+
+def test_chave_depende_de_tudo_que_muda_a_resposta():
+    base = (b"imagem", "prompt", "gemini-2.5-flash", {"temperature": 0, "top_p": 1})
+    chave = gerar_chave(*base)
+
+    # A ordem dos parâmetros de geração não importa
+    assert gerar_chave(*base[:3], {"top_p": 1, "temperature": 0}) == chave
+    for alterada in (
+        (b"outra", *base[1:]),
+        (base[0], "outro prompt", *base[2:]),
+        (*base[:2], "gemini-2.5-pro", base[3]),
+        (*base[:3], {"temperature": 1, "top_p": 1}),
+    ):
+        assert gerar_chave(*alterada) != chave
+
+
+def test_devolve_a_correcao_salva(cache):
+    cache.salvar("a", correcao(900, 10))
+
+    assert cache.obter("a") == correcao(900, 10)
+    assert cache.obter("inexistente") is None
+
+
+def test_entrada_expira_depois_da_idade_maxima(cache, relogio):
+    cache.salvar("a", correcao(900))
+
+    relogio.valor += 30 * DIA
+    assert cache.obter("a") == correcao(900)
+
+    relogio.valor += 1
+    assert cache.obter("a") is None
+    # A entrada expirada sai do banco, não só da resposta
+    relogio.valor -= 1
+    assert cache.obter("a") is None
+
+
+def test_expiradas_sao_removidas_ao_salvar(cache, relogio):
+    cache.salvar("antiga", correcao(800))
+    relogio.valor += 31 * DIA
+    cache.salvar("nova", correcao(900))
+
+    relogio.valor -= 31 * DIA
+    assert cache.obter("antiga") is None
+    assert cache.obter("nova") == correcao(900)
+
+
+def test_excesso_de_tamanho_remove_as_menos_acessadas(cache, relogio):
+    for i, chave in enumerate(("a", "b", "c")):
+        relogio.valor += 1
+        cache.salvar(chave, correcao(i, 100))
+
+    # "a" é a mais antiga, mas foi lida agora: a menos acessada passa a ser "b"
+    relogio.valor += 1
+    assert cache.obter("a") is not None
+    relogio.valor += 1
+    cache.salvar("d", correcao(3, 100))
+
+    assert cache.obter("b") is None
+    assert [cache.obter(c)["nota"] for c in ("a", "c", "d")] == [0, 2, 3]
+
+
+def test_regravar_a_mesma_chave_nao_ocupa_espaco_em_dobro(cache, relogio):
+    for i in range(5):
+        relogio.valor += 1
+        cache.salvar("a", correcao(i, 100))
+    relogio.valor += 1
+    cache.salvar("b", correcao(9, 100))
+
+    assert cache.obter("a") == correcao(4, 100)
+    assert cache.obter("b") == correcao(9, 100)
+
+
+def test_limpar_remove_tudo(cache):
+    cache.salvar("a", correcao(900))
+    cache.limpar()
+
+    assert cache.obter("a") is None
+
+
+def test_cache_desativado(config, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_CORRECOES_ATIVO", False)
+
+    assert cache_service.obter_cache() is None
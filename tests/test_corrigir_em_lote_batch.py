@@ -0,0 +1,184 @@
+import json
+import os
+
+import pytest
+from fake_gemini import resposta_gemini
+
+from app.services import ai_service, report_service
+from app.services.async_drive_service import AsyncGoogleDriveService, DriveSincrono
+from app.services.gemini_batch_service import ManifestoBatch
+from app.services.ledger_service import (
+    STATUS_CONCLUIDO,
+    STATUS_FALHA,
+    obter_ledger,
+    versao_prompt,
+)
+
+
+def test_excecao_no_upload_registra_a_falha_do_item(
+    corrigir_em_lote, drive, gemini, foto, monkeypatch
+):
+    falho = drive.adicionar_arquivo("entrada", "aluno_a.jpg", foto)
+    certo = drive.adicionar_arquivo("entrada", "aluno_b.jpg", foto)
+    nome_relatorio = report_service.nome_relatorio
+
+    def recusar_um(dados, identificador, *args, **kwargs):
+        if identificador == falho:
+            raise RuntimeError("nome recusado")
+        return nome_relatorio(dados, identificador, *args, **kwargs)
+
+    monkeypatch.setattr(report_service, "nome_relatorio", recusar_um)
+    corrigir_em_lote.main_batch()
+
+    ledger = obter_ledger()
+    assert ledger.obter(falho)["status"] == STATUS_FALHA
+    assert ledger.obter(falho)["erro"] == "nome recusado"
+    assert ledger.obter(certo)["status"] == STATUS_CONCLUIDO
+    assert len(drive.arquivos_na_pasta("saida")) == 1
+
+
+def test_falha_no_download_fica_registrada(
+    corrigir_em_lote, drive, gemini, foto, monkeypatch
+):
+    falho = drive.adicionar_arquivo("entrada", "aluno_a.jpg", foto)
+    certo = drive.adicionar_arquivo("entrada", "aluno_b.jpg", foto)
+    download_file = DriveSincrono.download_file
+
+    def perder_um(self, file_id, *args, **kwargs):
+        if file_id == falho:
+            return None
+        return download_file(self, file_id, *args, **kwargs)
+
+    monkeypatch.setattr(DriveSincrono, "download_file", perder_um)
+    corrigir_em_lote.main_batch()
+
+    ledger = obter_ledger()
+    assert ledger.obter(falho)["status"] == STATUS_FALHA
+    assert ledger.obter(certo)["status"] == STATUS_CONCLUIDO
+    # Só a redação baixada foi enviada ao batch
+    (job,) = gemini.jobs.values()
+    assert gemini.arquivos[job["entrada"]].count(b"\n") == 1
+
+
+def caminho_manifesto(config):
+    return os.path.join(config.BATCH_DIR, f"{config.DRIVE_FOLDER_INPUT_ID}.json")
+
+
+def test_lote_completo(corrigir_em_lote, config, drive, gemini, foto):
+    ids = [drive.adicionar_arquivo("entrada", f"aluno_{n}.jpg", foto) for n in "abc"]
+    corrigir_em_lote.main_batch()
+
+    # Um arquivo de entrada e um job, consultado até terminar
+    (job,) = gemini.jobs.values()
+    assert job["consultas"] == gemini.consultas_ate_concluir
+    linhas = gemini.arquivos[job["entrada"]].decode().splitlines()
+    assert sorted(json.loads(linha)["key"] for linha in linhas) == sorted(ids)
+
+    relatorios = drive.arquivos_na_pasta("saida")
+    assert len(relatorios) == 3
+    assert all(r["conteudo"].startswith(b"PK") for r in relatorios)
+    ledger = obter_ledger()
+    assert all(ledger.obter(i)["status"] == STATUS_CONCLUIDO for i in ids)
+    assert not os.path.exists(caminho_manifesto(config))
+
+    # Nada novo na pasta: a próxima execução não cria outro job
+    corrigir_em_lote.main_batch()
+    assert len(gemini.jobs) == 1
+
+
+def test_retoma_pelo_manifesto_salvo(corrigir_em_lote, config, drive, gemini, foto):
+    ids = [drive.adicionar_arquivo("entrada", f"aluno_{n}.jpg", foto) for n in "abc"]
+
+    # Sem aguardar: envia o arquivo, cria o job e para na primeira consulta
+    corrigir_em_lote.main_batch(aguardar=False)
+    manifesto = ManifestoBatch.carregar(caminho_manifesto(config))
+    assert manifesto.dados["job"] in gemini.jobs
+    assert manifesto.dados["estado"] == "BATCH_STATE_PENDING"
+    assert sorted(manifesto.itens) == sorted(ids)
+    assert not drive.arquivos_na_pasta("saida")
+
+    # Um item concluído antes da interrupção não é enviado de novo
+    manifesto.atualizar_item(ids[0], status="concluido", output_file_id="antigo")
+
+    arquivos_enviados = len(gemini.arquivos)
+    corrigir_em_lote.main_batch(aguardar=False)
+    assert len(gemini.jobs) == 1
+    # Só o arquivo de resultados foi criado; a entrada não foi reenviada
+    assert len(gemini.arquivos) == arquivos_enviados + 1
+    assert len(drive.arquivos_na_pasta("saida")) == 2
+    ledger = obter_ledger()
+    assert ledger.obter(ids[0]) is None
+    assert all(ledger.obter(i)["status"] == STATUS_CONCLUIDO for i in ids[1:])
+    assert not os.path.exists(caminho_manifesto(config))
+
+
+def test_retoma_manifesto_sem_job(corrigir_em_lote, config, drive, gemini, foto):
+    drive.adicionar_arquivo("entrada", "aluno_a.jpg", foto)
+    drive_service = DriveSincrono(AsyncGoogleDriveService())
+    try:
+        prompt = ai_service.carregar_prompt()
+        corrigir_em_lote.preparar_batch(
+            drive_service,
+            prompt,
+            config.MODEL_NAME,
+            versao_prompt(prompt),
+            caminho_manifesto(config),
+        )
+    finally:
+        drive_service.fechar()
+    assert not gemini.arquivos
+
+    # Interrompido logo depois do preparo: a execução seguinte envia e conclui
+    corrigir_em_lote.main_batch()
+    assert len(gemini.jobs) == 1
+    assert len(drive.arquivos_na_pasta("saida")) == 1
+
+
+def test_job_com_falha_volta_a_preparar(corrigir_em_lote, config, drive, gemini, foto):
+    redacao = drive.adicionar_arquivo("entrada", "aluno_a.jpg", foto)
+    gemini.estado_final = "BATCH_STATE_FAILED"
+    corrigir_em_lote.main_batch()
+
+    assert not drive.arquivos_na_pasta("saida")
+    assert not os.path.exists(caminho_manifesto(config))
+    assert obter_ledger().obter(redacao) is None
+
+    gemini.estado_final = "BATCH_STATE_SUCCEEDED"
+    corrigir_em_lote.main_batch()
+    assert len(gemini.jobs) == 2
+    assert len(drive.arquivos_na_pasta("saida")) == 1
+
+
+def texto_invalido(requisicao):
+    return resposta_gemini("isto não é JSON")
+
+
+def nota_fora_da_escala(requisicao):
+    return resposta_gemini('{"nota_final": 1000}')
+
+
+def falhar(requisicao):
+    raise RuntimeError("modelo indisponível")
+
+
+@pytest.mark.parametrize(
+    "responder, erro",
+    [
+        (texto_invalido, "Resposta inválida"),
+        (nota_fora_da_escala, "Resposta inválida"),
+        (falhar, "modelo indisponível"),
+    ],
+    ids=["json_invalido", "nota_fora_da_escala", "erro_na_linha"],
+)
+def test_resultados_com_erro_ficam_registrados(
+    corrigir_em_lote, drive, gemini, foto, responder, erro
+):
+    ids = [drive.adicionar_arquivo("entrada", f"aluno_{n}.jpg", foto) for n in "ab"]
+    gemini.responder = responder
+    corrigir_em_lote.main_batch()
+
+    assert not drive.arquivos_na_pasta("saida")
+    ledger = obter_ledger()
+    for redacao in ids:
+        assert ledger.obter(redacao)["status"] == STATUS_FALHA
+        assert erro in ledger.obter(redacao)["erro"]
@@ -0,0 +1,136 @@
+import io
+import os
+
+import googleapiclient.http
+import pytest
+from googleapiclient.errors import HttpError
+
+from app.services import drive_service
+from app.services.async_drive_service import AsyncGoogleDriveService, DriveSincrono
+from app.services.drive_service import MULTIPLO_PEDACO, GoogleDriveService
+from app.services.pipeline_service import Estagio, executar_pipeline
+
+
+@pytest.fixture(params=["sincrono", "assincrono"])
+def servico(request, drive, monkeypatch):
+    """
+    Os dois clientes do Drive, apontados para o fake, com esperas curtas. Uma
+    conexão que cai sem resposta vira erro em meio segundo (timeout das
+    conexões), em vez do minuto padrão.
+    """
+    monkeypatch.setattr(drive_service, "ESPERA_TENTATIVA", 0.001)
+    monkeypatch.setattr(googleapiclient.http, "DEFAULT_HTTP_TIMEOUT_SEC", 0.5)
+    if request.param == "sincrono":
+        yield GoogleDriveService()
+        return
+    servico = DriveSincrono(AsyncGoogleDriveService(max_conexoes=2))
+    yield servico
+    servico.fechar()
+
+
+@pytest.fixture
+def pasta(drive):
+    for i in range(5):
+        drive.adicionar_arquivo("entrada", f"pagina_{i}.jpg", bytes([i]) * 10)
+    return "entrada"
+
+
+def nomes(arquivos):
+    return sorted(arquivo["name"] for arquivo in arquivos)
+
+
+def test_lista_todas_as_paginas(servico, pasta):
+    arquivos = servico.iterar_imagens_pendentes(pasta, tamanho_pagina=2)
+    assert nomes(arquivos) == [f"pagina_{i}.jpg" for i in range(5)]
+
+
+def test_repete_pagina_com_falha_transitoria(servico, drive, pasta):
+    # A segunda página falha duas vezes antes de responder
+    drive.falhas_listagem = [None, 503, 500]
+
+    arquivos = list(servico.iterar_imagens_pendentes(pasta, tamanho_pagina=2))
+
+    assert nomes(arquivos) == [f"pagina_{i}.jpg" for i in range(5)]
+    assert drive.falhas_listagem == []
+
+
+def test_falha_persistente_interrompe_a_listagem_com_erro(
+    servico, drive, pasta, config
+):
+    drive.falhas_listagem = [None] + [503] * (config.DRIVE_TENTATIVAS + 1)
+    entregues = []
+
+    with pytest.raises(HttpError):
+        for arquivo in servico.iterar_imagens_pendentes(pasta, tamanho_pagina=2):
+            entregues.append(arquivo)
+
+    # A primeira página chegou a ser entregue; o restante não virou "fim"
+    assert len(entregues) == 2
+
+
+def test_erro_definitivo_nao_e_repetido(servico, drive, pasta):
+    drive.falhas_listagem = [None, 404, None]
+
+    with pytest.raises(HttpError):
+        list(servico.iterar_imagens_pendentes(pasta, tamanho_pagina=2))
+
+    assert drive.falhas_listagem == [None]
+
+
+def test_pipeline_propaga_erro_da_entrada():
+    def itens():
+        yield 1
+        yield 2
+        raise RuntimeError("listagem interrompida")
+
+    processados = []
+    with pytest.raises(RuntimeError, match="listagem interrompida"):
+        executar_pipeline(
+            itens(), [Estagio("registrar", processados.append, 1)], tamanho_fila=1
+        )
+
+    # Os itens recebidos antes do erro terminam de passar pelos estágios
+    assert processados == [1, 2]
+
+
+@pytest.fixture
+def pedaco(config, monkeypatch):
+    """Pedaços do menor tamanho aceito e tentativas de sobra para as quedas."""
+    monkeypatch.setattr(config, "DRIVE_PEDACO_BYTES", MULTIPLO_PEDACO)
+    monkeypatch.setattr(config, "DRIVE_TENTATIVAS", 20)
+    return MULTIPLO_PEDACO
+
+
+def test_download_retoma_apos_quedas(servico, drive, pedaco):
+    conteudo = os.urandom(pedaco * 3 + 100)
+    file_id = drive.adicionar_arquivo("entrada", "grande.jpg", conteudo)
+    drive.quedas = 0.5
+
+    assert servico.download_file(file_id) == conteudo
+    assert drive.quedas_simuladas > 0
+
+
+def test_upload_com_quedas_cria_um_unico_arquivo(servico, drive, pedaco):
+    relatorio = os.urandom(pedaco * 3 + 100)
+    drive.quedas = 0.5
+
+    novo_id = servico.upload_docx(io.BytesIO(relatorio), "relatorio.docx", "saida")
+
+    assert drive.quedas_simuladas > 0
+    assert [a["id"] for a in drive.arquivos_na_pasta("saida")] == [novo_id]
+    assert drive.arquivos[novo_id]["conteudo"] == relatorio
+
+
+def test_resposta_perdida_e_recuperada_pela_consulta_da_sessao(
+    servico, drive, pedaco
+):
+    relatorio = os.urandom(pedaco * 2 + 100)
+    # Todo pedaço é gravado e a resposta se perde, inclusive a do último, que
+    # cria o arquivo: o cliente só sabe do resultado consultando a sessão
+    drive.respostas_perdidas = 1.0
+
+    novo_id = servico.upload_docx(io.BytesIO(relatorio), "relatorio.docx", "saida")
+
+    assert drive.quedas_simuladas >= 3
+    assert [a["id"] for a in drive.arquivos_na_pasta("saida")] == [novo_id]
+    assert drive.arquivos[novo_id]["conteudo"] == relatorio
@@ -0,0 +1,101 @@
+import pytest
+
+from app.services.ledger_service import (
+    STATUS_CONCLUIDO,
+    STATUS_FALHA,
+    LedgerProcessamento,
+    versao_prompt,
+)
+
+MODELO = "gemini-2.5-flash"
+VERSAO = versao_prompt("prompt mestre")
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return LedgerProcessamento(str(tmp_path / "cache" / "lote_drive.db"))
+
+
+def arquivo(file_id, md5="md5-original"):
+    return {"id": file_id, "name": f"{file_id}.jpg", "md5Checksum": md5}
+
+
+def pendentes(ledger, arquivos, modelo=MODELO, versao=VERSAO):
+    return [a["id"] for a in ledger.filtrar_pendentes(arquivos, modelo, versao)]
+
+
+def test_versao_do_prompt_segue_o_conteudo():
+    assert versao_prompt("prompt mestre") == VERSAO
+    assert versao_prompt("prompt mestre revisado") != VERSAO
+    assert len(VERSAO) == 12
+
+
+def test_ignora_apenas_os_concluidos_sem_mudanca(ledger):
+    ledger.registrar_conclusao(arquivo("a"), MODELO, VERSAO, "relatorio-a")
+    ledger.registrar_conclusao(arquivo("b"), MODELO, VERSAO, "relatorio-b")
+
+    assert pendentes(ledger, [arquivo("a"), arquivo("b"), arquivo("novo")]) == [
+        "novo"
+    ]
+
+
+@pytest.mark.parametrize(
+    "alterado, modelo, versao",
+    [
+        (arquivo("a", md5="md5-substituido"), MODELO, VERSAO),
+        (arquivo("a"), "gemini-2.5-pro", VERSAO),
+        (arquivo("a"), MODELO, versao_prompt("prompt mestre revisado")),
+    ],
+    ids=["imagem", "modelo", "prompt"],
+)
+def test_mudanca_torna_o_arquivo_pendente(ledger, alterado, modelo, versao):
+    ledger.registrar_conclusao(arquivo("a"), MODELO, VERSAO, "relatorio-a")
+
+    assert pendentes(ledger, [alterado], modelo, versao) == ["a"]
+
+
+def test_falha_e_retomada_na_proxima_execucao(ledger):
+    ledger.registrar_falha(arquivo("a"), MODELO, VERSAO, "Falha no upload")
+    assert pendentes(ledger, [arquivo("a")]) == ["a"]
+
+    ledger.registrar_conclusao(arquivo("a"), MODELO, VERSAO, "relatorio-a")
+    assert pendentes(ledger, [arquivo("a")]) == []
+
+    registro = ledger.obter("a")
+    assert registro["status"] == STATUS_CONCLUIDO
+    assert registro["output_file_id"] == "relatorio-a"
+    assert registro["erro"] is None
+
+
+def test_falha_depois_de_concluido_volta_a_pendente(ledger):
+    ledger.registrar_conclusao(arquivo("a"), MODELO, VERSAO, "relatorio-a")
+    ledger.registrar_falha(arquivo("a"), MODELO, VERSAO, "Nota fora da escala")
+
+    assert pendentes(ledger, [arquivo("a")]) == ["a"]
+    registro = ledger.obter("a")
+    assert registro["status"] == STATUS_FALHA
+    assert registro["erro"] == "Nota fora da escala"
+    assert ledger.obter("nunca-processado") is None
+
+
+def test_registro_persiste_entre_execucoes(ledger):
+    ledger.registrar_conclusao(arquivo("a"), MODELO, VERSAO, "relatorio-a")
+
+    outra_execucao = LedgerProcessamento(ledger.caminho_db)
+
+    assert pendentes(outra_execucao, [arquivo("a"), arquivo("b")]) == ["b"]
+
+
+def test_filtro_e_preguicoso(ledger):
+    # A listagem do Drive é um gerador: os arquivos seguem adiante um a um,
+    # sem esperar a listagem inteira
+    entregues = []
+
+    def listagem():
+        for file_id in ("a", "b"):
+            entregues.append(file_id)
+            yield arquivo(file_id)
+
+    filtrados = ledger.filtrar_pendentes(listagem(), MODELO, VERSAO)
+    assert next(filtrados)["id"] == "a"
+    assert entregues == ["a"]
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.prompt_cache_service import (
+    GerenciadorContexto,
+    hash_prompt,
+    minimo_tokens_contexto,
+)
+
+
+class GerenciadorFake(GerenciadorContexto):
+    """Gerenciador sem chamadas ao Gemini: conta tokens e cria contextos fake."""
+
+    def __init__(self, caminho_registro, tokens):
+        super().__init__(caminho_registro, ttl_segundos=3600)
+        self.tokens = tokens
+        self.contagens = 0
+        self.criados = 0
+
+    def _contar_tokens(self, prompt, model_name):
+        self.contagens += 1
+        return self.tokens
+
+    def _criar(self, prompt, model_name):
+        self.criados += 1
+        return {
+            "modelo": model_name,
+            "hash_prompt": hash_prompt(prompt),
+            "nome": f"cachedContents/{self.criados}",
+            "expira_em": 10**12,
+        }
+
+
+@pytest.mark.parametrize(
+    "modelo, minimo",
+    [
+        ("gemini-1.5-pro", 32768),
+        ("models/gemini-2.0-flash", 4096),
+        ("gemini-2.5-flash-lite", 1024),
+        ("outro-modelo", 1024),
+    ],
+)
+def test_minimo_por_modelo(modelo, minimo):
+    assert minimo_tokens_contexto(modelo) == minimo
+
+
+def test_prompt_abaixo_do_minimo_nao_cria_contexto(tmp_path):
+    gerenciador = GerenciadorFake(str(tmp_path / "contexto.json"), tokens=1500)
+
+    for _ in range(3):
+        assert gerenciador.obter("prompt curto", "gemini-2.0-flash") is None
+    # Conferido uma vez só, sem nenhuma tentativa de criar o contexto
+    assert gerenciador.contagens == 1
+    assert gerenciador.criados == 0
+
+
+def test_prompt_grande_cria_e_reaproveita_contexto(tmp_path):
+    caminho = str(tmp_path / "contexto.json")
+    gerenciador = GerenciadorFake(caminho, tokens=5000)
+
+    assert gerenciador.obter("prompt longo", "gemini-2.0-flash") == "cachedContents/1"
+    assert gerenciador.obter("prompt longo", "gemini-2.0-flash") == "cachedContents/1"
+    assert gerenciador.criados == 1
+
+    # Outro processo reaproveita o contexto pelo registro em disco
+    outro = GerenciadorFake(caminho, tokens=5000)
+    assert outro.obter("prompt longo", "gemini-2.0-flash") == "cachedContents/1"
+    assert outro.contagens == outro.criados == 0
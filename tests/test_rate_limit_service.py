@@ -0,0 +1,249 @@
+import threading
+from contextlib import ExitStack
+
+import pytest
+
+from app.services import rate_limit_service
+from app.services.rate_limit_service import (
+    AgendadorIA,
+    LimitadorAdaptativo,
+    TokenBucket,
+)
+
+
+class Relogio:
+    """Relógio controlado pelo teste: esperar só avança o tempo."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.agora
+
+    perf_counter = monotonic
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.agora += segundos
+
+
+class ErroCota(Exception):
+    code = 429
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(rate_limit_service, "time", relogio)
+    return relogio
+
+
+# --- TokenBucket ---
+def test_balde_libera_a_taxa_configurada(relogio):
+    balde = TokenBucket(por_minuto=60)
+
+    for _ in range(3):
+        balde.consumir()
+
+    # Um segundo de cota (uma ficha) de saída, depois uma ficha por segundo
+    assert relogio.agora - 1000 == pytest.approx(2.0)
+
+
+def test_rajada_limitada_a_capacidade(relogio):
+    balde = TokenBucket(por_minuto=60, capacidade=5)
+    relogio.sleep(100)
+    relogio.esperas.clear()
+
+    for _ in range(5):
+        balde.consumir()
+    assert relogio.esperas == []
+
+    balde.consumir()
+    assert relogio.esperas == [pytest.approx(1.0)]
+
+
+def test_pedido_maior_que_o_balde_atrasa_os_seguintes(relogio):
+    balde = TokenBucket(por_minuto=600, capacidade=10)
+
+    balde.consumir(30)
+    assert relogio.esperas == []
+
+    # Saldo de -20 fichas a 10 por segundo: a próxima espera 2,1 s
+    balde.consumir(1)
+    assert sum(relogio.esperas) == pytest.approx(2.1)
+
+
+def test_ajustar_devolve_e_debita_fichas(relogio):
+    balde = TokenBucket(por_minuto=60, capacidade=5)
+    balde.consumir(5)
+
+    balde.ajustar(-3)
+    balde.consumir(3)
+    assert relogio.esperas == []
+
+    balde.ajustar(2)
+    balde.consumir(1)
+    assert sum(relogio.esperas) == pytest.approx(3.0)
+
+
+def test_pausa_vale_para_todos_os_consumidores(relogio):
+    balde = TokenBucket(por_minuto=60, capacidade=5)
+
+    balde.pausar(10)
+    balde.pausar(4)
+    balde.consumir()
+
+    # Pausas sobrepostas não se encurtam
+    assert sum(relogio.esperas) == pytest.approx(10.0)
+
+
+# --- LimitadorAdaptativo (AIMD) ---
+def ocupar(limitador, vagas):
+    pilha = ExitStack()
+    for _ in range(vagas):
+        pilha.enter_context(limitador.vaga())
+    return pilha
+
+
+def test_sobrecarga_corta_o_limite_pela_metade(relogio):
+    limitador = LimitadorAdaptativo(8, minimo=1, maximo=16, latencia_alvo=10)
+
+    limitador.registrar_sobrecarga()
+    assert limitador.limite == 4
+
+    # Falhas da mesma rajada (menos de 1 s) contam uma vez só
+    limitador.registrar_sobrecarga()
+    assert limitador.limite == 4
+
+    for _ in range(5):
+        relogio.sleep(1)
+        limitador.registrar_sobrecarga()
+    assert limitador.limite == 1
+
+
+def test_sucesso_com_o_limite_em_uso_aumenta_uma_vaga_por_rodada(relogio):
+    limitador = LimitadorAdaptativo(4, minimo=1, maximo=16, latencia_alvo=10)
+
+    with ocupar(limitador, 3):
+        limitador.registrar_sucesso(0.1)
+        assert limitador.limite == pytest.approx(4.25)
+
+        sucessos = 1
+        while int(limitador.limite) < 5:
+            limitador.registrar_sucesso(0.1)
+            sucessos += 1
+    # +1/limite a cada sucesso: cerca de uma vaga por rodada de chamadas
+    assert sucessos == 5
+
+
+def test_sucesso_com_folga_nao_aumenta(relogio):
+    limitador = LimitadorAdaptativo(4, minimo=1, maximo=16, latencia_alvo=10)
+
+    with ocupar(limitador, 1):
+        limitador.registrar_sucesso(0.1)
+
+    assert limitador.limite == 4
+
+
+def test_limite_respeita_o_maximo(relogio):
+    limitador = LimitadorAdaptativo(4, minimo=1, maximo=4, latencia_alvo=10)
+
+    with ocupar(limitador, 4):
+        limitador.registrar_sucesso(0.1)
+
+    assert limitador.limite == 4
+
+
+def test_resposta_lenta_reduz_dez_por_cento(relogio):
+    limitador = LimitadorAdaptativo(10, minimo=1, maximo=16, latencia_alvo=10)
+
+    limitador.registrar_sucesso(11)
+
+    assert limitador.limite == pytest.approx(9)
+
+
+def test_vaga_bloqueia_acima_do_limite():
+    limitador = LimitadorAdaptativo(2, minimo=1, maximo=4, latencia_alvo=10)
+    entrou = threading.Event()
+
+    def terceira():
+        with limitador.vaga():
+            entrou.set()
+
+    with ocupar(limitador, 2) as ocupadas:
+        thread = threading.Thread(target=terceira)
+        thread.start()
+        assert not entrou.wait(0.1)
+        ocupadas.close()
+        assert entrou.wait(5)
+    thread.join()
+    assert limitador.em_uso == 0
+
+
+# --- AgendadorIA ---
+def agendador(tpm=10**9, max_tentativas=5):
+    return AgendadorIA(
+        rpm=10**9,
+        tpm=tpm,
+        concorrencia_inicial=8,
+        concorrencia_maxima=16,
+        latencia_alvo=10,
+        max_tentativas=max_tentativas,
+    )
+
+
+def test_repete_apos_sobrecarga_e_reduz_a_concorrencia(relogio):
+    chamadas = []
+
+    def chamar():
+        chamadas.append(relogio.agora)
+        if len(chamadas) < 3:
+            raise ErroCota("quota")
+        return "ok"
+
+    ia = agendador()
+
+    assert ia.executar(chamar) == "ok"
+    assert len(chamadas) == 3
+    # Cada 429 corta a concorrência pela metade (8 → 4 → 2) e recua com espera
+    # crescente; o sucesso final, com o limite em uso, volta a somar 1/limite
+    assert ia.concorrencia.limite == pytest.approx(2.5)
+    assert [b - a for a, b in zip(chamadas, chamadas[1:])] == [
+        pytest.approx(espera) for espera in relogio.esperas
+    ]
+    assert 1 <= relogio.esperas[0] <= 2 <= relogio.esperas[1] <= 4
+
+
+def test_erro_que_nao_e_de_sobrecarga_nao_e_repetido(relogio):
+    chamadas = []
+
+    def chamar():
+        chamadas.append(1)
+        raise ValueError("resposta inválida")
+
+    with pytest.raises(ValueError):
+        agendador().executar(chamar)
+    assert len(chamadas) == 1
+
+
+def test_tentativas_esgotadas_propagam_a_sobrecarga(relogio):
+    chamadas = []
+
+    def chamar():
+        chamadas.append(1)
+        raise ErroCota("quota")
+
+    with pytest.raises(ErroCota):
+        agendador(max_tentativas=3).executar(chamar)
+    assert len(chamadas) == 3
+
+
+def test_tokens_reais_corrigem_a_reserva(relogio):
+    ia = agendador(tpm=600)
+
+    ia.executar(lambda: "ok", tokens_estimados=10, contar_tokens=lambda _: 4)
+
+    # Dos 10 tokens reservados, 6 voltam ao balde
+    ia.tokens.consumir(6)
+    assert relogio.esperas == []
@@ -0,0 +1,103 @@
+import os
+import stat
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from docx import Document
+
+from app.services.report_service import (
+    nome_relatorio,
+    preencher_e_gerar_docx,
+    salvar_relatorio,
+)
+from config import Config
+
+DADOS = {
+    "nome_aluno": "Maria da Silva",
+    "tema_redacao": "Tema de teste",
+    "nota_final": 760,
+    "comentarios_gerais": "Bom texto.",
+    "analise_competencias": {
+        f"c{i}": {"nota": 160, "analise": f"Análise {i}."} for i in range(1, 6)
+    },
+}
+
+
+def partes(buffer):
+    with ZipFile(buffer) as zipf:
+        assert zipf.testzip() is None
+        return {nome: zipf.read(nome) for nome in zipf.namelist()}
+
+
+def texto_do_documento(buffer):
+    # Texto de todas as partes XML (corpo, caixas de texto, cabeçalhos...)
+    return b"".join(
+        conteudo for nome, conteudo in partes(buffer).items() if nome.endswith(".xml")
+    ).decode("utf-8")
+
+
+def test_relatorio_preenchido_e_pacote_integro():
+    gerado = partes(preencher_e_gerar_docx(DADOS))
+
+    with ZipFile(Config.TEMPLATE_DOCX_PATH) as zipf:
+        assert set(zipf.namelist()) <= set(gerado)
+        # Partes sem placeholders saem iguais às do template
+        assert gerado["word/media/image1.png"] == zipf.read("word/media/image1.png")
+
+    texto = texto_do_documento(preencher_e_gerar_docx(DADOS))
+    assert "Maria da Silva" in texto
+    assert "Análise 3." in texto
+    assert "{{" not in texto
+    # O pacote continua legível pelo python-docx
+    Document(preencher_e_gerar_docx(DADOS))
+
+
+def test_relatorios_seguidos_nao_se_misturam():
+    primeiro = texto_do_documento(preencher_e_gerar_docx(DADOS))
+    segundo = texto_do_documento(
+        preencher_e_gerar_docx({**DADOS, "nome_aluno": "João Souza"})
+    )
+
+    assert "Maria da Silva" in primeiro and "João Souza" not in primeiro
+    assert "João Souza" in segundo and "Maria da Silva" not in segundo
+
+
+@pytest.fixture
+def umask():
+    anterior = os.umask(0o022)
+    yield 0o022
+    os.umask(anterior)
+
+
+def test_salvar_relatorio_respeita_a_umask(tmp_path, umask):
+    caminho = salvar_relatorio(BytesIO(b"PK\r\nrelatorio"), str(tmp_path), "a.docx")
+
+    assert stat.S_IMODE(os.stat(caminho).st_mode) == 0o666 & ~umask
+    with open(caminho, "rb") as f:
+        assert f.read() == b"PK\r\nrelatorio"
+    # Nenhum temporário fica para trás
+    assert os.listdir(tmp_path) == ["a.docx"]
+
+
+def test_salvar_relatorio_substitui_o_anterior(tmp_path, umask):
+    salvar_relatorio(BytesIO(b"antigo"), str(tmp_path), "a.docx")
+    caminho = salvar_relatorio(BytesIO(b"novo"), str(tmp_path), "a.docx")
+
+    with open(caminho, "rb") as f:
+        assert f.read() == b"novo"
+    assert os.listdir(tmp_path) == ["a.docx"]
+
+
+@pytest.mark.parametrize(
+    "nome_aluno, esperado",
+    [
+        ("Maria Silva", "Correcao_Maria_Silva_abcd.docx"),
+        ("../../etc/passwd", "Correcao_______etc_passwd_abcd.docx"),
+        ("", "Correcao_Aluno_abcd.docx"),
+        (None, "Correcao_Aluno_abcd.docx"),
+        ("x" * 200, f"Correcao_{'x' * 60}_abcd.docx"),
+    ],
+)
+def test_nome_relatorio_seguro(nome_aluno, esperado):
+    assert nome_relatorio({"nome_aluno": nome_aluno}, "abcdef") == esperado
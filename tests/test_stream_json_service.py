@@ -0,0 +1,149 @@
+import json
+import random
+
+import pytest
+
+from app.services.stream_json_service import (
+    ErroJsonIncremental,
+    ParserJsonIncremental,
+    RespostaInvalida,
+    ler_stream_json,
+)
+
+VALIDOS = [
+    "{}",
+    '{"a": 1}',
+    '{"a": {}}',
+    '{"a": []}',
+    '{"a": [1, 2.5, -3e2, true, false, null]}',
+    '{"a": {"b": {"c": [{"d": "e"}]}}, "f": 0}',
+    '{"texto": "aspas \\" barra \\\\ nova\\nlinha \\u00e9 \\ud83d\\ude00"}',
+    '{"acentos": "redação nota máxima"}',
+    ' \n{ "a" : [ 1 , { "b" : null } ] , "c" : "" } \n',
+    '{"a": [[], [[]], {}], "b": [{"c": []}]}',
+    '{"nome_aluno": "Maria", "analise_competencias": {"c1": {"nota": 160, '
+    '"analise": "ok"}, "c2": {"nota": 200, "analise": "ok"}}, "nota_final": 360}',
+]
+
+INVALIDOS = [
+    '{"a":}',
+    '{"a": }',
+    '{"a": [1, {"b":}]}',
+    '{"a": 1,}',
+    '{"a": [1,]}',
+    '{"a": [,]}',
+    "{,}",
+    '{"a" 1}',
+    '{"a"}',
+    "{:1}",
+    '{"a": 1 "b": 2}',
+    '{"a": 1]',
+    '{"a": [1}',
+    '{"a": tru}',
+    '{"a": 01x}',
+    '{"a": "\\q"}',
+    '{"a": @}',
+    '{1: 2}',
+]
+
+TRUNCADOS = [
+    "{",
+    '{"a"',
+    '{"a":',
+    '{"a": 1',
+    '{"a": [1, 2',
+    '{"a": "texto sem fim',
+    '{"a": {"b": 1}',
+]
+
+
+def pedacos_aleatorios(texto, sorteio):
+    """Divide o texto em pedaços de tamanhos aleatórios (inclusive vazios)."""
+    pedacos, inicio = [], 0
+    while inicio < len(texto):
+        fim = inicio + sorteio.randint(0, 7)
+        pedacos.append(texto[inicio:fim])
+        inicio = fim
+    return pedacos
+
+
+def divisoes(texto):
+    """Texto inteiro, um caractere por vez e várias divisões aleatórias."""
+    yield [texto]
+    yield list(texto)
+    sorteio = random.Random(texto)
+    for _ in range(20):
+        yield pedacos_aleatorios(texto, sorteio)
+
+
+def ler(pedacos):
+    parser = ParserJsonIncremental()
+    eventos = []
+    for pedaco in pedacos:
+        eventos.extend(parser.alimentar(pedaco))
+    return parser, eventos
+
+
+@pytest.mark.parametrize("texto", VALIDOS)
+def test_validos_iguais_ao_json_loads(texto):
+    esperado = json.loads(texto)
+    for pedacos in divisoes(texto):
+        parser, _ = ler(pedacos)
+        assert parser.concluido
+        assert parser.resultado == esperado
+
+
+@pytest.mark.parametrize("texto", INVALIDOS)
+def test_invalidos_rejeitados(texto):
+    with pytest.raises(ValueError):
+        json.loads(texto)
+    for pedacos in divisoes(texto):
+        with pytest.raises(ErroJsonIncremental):
+            ler(pedacos)
+
+
+@pytest.mark.parametrize("texto", TRUNCADOS)
+def test_truncados_nao_concluem(texto):
+    for pedacos in divisoes(texto):
+        parser, _ = ler(pedacos)
+        assert not parser.concluido
+
+
+def test_ignora_texto_fora_do_objeto():
+    parser, _ = ler(['```json\n{"a": [1]}', "\n```\nfim"])
+    assert parser.concluido
+    assert parser.resultado == {"a": [1]}
+
+
+def test_eventos_com_caminho_de_cada_escalar():
+    _, eventos = ler(list('{"a": {"b": [10, "x"]}, "c": null}'))
+    assert eventos == [
+        (("a", "b", 0), 10),
+        (("a", "b", 1), "x"),
+        (("c",), None),
+    ]
+
+
+def test_ler_stream_json_valida_cada_campo():
+    def validar(caminho, valor):
+        return "nota negativa" if caminho == ("nota",) and valor < 0 else None
+
+    with pytest.raises(RespostaInvalida, match="nota negativa"):
+        ler_stream_json(['{"nota": -1', ', "resto": "nunca lido"}'], validar)
+
+
+def test_ler_stream_json_rejeita_resposta_incompleta():
+    with pytest.raises(RespostaInvalida):
+        ler_stream_json(['{"a": 1'])
+
+
+def test_erro_no_callback_nao_interrompe_leitura():
+    recebidos = []
+
+    def ao_receber_campo(caminho, valor):
+        recebidos.append(caminho)
+        raise IndexError("quadro inexistente")
+
+    resultado = ler_stream_json(['{"a": 1, ', '"b": 2}'], None, ao_receber_campo)
+    assert resultado == {"a": 1, "b": 2}
+    assert recebidos == [("a",), ("b",)]
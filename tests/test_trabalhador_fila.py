@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import pytest
+from fake_gemini import ModeloFake
+
+from app.services import ai_service
+from app.services.fila_service import (
+    ORIGEM_LOCAL,
+    STATUS_CONCLUIDA,
+    STATUS_EXECUTANDO,
+    novo_lote,
+    obter_fila,
+)
+
+
+@pytest.fixture
+def lote(config, tmp_path, foto, monkeypatch):
+    """Dez redações locais enfileiradas, corrigidas por um modelo fake lento."""
+    monkeypatch.setattr(config, "CACHE_CORRECOES_ATIVO", False)
+    monkeypatch.setattr(config, "FILA_INTERVALO_CONSULTA", 0.05)
+    modelo = ModeloFake(latencia=lambda sorteio: 0.05)
+    monkeypatch.setattr(ai_service, "obter_modelo", lambda *_, **__: modelo)
+
+    entrada, saida = tmp_path / "entrada", tmp_path / "saida"
+    entrada.mkdir()
+    saida.mkdir()
+    tarefas = []
+    for i in range(10):
+        caminho = entrada / f"aluno_{i}.jpg"
+        caminho.write_bytes(foto)
+        tarefas.append(
+            {
+                "origem": ORIGEM_LOCAL,
+                "entrada": str(caminho),
+                "nome": caminho.name,
+                "destino": str(saida),
+                "paginas": [str(caminho)],
+            }
+        )
+    lote = novo_lote()
+    assert obter_fila().enfileirar(lote, tarefas) == 10
+    return lote, saida
+
+
+def test_reserva_no_maximo_o_limite_por_trabalhador(
+    trabalhador_fila, config, lote, monkeypatch
+):
+    lote, saida = lote
+    monkeypatch.setattr(config, "FILA_TAREFAS_POR_TRABALHADOR", 2)
+    fila = obter_fila()
+    reservadas = []
+    reservar = fila.reservar
+
+    def contando(trabalhador):
+        tarefa = reservar(trabalhador)
+        reservadas.append(fila.progresso(lote)[STATUS_EXECUTANDO])
+        return tarefa
+
+    fila.reservar = contando
+    trabalhador = trabalhador_fila.Trabalhador(fila, ate_esvaziar=True)
+
+    assert trabalhador.executar() == 10
+    assert max(reservadas) == 2
+    assert fila.progresso(lote)[STATUS_CONCLUIDA] == 10
+    assert len(os.listdir(saida)) == 10
+
+
+def test_outro_trabalhador_encontra_tarefas(
+    trabalhador_fila, config, lote, monkeypatch
+):
+    lote, _ = lote
+    monkeypatch.setattr(config, "FILA_TAREFAS_POR_TRABALHADOR", 2)
+    fila = obter_fila()
+    trabalhador = trabalhador_fila.Trabalhador(fila, ate_esvaziar=True)
+    concluidas = []
+    execucao = threading.Thread(
+        target=lambda: concluidas.append(trabalhador.executar())
+    )
+    execucao.start()
+
+    # Enquanto o primeiro trabalha, o restante da fila segue disponível
+    while not fila.progresso(lote)[STATUS_EXECUTANDO]:
+        time.sleep(0.01)
+    tarefa = fila.reservar("outro-trabalhador")
+    assert tarefa is not None
+    fila.concluir(tarefa, "feito por outro trabalhador")
+
+    execucao.join(timeout=30)
+    assert concluidas == [9]
+    assert fila.progresso(lote)[STATUS_CONCLUIDA] == 10
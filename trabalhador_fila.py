@@ -0,0 +1,321 @@
+"""
+Trabalhador da fila de correções.
+
+Consome as tarefas enfileiradas pela interface (Streamlit) e pelo
+corrigir_em_lote.py: carrega a imagem (disco local ou Drive), analisa com a
+IA, gera o relatório .docx e o grava no destino (pasta local ou Drive).
+
+Vários trabalhadores podem consumir a mesma fila ao mesmo tempo (um por
+núcleo, por exemplo); se um deles for interrompido, as tarefas que estavam com
+ele voltam para a fila.
+
+Uso:
+    python trabalhador_fila.py                # fica aguardando novas tarefas
+    python trabalhador_fila.py --ate-esvaziar # sai quando a fila estiver vazia
+"""
+
+import argparse
+import os
+import sys
+import threading
+from typing import Set
+
+# Os serviços da aplicação ficam em src/ (mesmo PYTHONPATH usado pelo run.sh)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from app.core.logger import get_logger  # noqa: E402
+from app.services import ai_service, report_service  # noqa: E402
+from app.services.async_drive_service import (  # noqa: E402
+    AsyncGoogleDriveService,
+    DriveSincrono,
+)
+from app.services.drive_service import progresso_no_log  # noqa: E402
+from app.services.fila_service import (  # noqa: E402
+    ORIGEM_DRIVE,
+    FilaCorrecoes,
+    Tarefa,
+    identificador_trabalhador,
+    obter_fila,
+)
+from app.services.ledger_service import obter_ledger, versao_prompt  # noqa: E402
+from app.services.metricas_service import obter_coletor  # noqa: E402
+from app.services.pipeline_service import Estagio, executar_pipeline  # noqa: E402
+from app.services.prompt_cache_service import obter_gerenciador  # noqa: E402
+from config import Config  # noqa: E402
+
+# --- Configuração de Logs ---
+logger = get_logger(__name__)
+
+
+def _arquivo_drive(tarefa: Tarefa):
+    # Formato do registro de processamento (ledger) do Drive
+    return {
+        "id": tarefa["entrada"],
+        "name": tarefa["nome"],
+        "md5Checksum": tarefa["md5"],
+    }
+
+
+class Trabalhador:
+    """
+    Executa as tarefas da fila no mesmo pipeline em estágios do lote do Drive:
+    enquanto uma redação está na IA, a próxima já está sendo carregada e a
+    anterior gravada.
+    """
+
+    def __init__(self, fila: FilaCorrecoes, ate_esvaziar: bool = False):
+        self.fila = fila
+        self.id = identificador_trabalhador()
+        self.ate_esvaziar = ate_esvaziar
+        self.ledger = obter_ledger()
+        self._parar = threading.Event()
+        self._reservadas: Set[int] = set()
+        self._contador_lock = threading.Lock()
+        # Uma vaga por tarefa reservada: o pipeline só recebe uma nova tarefa
+        # quando outra termina, em vez de esvaziar a fila para as suas filas
+        # internas (e renovar a reserva de tudo isso)
+        self._vagas = threading.BoundedSemaphore(
+            max(1, Config.FILA_TAREFAS_POR_TRABALHADOR)
+        )
+        self._drive = None
+        self._drive_lock = threading.Lock()
+        self.renderizador = report_service.obter_renderizador()
+
+    def _drive_service(self) -> DriveSincrono:
+        # O Drive só é autenticado se aparecer alguma tarefa do Drive
+        with self._drive_lock:
+            if self._drive is None:
+                self._drive = DriveSincrono(AsyncGoogleDriveService())
+            return self._drive
+
+    # --- Controle da fila ---
+    def _finalizada(self, tarefa: Tarefa) -> None:
+        # Conta uma vez só, mesmo que o registro da falha falhe e a tarefa
+        # passe de novo pelo tratamento de erro do pipeline
+        with self._contador_lock:
+            if tarefa["id"] not in self._reservadas:
+                return
+            self._reservadas.discard(tarefa["id"])
+        self._vagas.release()
+
+    def _reservar(self):
+        while not self._parar.is_set():
+            if not self._vagas.acquire(timeout=Config.FILA_INTERVALO_CONSULTA):
+                continue
+            tarefa = self.fila.reservar(self.id)
+            if tarefa:
+                with self._contador_lock:
+                    self._reservadas.add(tarefa["id"])
+                logger.info(
+                    f"--- Tarefa {tarefa['id']} (lote {tarefa['lote']}): "
+                    f"{tarefa['nome']} ---"
+                )
+                yield tarefa
+                continue
+            self._vagas.release()
+
+            # Com --ate-esvaziar, só sai depois que as próprias tarefas
+            # terminarem (uma falha pode devolver a tarefa para a fila)
+            if self.ate_esvaziar and not self._reservadas:
+                return
+            self._parar.wait(Config.FILA_INTERVALO_CONSULTA)
+
+    def _sinal_de_vida(self) -> None:
+        while True:
+            try:
+                self.fila.renovar(self.id)
+            except Exception as e:
+                logger.warning(f"Falha ao renovar as tarefas na fila: {e}")
+            if self._parar.wait(self.fila.lease_segundos / 3):
+                return
+
+    def _falhou(self, tarefa: Tarefa, erro: str) -> None:
+        self._finalizada(tarefa)
+        if self.fila.falhar(tarefa, erro):
+            logger.warning(
+                f"Tarefa {tarefa['id']} ({tarefa['nome']}) falhou e volta para a "
+                f"fila: {erro}"
+            )
+            return
+
+        logger.error(f"Tarefa {tarefa['id']} ({tarefa['nome']}) falhou: {erro}")
+        if self.ledger and tarefa["origem"] == ORIGEM_DRIVE:
+            self.ledger.registrar_falha(
+                _arquivo_drive(tarefa),
+                Config.MODEL_NAME,
+                versao_prompt(tarefa.get("prompt") or ai_service.carregar_prompt()),
+                erro,
+            )
+
+    def _registrando_falhas(self, etapa, funcao):
+        # Etapas que descartam a tarefa (retornam None) já logaram o motivo
+        def executar(tarefa):
+            resultado = funcao(tarefa)
+            if resultado is None:
+                self._falhou(tarefa, f"Falha na etapa '{etapa}'")
+            return resultado
+
+        return executar
+
+    # --- Estágios ---
+    def carregar(self, tarefa):
+        # Todas as páginas da redação, na ordem (uma só na maioria dos casos)
+        conteudos = []
+        for pagina in tarefa["paginas"]:
+            if tarefa["origem"] == ORIGEM_DRIVE:
+                conteudo = self._drive_service().download_file(
+                    pagina, progresso_no_log(f"Download de '{tarefa['nome']}'")
+                )
+            else:
+                with open(pagina, "rb") as f:
+                    conteudo = f.read()
+
+            if not conteudo:
+                logger.warning(f"Falha ao carregar a imagem '{tarefa['nome']}'.")
+                return None
+            conteudos.append(conteudo)
+        tarefa["conteudo"] = conteudos
+        return tarefa
+
+    def analisar(self, tarefa):
+        # Relido só quando o prompt.txt muda
+        tarefa["prompt"] = ai_service.carregar_prompt()
+        dados = ai_service.analisar_redacao_em_memoria(
+            tarefa.pop("conteudo"), tarefa["prompt"]
+        )
+        if not dados:
+            logger.warning(f"Falha na análise da IA para '{tarefa['nome']}'.")
+            return None
+
+        # Dados da turma informados ao enfileirar
+        dados.update(tarefa["extras"])
+        tarefa["dados_redacao"] = dados
+        return tarefa
+
+    def gerar_docx(self, tarefa):
+        docx = self.renderizador.gerar(tarefa["dados_redacao"])
+        if not docx:
+            logger.warning(f"Falha ao gerar o arquivo .docx para '{tarefa['nome']}'.")
+            return None
+        tarefa["docx"] = docx
+        return tarefa
+
+    def armazenar(self, tarefa):
+        dados = tarefa["dados_redacao"]
+
+        if tarefa["origem"] == ORIGEM_DRIVE:
+            nome_relatorio = report_service.nome_relatorio(dados, tarefa["entrada"])
+            resultado = self._drive_service().upload_docx(
+                tarefa.pop("docx"),
+                nome_relatorio,
+                tarefa["destino"],
+                progresso_no_log(f"Upload de '{nome_relatorio}'"),
+            )
+            if not resultado:
+                logger.error(
+                    f"Falha ao fazer upload do relatório de '{tarefa['nome']}'."
+                )
+                return None
+            if self.ledger:
+                self.ledger.registrar_conclusao(
+                    _arquivo_drive(tarefa),
+                    Config.MODEL_NAME,
+                    versao_prompt(tarefa["prompt"]),
+                    resultado,
+                )
+        else:
+            identificador = os.path.splitext(tarefa["nome"])[0]
+            resultado = report_service.salvar_relatorio(
+                tarefa.pop("docx"),
+                tarefa["destino"],
+                report_service.nome_relatorio(dados, identificador, tamanho=None),
+            )
+
+        self.fila.concluir(tarefa, resultado)
+        self._finalizada(tarefa)
+        logger.info(f"Sucesso! Relatório de '{tarefa['nome']}' salvo: {resultado}")
+        return tarefa["id"]
+
+    # --- Execução ---
+    def executar(self) -> int:
+        """Processa tarefas até a fila esvaziar (ou indefinidamente)."""
+        sinal = threading.Thread(
+            target=self._sinal_de_vida, name="fila-sinal-de-vida", daemon=True
+        )
+        sinal.start()
+
+        def ao_falhar(tarefa, erro):
+            self._falhou(tarefa, str(erro))
+
+        # Mesmo dimensionamento do lote do Drive: a IA tem threads de sobra (o
+        # agendador limita as chamadas) e a renderização tem uma thread por
+        # processo do renderizador
+        workers = max(Config.BATCH_WORKERS, Config.GEMINI_CONCORRENCIA_MAX)
+        transferencias = Config.DRIVE_MAX_CONEXOES
+        try:
+            concluidas = executar_pipeline(
+                self._reservar(),
+                [
+                    Estagio(
+                        "carregar",
+                        self._registrando_falhas("carregar", self.carregar),
+                        transferencias,
+                    ),
+                    Estagio(
+                        "ia", self._registrando_falhas("ia", self.analisar), workers
+                    ),
+                    Estagio(
+                        "docx",
+                        self._registrando_falhas("docx", self.gerar_docx),
+                        self.renderizador.processos,
+                    ),
+                    Estagio(
+                        "armazenar",
+                        self._registrando_falhas("armazenar", self.armazenar),
+                        transferencias,
+                    ),
+                ],
+                tamanho_fila=Config.BATCH_TAMANHO_FILA,
+                ao_falhar=ao_falhar,
+                identificar=lambda tarefa: {
+                    "redacao": tarefa["nome"],
+                    "lote": tarefa["lote"],
+                },
+            )
+            return len(concluidas)
+        finally:
+            self._parar.set()
+            # O que ficou pela metade (ex.: Ctrl+C) volta para a fila
+            self.fila.encerrar_trabalhador(self.id)
+            if self._drive:
+                self._drive.fechar()
+            self.renderizador.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trabalhador da fila de correções")
+    parser.add_argument(
+        "--ate-esvaziar",
+        action="store_true",
+        help="Encerra quando não houver mais tarefas pendentes",
+    )
+    args = parser.parse_args()
+
+    ai_service.configurar_ia()
+    trabalhador = Trabalhador(obter_fila(), ate_esvaziar=args.ate_esvaziar)
+    logger.info(f"Trabalhador {trabalhador.id} aguardando tarefas da fila...")
+
+    try:
+        concluidas = trabalhador.executar()
+        logger.info(f"Trabalhador encerrado: {concluidas} tarefas concluídas.")
+    except KeyboardInterrupt:
+        logger.info("Trabalhador interrompido; tarefas em andamento voltam à fila.")
+
+    logger.info(obter_coletor().resumo())
+    contexto = obter_gerenciador()
+    if contexto:
+        logger.info(contexto.resumo_economia())
+
+
+if __name__ == "__main__":
+    main()